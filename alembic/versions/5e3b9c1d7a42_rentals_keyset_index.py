@@ -0,0 +1,30 @@
+"""rentals keyset index
+
+Revision ID: 5e3b9c1d7a42
+Revises: c4d8a2e61f07
+Create Date: 2025-08-14 16:03:51.447820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '5e3b9c1d7a42'
+down_revision: Union[str, None] = 'c4d8a2e61f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so the scheduler can keep inserting meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_rentals_message_date_id', 'rentals', [
+                        sa.text('message_date DESC NULLS LAST'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rentals_message_date_id', table_name='rentals')
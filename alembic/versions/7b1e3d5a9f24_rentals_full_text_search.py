@@ -0,0 +1,54 @@
+"""rentals full text search
+
+Revision ID: 7b1e3d5a9f24
+Revises: e2a7c5f90b36
+Create Date: 2025-08-25 11:08:52.670413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '7b1e3d5a9f24'
+down_revision: Union[str, None] = 'e2a7c5f90b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('italian_unaccent'::regconfig, coalesce(summary, '')), 'A') || "
+    "setweight(to_tsvector('italian_unaccent'::regconfig, coalesce(raw_text, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'italian_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION italian_unaccent (COPY = italian);
+                ALTER TEXT SEARCH CONFIGURATION italian_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, italian_stem;
+            END IF;
+        END
+        $$
+    """)
+    # A stored generated column: existing rows are backfilled by the table
+    # rewrite, new rows are computed on insert and update
+    op.add_column('rentals', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_rentals_search_vector', 'rentals', ['search_vector'],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rentals_search_vector', table_name='rentals')
+    op.drop_column('rentals', 'search_vector')
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS italian_unaccent")
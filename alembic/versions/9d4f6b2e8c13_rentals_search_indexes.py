@@ -0,0 +1,74 @@
+"""rentals search indexes
+
+Revision ID: 9d4f6b2e8c13
+Revises: 5e3b9c1d7a42
+Create Date: 2025-08-18 10:12:44.381905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = '9d4f6b2e8c13'
+down_revision: Union[str, None] = '5e3b9c1d7a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Single-column indexes that no query uses on its own
+LEGACY_INDEXED_COLUMNS = (
+    'sender_id',
+    'sender_username',
+    'message_date',
+    'telephone',
+    'email',
+    'price',
+    'location',
+    'property_type',
+    'availability_start',
+    'availability_end',
+    'tenant_preference',
+    'num_bedrooms',
+    'num_bathrooms',
+    'flatmates_count',
+    'duration_to_leonardo_transit',
+    'duration_to_bovisa_transit',
+    'duration_to_leonardo_walking',
+    'duration_to_bovisa_walking',
+)
+
+
+def upgrade() -> None:
+    # Build and drop concurrently so the scheduler can keep inserting
+    with op.get_context().autocommit_block():
+        op.create_index('ix_rentals_property_type_message_date', 'rentals', [
+                        'property_type', sa.text('message_date DESC NULLS LAST'), sa.text('id DESC')],
+                        unique=False, postgresql_where=sa.text('property_type IS NOT NULL'),
+                        postgresql_concurrently=True)
+        op.create_index('ix_rentals_location_message_date', 'rentals', [
+                        'location', sa.text('message_date DESC NULLS LAST'), sa.text('id DESC')],
+                        unique=False, postgresql_where=sa.text('location IS NOT NULL'),
+                        postgresql_concurrently=True)
+        op.create_index('ix_rentals_price_property_type', 'rentals', ['price', 'property_type'],
+                        unique=False, postgresql_where=sa.text('price IS NOT NULL'),
+                        postgresql_concurrently=True)
+
+        for column in LEGACY_INDEXED_COLUMNS:
+            op.drop_index(f'ix_rentals_{column}', table_name='rentals',
+                          postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in LEGACY_INDEXED_COLUMNS:
+            op.create_index(f'ix_rentals_{column}', 'rentals', [column], unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+        op.drop_index('ix_rentals_price_property_type', table_name='rentals',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_rentals_location_message_date', table_name='rentals',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_rentals_property_type_message_date', table_name='rentals',
+                      postgresql_concurrently=True)
@@ -0,0 +1,72 @@
+"""rental dedup fingerprint
+
+Revision ID: b71f0e9a4c25
+Revises: 8c2e4d6f1a3b
+Create Date: 2025-08-09 11:47:05.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = 'b71f0e9a4c25'
+down_revision: Union[str, None] = '8c2e4d6f1a3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.add_column('rentals', sa.Column(
+        'dedup_fingerprint', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+    # Backfill outside the migration transaction, committing every batch,
+    # so large tables are not locked for the whole run.
+    # Keep in sync with app.utility.helpers.rental_fingerprint.
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        while True:
+            result = conn.execute(sa.text("""
+                UPDATE rentals
+                SET dedup_fingerprint = md5(
+                    sender_id::text || ':' || lower(substr(raw_text, 1, 30)))
+                WHERE id IN (
+                    SELECT id FROM rentals
+                    WHERE dedup_fingerprint IS NULL
+                      AND sender_id IS NOT NULL
+                      AND sender_id <> 0
+                      AND raw_text <> ''
+                    LIMIT :batch_size
+                )
+            """), {"batch_size": BACKFILL_BATCH_SIZE})
+            if result.rowcount == 0:
+                break
+
+        # Earlier code could store the same repost twice: keep the
+        # fingerprint on the oldest row only, so the unique index builds.
+        conn.execute(sa.text("""
+            UPDATE rentals SET dedup_fingerprint = NULL
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY dedup_fingerprint
+                        ORDER BY message_date NULLS LAST, id
+                    ) AS rn
+                    FROM rentals
+                    WHERE dedup_fingerprint IS NOT NULL
+                ) ranked
+                WHERE rn > 1
+            )
+        """))
+
+        op.create_index(op.f('ix_rentals_dedup_fingerprint'), 'rentals', [
+                        'dedup_fingerprint'], unique=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rentals_dedup_fingerprint'), table_name='rentals')
+    op.drop_column('rentals', 'dedup_fingerprint')
@@ -0,0 +1,39 @@
+"""rentals sort indexes
+
+Revision ID: f6a2d8c4e1b7
+Revises: a3c9e7b15d68
+Create Date: 2025-09-02 11:26:08.310574
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = 'f6a2d8c4e1b7'
+down_revision: Union[str, None] = 'a3c9e7b15d68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SORT_INDEXES = {
+    'ix_rentals_price_id': 'price',
+    'ix_rentals_leonardo_transit_id': 'duration_to_leonardo_transit',
+    'ix_rentals_bovisa_transit_id': 'duration_to_bovisa_transit',
+    'ix_rentals_leonardo_walking_id': 'duration_to_leonardo_walking',
+    'ix_rentals_bovisa_walking_id': 'duration_to_bovisa_walking',
+}
+
+
+def upgrade() -> None:
+    # Built concurrently so the scheduler can keep inserting meanwhile
+    with op.get_context().autocommit_block():
+        for name, column in SORT_INDEXES.items():
+            op.create_index(name, 'rentals', [column, 'id'], unique=False,
+                            postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    for name in SORT_INDEXES:
+        op.drop_index(name, table_name='rentals')
@@ -0,0 +1,114 @@
+"""
+In-process cache of serialized API responses, invalidated by a data version.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.core.config import settings
+
+
+@dataclass
+class CachedResponse:
+    """A serialized response body and the headers that go with it."""
+    body: bytes
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """
+    LRU of serialized responses for one dataset version.
+
+    The dataset version is re-read at most every `version_check_seconds`;
+    when it changed every entry is dropped, so stale responses are served
+    for at most that long after new rows are saved.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        version_check_seconds: Optional[float] = None,
+    ):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or settings.RESPONSE_CACHE_MAX_BYTES
+        self.version_check_seconds = (
+            settings.RESPONSE_CACHE_VERSION_CHECK_SECONDS
+            if version_check_seconds is None else version_check_seconds)
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    async def current_version(self, load: Callable[[], Awaitable[int]]) -> int:
+        """
+        Return the dataset version, reloading it when the check interval passed.
+        """
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.version_check_seconds:
+            version = await load()
+            if version != self._version:
+                self.clear()
+                self._version = version
+            self._checked_at = now
+        return self._version
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "data_version": self._version,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def weak_etag(version: int) -> str:
+    """Weak ETag of every response built from a dataset version."""
+    return f'W/"v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == bare
+        for candidate in if_none_match.split(",")
+    )
+
+
+rentals_cache = ResponseCache()
@@ -0,0 +1,16 @@
+"""
+Prometheus metrics endpoint.
+"""
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics of this API process.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
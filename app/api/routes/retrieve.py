@@ -1,62 +1,149 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query, Request
-from app.db.models import Rental, RentalResponse, PropertyType, TenantPreference
-from app.dependencies.repo import get_rental_repository
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.db.models import (
+    CommuteMode,
+    PropertyType,
+    RentalResponse,
+    RentalSort,
+    TenantPreference,
+)
+from app.dependencies.repo import get_data_version_repository, get_rental_repository
+from app.db.repositories.data_version import DataVersionRepository
 from app.db.repositories.rental import RentalRepository
+from app.api.response_cache import CachedResponse, etag_matches, rentals_cache, weak_etag
+from app.api.serialization import parse_fields, serializer_for
 from app.middleware.rate_limiter import limiter
+from app.utility.helpers import decode_cursor, encode_cursor
 
 
 router = APIRouter(prefix="/rentals", tags=["rentals"])
 
+# Response header carrying the cursor of the next page, absent on the last one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 @router.get("/", response_model=List[RentalResponse])
 @limiter.limit("100/minute")
 async def search_rentals(
     request: Request,
+    response: Response,
+    q: Optional[str] = Query(
+        None, max_length=200,
+        description="Full-text search in Italian, e.g. arredato balcone -piano terra"),
     location: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
     property_type: Optional[PropertyType] = Query(None),
     tenant_preference: Optional[TenantPreference] = Query(None),
+    hide_duplicates: bool = Query(
+        False, description="Leave out listings flagged as near-duplicates"),
+    max_minutes_to_leonardo: Optional[float] = Query(
+        None, gt=0, description="Max commute to the Leonardo campus, in minutes"),
+    max_minutes_to_bovisa: Optional[float] = Query(
+        None, gt=0, description="Max commute to the Bovisa campus, in minutes"),
+    commute_mode: CommuteMode = Query(
+        CommuteMode.transit, description="How the max_minutes_to_* commutes are made"),
+    sort: Optional[RentalSort] = Query(
+        None, description="date (newest first, the default), price or commute "
+                          "(lowest first); with q the default is relevance"),
     offset: int = Query(0, ge=0),
-    limit: int = Query(20, le=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description=f"Value of the {NEXT_CURSOR_HEADER} header of the previous page"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return (default: all)"),
     repo: RentalRepository = Depends(get_rental_repository),
+    versions: DataVersionRepository = Depends(get_data_version_repository),
 ):
-    rentals: List[Rental] = await repo.search(
-        location=location,
-        min_price=min_price,
-        max_price=max_price,
-        property_type=property_type,
-        tenant_preference=tenant_preference,
-        offset=offset,
-        limit=limit,
-    )
+    """
+    Search rentals, newest first unless `sort` is given.
+
+    sort=commute orders by the commute to Bovisa when only
+    `max_minutes_to_bovisa` is set, and to Leonardo otherwise.
+    With `q` and no `sort`, results are ordered by relevance and paged by
+    offset only.
+    Rows are serialized straight to JSON: `response_model` only documents
+    the full shape, and `fields` selects a subset of it.
+    """
+    q = q.strip() if q else None
+    by_relevance = bool(q) and sort is None
+    sort_field = RentalRepository.sort_field(
+        sort, commute_mode, max_minutes_to_leonardo, max_minutes_to_bovisa)
+    after = None
+    if cursor:
+        if offset:
+            raise HTTPException(
+                status_code=400, detail="Use either cursor or offset, not both")
+        if by_relevance:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor pagination is not available with q unless sort is given")
+        try:
+            cursor_field, after_key, after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # A cursor of another sort order (or commute) would page wrongly
+        if cursor_field != sort_field:
+            raise HTTPException(
+                status_code=400, detail="Cursor does not match the sort order")
+        after = (after_key, after_id)
+    try:
+        serializer = serializer_for(parse_fields(fields), sort_field)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return [
-        RentalResponse(
-            id=rental.id,
-            telegram_message_id=rental.telegram_message_id,
-            sender_id=rental.sender_id,
-            sender_username=rental.sender_username,
-            raw_text=rental.raw_text,
-            message_date=rental.message_date,
-            telephone=rental.telephone,
-            email=rental.email,
-            price=rental.price,
-            has_extra_expenses=rental.has_extra_expenses,
-            extra_expenses_details=rental.extra_expenses_details,
-            location=rental.location,
-            property_type=rental.property_type,
-            tenant_preference=rental.tenant_preference,
-            availability_start=rental.availability_start,
-            availability_end=rental.availability_end,
-            num_bedrooms=rental.num_bedrooms,
-            num_bathrooms=rental.num_bathrooms,
-            flatmates_count=rental.flatmates_count,
-            duration_to_bovisa_transit=rental.duration_to_bovisa_transit,
-            duration_to_leonardo_transit=rental.duration_to_leonardo_transit,
-            duration_to_bovisa_walking=rental.duration_to_bovisa_walking,
-            duration_to_leonardo_walking=rental.duration_to_leonardo_walking,
+    # The data only changes when the scheduler saves rentals
+    version = await rentals_cache.current_version(versions.get_version)
+    etag = weak_etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # Parsed parameters, so equivalent query strings share an entry
+    key = (q, location, min_price, max_price, property_type, tenant_preference,
+           hide_duplicates, max_minutes_to_leonardo, max_minutes_to_bovisa,
+           commute_mode, sort, offset, limit, cursor, serializer.fields)
+    cached = rentals_cache.get(key)
+    if cached is None:
+        # One extra row tells whether there is a next page
+        rows = await repo.search_rows(
+            serializer.columns,
+            location=location,
+            min_price=min_price,
+            max_price=max_price,
+            property_type=property_type,
+            tenant_preference=tenant_preference,
+            hide_duplicates=hide_duplicates,
+            max_minutes_to_leonardo=max_minutes_to_leonardo,
+            max_minutes_to_bovisa=max_minutes_to_bovisa,
+            commute_mode=commute_mode,
+            sort=sort,
+            offset=offset,
+            limit=limit + 1,
+            after=after,
+            q=q,
         )
-        for rental in rentals
-    ]
+        cached = CachedResponse(
+            body=serializer.dumps(rows[:limit]), headers={})
+        if len(rows) > limit and not by_relevance:
+            last = rows[limit - 1]
+            cached.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                sort_field, last[serializer.sort_position],
+                last[serializer.id_position])
+        rentals_cache.put(key, cached)
+
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={**cached.headers, **headers},
+    )
+
+
+@router.get("/cache-stats")
+@limiter.limit("10/minute")
+async def rentals_cache_stats(request: Request):
+    """
+    Hit rate and memory usage of the search response cache.
+    """
+    return rentals_cache.stats()
+
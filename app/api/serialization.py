@@ -0,0 +1,66 @@
+"""
+Direct row-to-JSON serialization of rental search results.
+"""
+from functools import lru_cache
+from typing import Any, Optional, Sequence, Tuple
+
+import orjson
+
+from app.db.models import RentalResponse
+
+# Public fields, in response order
+RENTAL_FIELDS: Tuple[str, ...] = tuple(RentalResponse.model_fields)
+# Always selected with the sort field: the next-page cursor is built from them
+CURSOR_FIELDS = ("id",)
+
+
+def parse_fields(raw: Optional[str]) -> Tuple[str, ...]:
+    """
+    Turn a `fields=` query value into field names in response order.
+
+    Raises:
+        ValueError: If a name is not a public rental field
+    """
+    if not raw:
+        return RENTAL_FIELDS
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested.difference(RENTAL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not requested:
+        return RENTAL_FIELDS
+    return tuple(name for name in RENTAL_FIELDS if name in requested)
+
+
+class RowSerializer:
+    """
+    Serialize SELECTed row tuples to a JSON list without pydantic models.
+
+    The rows come straight from the database with the types RentalResponse
+    declares, which orjson encodes natively (UUID, datetime, date, Enum).
+    """
+
+    def __init__(self, fields: Sequence[str], sort_field: str = "message_date"):
+        self.fields = tuple(fields)
+        # Columns to SELECT: the requested ones plus the cursor key
+        self.columns = tuple(
+            name for name in RENTAL_FIELDS
+            if name in self.fields or name in CURSOR_FIELDS or name == sort_field)
+        self._positions = tuple(self.columns.index(name) for name in self.fields)
+        self.id_position = self.columns.index("id")
+        self.sort_position = self.columns.index(sort_field)
+
+    def dumps(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        pairs = tuple(zip(self.fields, self._positions))
+        return orjson.dumps([
+            {name: row[position] for name, position in pairs}
+            for row in rows
+        ])
+
+
+@lru_cache(maxsize=256)
+def serializer_for(
+    fields: Tuple[str, ...], sort_field: str = "message_date"
+) -> RowSerializer:
+    """Serializer for a field selection, built once per distinct selection."""
+    return RowSerializer(fields, sort_field)
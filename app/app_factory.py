@@ -6,13 +6,15 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes.retrieve import router as rentals_router  # Fixed import
+from app.api.routes.retrieve import router as rentals_router, NEXT_CURSOR_HEADER  # Fixed import
 from app.api.routes.health_check import router as health_router  # Fixed import
-from app.scheduler.scheduler import start_scheduler, stop_scheduler  # Fixed import
+from app.api.routes.metrics import router as metrics_router
 from app.db.manage_db import init_db, engine
+from app.core.config import settings
 from app.core.logger import setup_logging
 from app.middleware.rate_limiter import setup_rate_limiter, limiter
 from app.middleware.secure_headers import SecureHeadersMiddleware
+from app.middleware.metrics import MetricsMiddleware
 
 
 @asynccontextmanager
@@ -54,14 +56,21 @@ def create_app() -> FastAPI:
         allow_origins=["http://localhost:3000"],
         allow_credentials=True,
         allow_methods=["GET", "POST"],
-        allow_headers=["Authorization", "Content-Type"],
+        allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
     )
 
+    # Request latency per route; outermost, so it times the other middleware too
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
     # Rate limiter
     setup_rate_limiter(app)
 
     # Include routers - Fixed
     app.include_router(health_router, prefix="/api")
     app.include_router(rentals_router, prefix="/api")
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router)
 
     return app
@@ -1,22 +1,67 @@
 """
 Pydantic settings for environment configuration.
 """
-from pydantic import ConfigDict
+from pydantic import BaseModel, ConfigDict
 from pydantic_settings import BaseSettings
 from datetime import timedelta
+from functools import lru_cache
+from typing import List, Literal, Optional
+
+
+class ChannelSettings(BaseModel):
+    """A Telegram channel to scrape and the keywords marking its listings."""
+
+    name: str
+    keywords: List[str] = ["#offro", "offered", "offro"]
 
 
 class Settings(BaseSettings):
     """
-    Application settings loaded from environment variables.
+    Settings of the read API: database, response cache, logging and metrics.
     """
 
     # Database
     DATABASE_URL: str
     DATABASE_URL_SUPABASE: str
+    # "pgbouncer": no prepared statement reuse, safe behind transaction
+    # pooling; "direct": cache DB_STATEMENT_CACHE_SIZE prepared statements
+    # per connection, for direct Postgres connections
+    DB_CONNECTION_MODE: str = "pgbouncer"
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    # -1 keeps connections open indefinitely
+    DB_POOL_RECYCLE_SECONDS: int = -1
+    DB_POOL_PRE_PING: bool = False
 
     PORT: int = 8000
 
+    # API response cache
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # How stale a cached response may be after the scheduler saved rentals
+    RESPONSE_CACHE_VERSION_CHECK_SECONDS: float = 5.0
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+
+    # Prometheus metrics: /metrics on the API, an exporter port for the scheduler
+    METRICS_ENABLED: bool = True
+
+    model_config = ConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="ignore",
+    )
+
+
+class ScraperSettings(Settings):
+    """
+    Settings of the scraping processes (scheduler, backfill): the API ones
+    plus Telegram, LLM and distance matrix configuration.
+    """
+
     # Telegram API
     TELEGRAM_API_ID: int
     TELEGRAM_API_HASH: str
@@ -26,23 +71,83 @@ class Settings(BaseSettings):
 
     # LLM Configuration
     MISTRAL_API_KEY: str
+    # Alternative API endpoint, e.g. the stub server of benchmarks/pipeline.py
+    MISTRAL_SERVER_URL: Optional[str] = None
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_REQUESTS_PER_SECOND: float = 1.0
+    LLM_TOKENS_PER_MINUTE: int = 500_000
+    LLM_MAX_RETRIES: int = 3
+    LLM_CACHE_TTL: timedelta = timedelta(days=30)
+    LLM_CACHE_LOCAL_SIZE: int = 2048
+    # "single": one request per message, "batch": multi-message prompts
+    LLM_PARSE_MODE: Literal["single", "batch"] = "single"
+    LLM_BATCH_TOKEN_BUDGET: int = 8000
+    LLM_BATCH_MAX_MESSAGES: int = 20
+    RULE_EXTRACTION_ENABLED: bool = True
+    # Fields the regex pre-extractor must fill for the LLM call to be skipped
+    LLM_REQUIRED_FIELDS: List[str] = ["price", "location", "property_type"]
 
     DISTANCE_MATRIX_API_KEY: str
     DISTANCE_URL: str = "https://api.distancematrix.ai/maps/api/distancematrix/json"
+    COMMUTE_CACHE_TTL: timedelta = timedelta(days=90)
+    DISTANCE_MAX_CONCURRENCY: int = 4
+    DISTANCE_TIMEOUT_SECONDS: float = 10.0
+    DISTANCE_MAX_RETRIES: int = 3
+    # Near-duplicate listings (MinHash/LSH): "flag" saves them with
+    # duplicate_of set, "skip" drops them before the LLM
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_THRESHOLD: float = 0.7
+    NEAR_DUPLICATE_ACTION: Literal["flag", "skip"] = "flag"
+    NEAR_DUPLICATE_WINDOW: timedelta = timedelta(days=90)
     # Scheduler
     SCRAPE_INTERVAL_MINUTES: int = 60
     SCRAPE_SINCE_DELTA: timedelta = timedelta(minutes=60)
+    SCHEDULER_METRICS_PORT: int = 9101
+    # Replicas coordinate through Postgres advisory locks: "none" (a single
+    # replica), "leader" (one replica scrapes) or "shard" (channels are
+    # spread across SCHEDULER_REPLICAS replicas)
+    SCHEDULER_COORDINATION: str = "none"
+    SCHEDULER_REPLICAS: int = 1
+    # Postgres drops the locks of a replica it lost within about this time
+    SCHEDULER_LEASE_SECONDS: int = 30
+    SCHEDULER_ELECTION_INTERVAL_SECONDS: float = 10.0
+    # Session-level locks need a direct connection (not transaction pooling);
+    # defaults to DATABASE_URL
+    SCHEDULER_LOCK_DATABASE_URL: Optional[str] = None
+    # Streaming pipeline: listings buffered per queue, micro-batch size and
+    # number of concurrent parse workers
+    PIPELINE_QUEUE_SIZE: int = 50
+    PIPELINE_BATCH_SIZE: int = 20
+    PIPELINE_PARSE_WORKERS: int = 2
 
     CHANNEL_NAME: str = "@polihouse"
+    # Channels scraped concurrently, as JSON, e.g.
+    # [{"name": "@polihouse"}, {"name": "@other", "keywords": ["affitto"]}];
+    # when empty, CHANNEL_NAME with the default keywords
+    CHANNELS: List[ChannelSettings] = []
+    # Flood waits (per account, so shared by all channels) up to this long
+    # are slept through; after a longer one every channel is skipped until
+    # the wait is over
+    TELEGRAM_FLOOD_SLEEP_THRESHOLD: int = 60
+    # Listener mode (listener_runner): pushed messages are processed in
+    # micro-batches of up to LISTENER_BATCH_SIZE, at most
+    # LISTENER_BATCH_WAIT_SECONDS after the first one arrived; channels are
+    # polled every LISTENER_RECONCILE_MINUTES for messages missed meanwhile
+    LISTENER_BATCH_SIZE: int = 20
+    LISTENER_BATCH_WAIT_SECONDS: float = 2.0
+    LISTENER_RECONCILE_MINUTES: int = 30
 
-    # Logging
-    LOG_LEVEL: str = "INFO"
-
-    model_config = ConfigDict(
-        env_file=".env",
-        case_sensitive=True,
-        extra="ignore",
-    )
+    def channel_configs(self) -> List[ChannelSettings]:
+        return self.CHANNELS or [ChannelSettings(name=self.CHANNEL_NAME)]
 
 
 settings = Settings()
+
+
+@lru_cache
+def get_scraper_settings() -> ScraperSettings:
+    """
+    Scraper settings, loaded on first use so the API process neither needs
+    the Telegram/Mistral/distance matrix secrets nor validates them.
+    """
+    return ScraperSettings()
@@ -0,0 +1,87 @@
+"""
+Prometheus metrics of the scraping pipeline, its external calls and the API.
+
+Metrics live in the default registry of each process: the API serves them
+at /metrics, the scheduler process through its own exporter
+(`start_exporter`). Updating one costs a few microseconds.
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# From fast DB writes to rate-limited LLM batches and whole runs
+SLOW_BUCKETS = (.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+SCRAPE_RUN_SECONDS = Histogram(
+    "scrape_run_seconds", "Duration of a scraping run", buckets=SLOW_BUCKETS)
+STAGE_SECONDS = Histogram(
+    "scrape_stage_seconds",
+    "Time a pipeline stage spends on a micro-batch (fetch: on the whole fetch)",
+    ["stage"], buckets=SLOW_BUCKETS)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "external_call_seconds",
+    "Latency of calls to external services (telegram: network time of a fetch)",
+    ["service", "outcome"], buckets=SLOW_BUCKETS)
+
+INGEST_LATENCY_SECONDS = Histogram(
+    "ingest_latency_seconds",
+    "Time from a message being posted to its listing being processed (listener)",
+    buckets=SLOW_BUCKETS)
+
+SCRAPE_MESSAGES = Counter(
+    "scrape_messages", "Messages through the pipeline, by outcome", ["outcome"])
+SCRAPE_FAILURES = Counter(
+    "scrape_failures", "Failed scraping runs and unparsable messages", ["kind"])
+LLM_TOKENS = Counter("llm_tokens", "Tokens used by LLM calls", ["kind"])
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups", "LLM result cache lookups", ["result"])
+LLM_CALLS_SAVED = Counter(
+    "llm_calls_saved", "LLM calls avoided by the rule-based extractor")
+
+SCHEDULER_SHARDS_HELD = Gauge(
+    "scheduler_shards_held", "Scrape shards (or leadership) held by this replica")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency per route name",
+    ["method", "route", "status"])
+
+# Results keys of ScrapingService.scrape_and_process_messages -> outcome
+_MESSAGE_OUTCOMES = {
+    "messages_fetched": "fetched",
+    "messages_parsed": "parsed",
+    "messages_saved": "saved",
+    "duplicates_skipped": "duplicate",
+    "near_duplicates": "near_duplicate",
+    "messages_updated": "updated",
+}
+
+
+@contextmanager
+def observe_call(service: str) -> Iterator[None]:
+    """Time a call to an external service; raising counts as an error."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_CALL_SECONDS.labels(service, outcome).observe(
+            time.perf_counter() - start)
+
+
+def record_scrape_results(results: dict) -> None:
+    """Add the counters of a scraping run's results dict."""
+    for key, outcome in _MESSAGE_OUTCOMES.items():
+        SCRAPE_MESSAGES.labels(outcome).inc(results.get(key, 0))
+    LLM_CACHE_LOOKUPS.labels("hit").inc(results.get("llm_cache_hits", 0))
+    LLM_CACHE_LOOKUPS.labels("miss").inc(results.get("llm_cache_misses", 0))
+    LLM_CALLS_SAVED.inc(results.get("llm_calls_saved", 0))
+    if results.get("errors"):
+        SCRAPE_FAILURES.labels("run").inc()
+
+
+def start_exporter(port: int) -> None:
+    """Serve this process's metrics over HTTP, for processes without the API."""
+    start_http_server(port)
@@ -1,27 +1,55 @@
 """
 Async database session management.
 """
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from app.db.models import Rental
 from sqlmodel import SQLModel
 from app.core.config import settings
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from app.db.text_search import CREATE_TEXT_SEARCH_CONFIG
 import uuid
 
 
-def get_async_engine() -> AsyncEngine:
-    """Return async database engine."""
+def connect_args(mode: str) -> Dict[str, Any]:
+    """asyncpg connection arguments for a DB_CONNECTION_MODE."""
+    if mode == "pgbouncer":
+        # Transaction pooling may run each statement on another server
+        # connection, so prepared statements are never reused
+        return {
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        }
+    if mode == "direct":
+        return {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    raise ValueError(f"Unknown DB_CONNECTION_MODE: {mode!r}")
+
+
+def get_async_engine(
+    url: Optional[str] = None, mode: Optional[str] = None
+) -> AsyncEngine:
+    """
+    Return async database engine.
+
+    Defaults to DATABASE_URL_SUPABASE and DB_CONNECTION_MODE; pool sizing
+    comes from the DB_POOL_* settings.
+    """
     try:
         async_engine: AsyncEngine = create_async_engine(
-            settings.DATABASE_URL_SUPABASE,
+            url or settings.DATABASE_URL_SUPABASE,
             echo=settings.LOG_LEVEL == "DEBUG",
             future=True,
-            connect_args={
-                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
-                "statement_cache_size": 0,
-                "prepared_statement_cache_size": 0,
-            }
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args=connect_args(mode or settings.DB_CONNECTION_MODE),
         )
     except SQLAlchemyError as e:
         raise RuntimeError(f"Failed to create async engine: {e}")
@@ -60,4 +88,7 @@ async def init_db() -> None:
     Initialize database tables.
     """
     async with engine.begin() as conn:
+        # The search_vector column needs the text search configuration
+        for statement in CREATE_TEXT_SEARCH_CONFIG:
+            await conn.execute(text(statement))
         await conn.run_sync(SQLModel.metadata.create_all)
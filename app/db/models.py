@@ -6,8 +6,10 @@ from typing import Optional, Dict, Any
 from uuid import UUID, uuid4
 from enum import Enum
 from sqlmodel import SQLModel, Field, BigInteger
+from sqlalchemy import JSON, Column, Computed, Index, LargeBinary, desc, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from pydantic import ConfigDict
-from app.core.config import settings
+from app.db.text_search import SEARCH_VECTOR_SQL
 
 
 class PropertyType(str, Enum):
@@ -23,6 +25,21 @@ class TenantPreference(str, Enum):
     indifferente = "indifferente"
 
 
+class CommuteMode(str, Enum):
+    transit = "transit"
+    walking = "walking"
+
+
+class RentalSort(str, Enum):
+    date = "date"
+    price = "price"
+    commute = "commute"
+
+
+# Campuses with commute durations, as in the duration_to_* column names
+CAMPUSES = ("leonardo", "bovisa")
+
+
 class StrictSQLModel(SQLModel):
     model_config = ConfigDict(
         extra="forbid",
@@ -35,52 +52,88 @@ class Rental(StrictSQLModel, table=True):
     Rental property model - Pure SQLModel approach.
     """
     __tablename__ = "rentals"
+    # Indexes follow the filter combinations and sort orders of
+    # RentalRepository.search, each ending in the order it serves
+    __table_args__ = (
+        # Unfiltered listing and keyset pagination
+        Index("ix_rentals_message_date_id",
+              desc("message_date").nulls_last(), desc("id")),
+        Index("ix_rentals_property_type_message_date",
+              "property_type", desc("message_date").nulls_last(), desc("id"),
+              postgresql_where=text("property_type IS NOT NULL")),
+        Index("ix_rentals_location_message_date",
+              "location", desc("message_date").nulls_last(), desc("id"),
+              postgresql_where=text("location IS NOT NULL")),
+        # Price ranges, optionally narrowed by property type
+        Index("ix_rentals_price_property_type", "price", "property_type",
+              postgresql_where=text("price IS NOT NULL")),
+        # sort=price and sort=commute (ascending, nulls last, then id), also
+        # used for the price and max_minutes_to_* range filters
+        Index("ix_rentals_price_id", "price", "id"),
+        Index("ix_rentals_leonardo_transit_id", "duration_to_leonardo_transit", "id"),
+        Index("ix_rentals_bovisa_transit_id", "duration_to_bovisa_transit", "id"),
+        Index("ix_rentals_leonardo_walking_id", "duration_to_leonardo_walking", "id"),
+        Index("ix_rentals_bovisa_walking_id", "duration_to_bovisa_walking", "id"),
+        # Full-text search (q=)
+        Index("ix_rentals_search_vector", "search_vector",
+              postgresql_using="gin"),
+    )
 
     # Primary key
     id: UUID = Field(default_factory=uuid4, primary_key=True)
 
-    # Raw Telegram data (all indexed for fast queries)
+    # Raw Telegram data (the message id is looked up on edits and re-fetches)
     telegram_message_id: Optional[int] = Field(
         default=None, index=True, sa_type=BigInteger)
-    sender_id: Optional[int] = Field(
-        default=None, index=True, sa_type=BigInteger)
-    sender_username: Optional[str] = Field(default=None, index=True)
-    message_date: Optional[datetime] = Field(default=None, index=True)
-    telephone: Optional[str] = Field(default=None, index=True)
-    email: Optional[str] = Field(default=None, index=True)
+    # Source channel, which message ids are unique within; NULL for rentals
+    # scraped before channels were recorded
+    channel: Optional[str] = None
+    sender_id: Optional[int] = Field(default=None, sa_type=BigInteger)
+    sender_username: Optional[str] = None
+    message_date: Optional[datetime] = None
+    telephone: Optional[str] = None
+    email: Optional[str] = None
 
     # Message content
     raw_text: str
+    # Sender + normalized text prefix hash, see helpers.rental_fingerprint
+    dedup_fingerprint: Optional[str] = Field(
+        default=None, unique=True, index=True)
     summary: Optional[str] = None
+    # MinHash of raw_text (see utility.minhash) and, for a near-duplicate,
+    # the id of the earliest similar listing
+    minhash_signature: Optional[bytes] = Field(default=None, sa_type=LargeBinary)
+    duplicate_of: Optional[UUID] = None
+    # Generated by Postgres from summary and raw_text, never written
+    search_vector: Optional[str] = Field(
+        default=None,
+        exclude=True,
+        sa_column=Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)),
+    )
 
-    # Core rental attributes (indexed for filtering)
-    price: Optional[float] = Field(default=None, index=True)
+    # Core rental attributes
+    price: Optional[float] = None
     has_extra_expenses: Optional[bool] = Field(
         default=None, description="True if extra expenses are mentioned")
     extra_expenses_details: Optional[str] = Field(
         default=None, description="Details of extra expenses, if any")
-    location: Optional[str] = Field(default=None, index=True)
-    property_type: Optional[PropertyType] = Field(default=None, index=True)
+    location: Optional[str] = None
+    property_type: Optional[PropertyType] = None
 
     # Availability dates
-    availability_start: Optional[date] = Field(default=None, index=True)
-    availability_end: Optional[date] = Field(default=None, index=True)
+    availability_start: Optional[date] = None
+    availability_end: Optional[date] = None
 
     # Preferences and counts
-    tenant_preference: Optional[TenantPreference] = Field(
-        default=None, index=True)
-    num_bedrooms: Optional[int] = Field(default=None, index=True)
-    num_bathrooms: Optional[int] = Field(default=None, index=True)
-    flatmates_count: Optional[int] = Field(default=None, index=True)
-
-    duration_to_leonardo_transit: Optional[float] = Field(
-        default=None, index=True)
-    duration_to_bovisa_transit: Optional[float] = Field(
-        default=None, index=True)
-    duration_to_leonardo_walking: Optional[float] = Field(
-        default=None, index=True)
-    duration_to_bovisa_walking: Optional[float] = Field(
-        default=None, index=True)
+    tenant_preference: Optional[TenantPreference] = None
+    num_bedrooms: Optional[int] = None
+    num_bathrooms: Optional[int] = None
+    flatmates_count: Optional[int] = None
+
+    duration_to_leonardo_transit: Optional[float] = None
+    duration_to_bovisa_transit: Optional[float] = None
+    duration_to_leonardo_walking: Optional[float] = None
+    duration_to_bovisa_walking: Optional[float] = None
 
 
 class TelegramMessageData(StrictSQLModel):
@@ -93,6 +146,58 @@ class TelegramMessageData(StrictSQLModel):
     sender_id: Optional[int] = None
     sender_username: Optional[str] = None
     has_media: bool = False
+    channel: Optional[str] = None
+    # Pushed by the listener as an edit of an earlier message
+    is_edit: bool = False
+
+
+class LLMCacheEntry(StrictSQLModel, table=True):
+    """
+    Cached LLM extraction result, keyed on a hash of the message content.
+    """
+    __tablename__ = "llm_cache"
+
+    key: str = Field(primary_key=True)
+    model: str
+    prompt_version: str
+    result: Dict[str, Any] = Field(default_factory=dict, sa_type=JSON)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class CommuteDuration(StrictSQLModel, table=True):
+    """
+    Cached commute durations (minutes) for an address, as normalized by ensure_milano.
+    """
+    __tablename__ = "commute_cache"
+
+    address: str = Field(primary_key=True)
+    duration_to_leonardo_transit: Optional[float] = None
+    duration_to_bovisa_transit: Optional[float] = None
+    duration_to_leonardo_walking: Optional[float] = None
+    duration_to_bovisa_walking: Optional[float] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class ScrapeState(StrictSQLModel, table=True):
+    """
+    Per-channel scraping progress: the last processed Telegram message id.
+    """
+    __tablename__ = "scrape_state"
+
+    channel: str = Field(primary_key=True)
+    last_message_id: int = Field(default=0, sa_type=BigInteger)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DataVersion(StrictSQLModel, table=True):
+    """
+    Version counter of a dataset, bumped whenever its rows change.
+    """
+    __tablename__ = "data_version"
+
+    name: str = Field(primary_key=True)
+    version: int = Field(default=0, sa_type=BigInteger)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class RentalResponse(StrictSQLModel):
@@ -101,6 +206,7 @@ class RentalResponse(StrictSQLModel):
     """
     id: UUID
     telegram_message_id: Optional[int] = None
+    channel: Optional[str] = None
     sender_id: Optional[int] = None
     sender_username: Optional[str] = None
     message_date: Optional[datetime]
@@ -108,6 +214,7 @@ class RentalResponse(StrictSQLModel):
     email: Optional[str] = None
     raw_text: str
     summary: Optional[str] = None
+    duplicate_of: Optional[UUID] = None
     price: Optional[float] = None
     has_extra_expenses: Optional[bool] = None
     extra_expenses_details: Optional[str] = None
@@ -0,0 +1,54 @@
+# app/db/repositories/commute_cache.py
+from datetime import datetime
+from typing import List
+
+from sqlmodel import select
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import CommuteDuration
+from app.db.repositories.base import SQLAlchemyRepository
+
+
+class CommuteCacheRepository(SQLAlchemyRepository[CommuteDuration]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, CommuteDuration)
+
+    async def get_many(
+        self, addresses: List[str], created_after: datetime
+    ) -> List[CommuteDuration]:
+        """Fetch all non-expired durations for the given addresses in one query."""
+        if not addresses:
+            return []
+        stmt = select(CommuteDuration).where(
+            CommuteDuration.address.in_(addresses),
+            CommuteDuration.created_at >= created_after,
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def upsert_many(self, entries: List[CommuteDuration]) -> None:
+        """Insert entries, replacing the durations of addresses already cached."""
+        if not entries:
+            return
+        stmt = insert(CommuteDuration).values(
+            [entry.model_dump() for entry in entries])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CommuteDuration.address],
+            set_={
+                column: stmt.excluded[column]
+                for column in entries[0].model_dump()
+                if column != "address"
+            },
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def purge_expired(self, created_before: datetime) -> int:
+        """Delete entries older than the TTL. Returns the number removed."""
+        stmt = delete(CommuteDuration).where(
+            CommuteDuration.created_at < created_before)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        return result.rowcount
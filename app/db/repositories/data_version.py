@@ -0,0 +1,36 @@
+# app/db/repositories/data_version.py
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import DataVersion
+from app.db.repositories.base import SQLAlchemyRepository
+
+# Version counter of the rentals table, read by the API response cache
+RENTALS_DATA = "rentals"
+
+
+class DataVersionRepository(SQLAlchemyRepository[DataVersion]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, DataVersion)
+
+    async def get_version(self, name: str = RENTALS_DATA) -> int:
+        """Current version of a dataset, 0 if it never changed."""
+        state = await self.db.get(DataVersion, name)
+        return state.version if state else 0
+
+    async def bump(self, name: str = RENTALS_DATA) -> int:
+        """Increment the version of a dataset and return the new value."""
+        stmt = insert(DataVersion).values(
+            name=name, version=1, updated_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DataVersion.name],
+            set_={
+                "version": DataVersion.version + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ).returning(DataVersion.version)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        return result.scalar_one()
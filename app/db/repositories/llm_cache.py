@@ -0,0 +1,53 @@
+# app/db/repositories/llm_cache.py
+from datetime import datetime
+from typing import List
+
+from sqlmodel import select
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import LLMCacheEntry
+from app.db.repositories.base import SQLAlchemyRepository
+
+
+class LLMCacheRepository(SQLAlchemyRepository[LLMCacheEntry]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, LLMCacheEntry)
+
+    async def get_many(
+        self, keys: List[str], created_after: datetime
+    ) -> List[LLMCacheEntry]:
+        """Fetch all non-expired entries for the given keys in one query."""
+        if not keys:
+            return []
+        stmt = select(LLMCacheEntry).where(
+            LLMCacheEntry.key.in_(keys),
+            LLMCacheEntry.created_at >= created_after,
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def upsert_many(self, entries: List[LLMCacheEntry]) -> None:
+        """Insert entries, refreshing the result of keys that already exist."""
+        if not entries:
+            return
+        stmt = insert(LLMCacheEntry).values(
+            [entry.model_dump() for entry in entries])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LLMCacheEntry.key],
+            set_={
+                "result": stmt.excluded.result,
+                "created_at": stmt.excluded.created_at,
+            },
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def purge_expired(self, created_before: datetime) -> int:
+        """Delete entries older than the TTL. Returns the number removed."""
+        stmt = delete(LLMCacheEntry).where(
+            LLMCacheEntry.created_at < created_before)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        return result.rowcount
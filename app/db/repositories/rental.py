@@ -1,11 +1,38 @@
 # app/db/repositories/rental.py
-from typing import List, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func
+from sqlalchemy import Select, and_, func, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 
-from app.db.models import Rental, TenantPreference, PropertyType
+from app.db.models import (
+    CAMPUSES,
+    CommuteMode,
+    PropertyType,
+    Rental,
+    RentalSort,
+    TenantPreference,
+)
 from app.db.repositories.base import SQLAlchemyRepository
+from app.db.text_search import search_query
+from app.utility.helpers import FINGERPRINT_PREFIX_LENGTH, rental_fingerprint
+
+
+# Max rows per INSERT statement, to stay below the bind-parameter limit
+INSERT_CHUNK_SIZE = 500
+
+
+@dataclass
+class BulkInsertResult:
+    """Outcome of a bulk insert: rows written and rows skipped as duplicates."""
+    inserted: List[Rental] = field(default_factory=list)
+    skipped: List[Rental] = field(default_factory=list)
+    # Stored listings overwritten by edited messages
+    updated: List[Rental] = field(default_factory=list)
 
 
 class RentalRepository(SQLAlchemyRepository[Rental]):
@@ -64,7 +91,15 @@ class RentalRepository(SQLAlchemyRepository[Rental]):
     ) -> Optional[Rental]:
         """
         Find a rental with the same sender_id and the same first `length` chars of raw_text.
+
+        The default length is served by the indexed dedup fingerprint.
         """
+        if length == FINGERPRINT_PREFIX_LENGTH:
+            stmt = select(Rental).where(
+                Rental.dedup_fingerprint == rental_fingerprint(sender_id, raw_text))
+            result = await self.db.execute(stmt)
+            return result.scalars().first()
+
         substring = raw_text[:length].lower()
         stmt = (
             select(Rental)
@@ -77,6 +112,162 @@ class RentalRepository(SQLAlchemyRepository[Rental]):
         result = await self.db.execute(stmt)
         return result.scalars().first()
 
+    async def find_existing_fingerprints(
+        self, fingerprints: Iterable[str]
+    ) -> Set[str]:
+        """
+        Return which dedup fingerprints are already stored, in one IN query.
+        """
+        fingerprints = {fp for fp in fingerprints if fp}
+        if not fingerprints:
+            return set()
+        stmt = select(Rental.dedup_fingerprint).where(
+            Rental.dedup_fingerprint.in_(fingerprints))
+        result = await self.db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def find_signatures(
+        self, since: datetime
+    ) -> List[Tuple[UUID, bytes]]:
+        """
+        MinHash signatures of original (not near-duplicate) rentals posted
+        since `since`, to seed the near-duplicate index.
+        """
+        stmt = select(Rental.id, Rental.minhash_signature).where(
+            Rental.minhash_signature.is_not(None),
+            Rental.duplicate_of.is_(None),
+            Rental.message_date >= since,
+        )
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    async def stream_for_clustering(
+        self, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Tuple[UUID, str, Optional[bytes], Optional[UUID]]]]:
+        """
+        Yield (id, raw_text, minhash_signature, duplicate_of) rows in batches,
+        oldest first, through a server-side cursor.
+        """
+        stmt = (
+            select(Rental.id, Rental.raw_text, Rental.minhash_signature,
+                   Rental.duplicate_of)
+            .order_by(Rental.message_date.asc().nulls_last(), Rental.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+    async def update_near_duplicates(self, rows: List[dict]) -> None:
+        """
+        Store signatures and duplicate_of links, one executemany by id.
+
+        Each row is a dict with "id" and the columns to set.
+        """
+        if not rows:
+            return
+        await self.db.execute(update(Rental), rows)
+        await self.db.commit()
+
+    async def update_from_edits(
+        self, rentals: List[Rental]
+    ) -> Tuple[BulkInsertResult, List[Rental]]:
+        """
+        Overwrite the stored listings of edited messages, found by channel
+        and message id, in one transaction. The stored id and duplicate_of
+        are kept, so links and cursors to the listing stay valid.
+
+        An edit whose new fingerprint belongs to another listing is skipped.
+
+        Returns:
+            Tuple of (updated and skipped rentals, rentals with no stored listing)
+        """
+        result = BulkInsertResult()
+        missing: List[Rental] = []
+        if not rentals:
+            return result, missing
+
+        try:
+            for rental in rentals:
+                stmt = (
+                    update(Rental)
+                    .where(Rental.channel == rental.channel,
+                           Rental.telegram_message_id == rental.telegram_message_id)
+                    .values(**rental.model_dump(exclude={"id", "duplicate_of"}))
+                    .returning(Rental.id)
+                )
+                try:
+                    async with self.db.begin_nested():
+                        ids = (await self.db.execute(stmt)).scalars().all()
+                except IntegrityError:
+                    result.skipped.append(rental)
+                    continue
+                if ids:
+                    rental.id = ids[0]
+                    result.updated.append(rental)
+                else:
+                    missing.append(rental)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return result, missing
+
+    async def bulk_upsert(self, rentals: List[Rental]) -> BulkInsertResult:
+        """
+        Insert a batch of rentals in one transaction, skipping duplicates.
+
+        A rental is a duplicate when a stored row (or an earlier row of the
+        batch) has the same dedup fingerprint. Rows are written with
+        multi-row INSERT ... ON CONFLICT DO NOTHING ... RETURNING id, so
+        conflicts with concurrent writers are reported as skipped too.
+        """
+        result = BulkInsertResult()
+        if not rentals:
+            return result
+
+        for rental in rentals:
+            if rental.dedup_fingerprint is None:
+                rental.dedup_fingerprint = rental_fingerprint(
+                    rental.sender_id, rental.raw_text)
+
+        try:
+            existing = await self.find_existing_fingerprints(
+                rental.dedup_fingerprint for rental in rentals)
+
+            candidates: List[Rental] = []
+            for rental in rentals:
+                fingerprint = rental.dedup_fingerprint
+                if fingerprint and fingerprint in existing:
+                    result.skipped.append(rental)
+                    continue
+                if fingerprint:
+                    existing.add(fingerprint)
+                candidates.append(rental)
+
+            inserted_ids = set()
+            for start in range(0, len(candidates), INSERT_CHUNK_SIZE):
+                chunk = candidates[start:start + INSERT_CHUNK_SIZE]
+                stmt = (
+                    insert(Rental)
+                    # model_dump leaves out the generated search_vector
+                    .values([rental.model_dump() for rental in chunk])
+                    .on_conflict_do_nothing()
+                    .returning(Rental.id)
+                )
+                inserted_ids.update((await self.db.execute(stmt)).scalars().all())
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        for rental in candidates:
+            if rental.id in inserted_ids:
+                result.inserted.append(rental)
+            else:
+                result.skipped.append(rental)
+        return result
+
     async def search(
         self,
         location: Optional[str] = None,
@@ -86,8 +277,113 @@ class RentalRepository(SQLAlchemyRepository[Rental]):
         tenant_preference: Optional[TenantPreference] = None,
         offset: int = 0,
         limit: int = 20,
+        after: Optional[Tuple[Any, UUID]] = None,
+        q: Optional[str] = None,
+        hide_duplicates: bool = False,
+        max_minutes_to_leonardo: Optional[float] = None,
+        max_minutes_to_bovisa: Optional[float] = None,
+        commute_mode: CommuteMode = CommuteMode.transit,
+        sort: Optional[RentalSort] = None,
     ) -> List[Rental]:
-        stmt = select(Rental)
+        """
+        Filter rentals, newest first unless `sort` says otherwise.
+
+        Pages either by `offset` or, when `after` is given, by keyset: only
+        rows sorting after that (sort key, id) pair are returned, which
+        walks the index of the sort order instead of skipping earlier rows.
+
+        With `q` only rows matching the Italian full-text query are returned,
+        most relevant first unless `sort` is given; keyset paging is not
+        available in relevance order.
+        `hide_duplicates` leaves out rows flagged as near-duplicates.
+
+        `max_minutes_to_*` keep rentals within that many minutes of the
+        campus by `commute_mode`. sort=price and sort=commute are ascending,
+        rows without a value last; see `sort_field` for the commute campus.
+        """
+        stmt = self.search_statement(
+            None,
+            location=location,
+            min_price=min_price,
+            max_price=max_price,
+            property_type=property_type,
+            tenant_preference=tenant_preference,
+            offset=offset,
+            limit=limit,
+            after=after,
+            q=q,
+            hide_duplicates=hide_duplicates,
+            max_minutes_to_leonardo=max_minutes_to_leonardo,
+            max_minutes_to_bovisa=max_minutes_to_bovisa,
+            commute_mode=commute_mode,
+            sort=sort,
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def search_rows(
+        self,
+        columns: Sequence[str],
+        **filters: Any,
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Like `search`, but SELECT only `columns` and return plain row tuples.
+
+        Skips loading unused columns (notably raw_text) and building ORM
+        objects; `filters` are the keyword arguments of `search`.
+        """
+        result = await self.db.execute(self.search_statement(columns, **filters))
+        return result.all()
+
+    @staticmethod
+    def sort_field(
+        sort: Optional[RentalSort] = None,
+        commute_mode: CommuteMode = CommuteMode.transit,
+        max_minutes_to_leonardo: Optional[float] = None,
+        max_minutes_to_bovisa: Optional[float] = None,
+    ) -> str:
+        """
+        Column the rows are ordered by, and keyset cursors are built from.
+
+        sort=commute orders by the duration to Bovisa when only
+        `max_minutes_to_bovisa` is given, and to Leonardo otherwise.
+        """
+        if sort == RentalSort.price:
+            return "price"
+        if sort == RentalSort.commute:
+            campus = "bovisa" if (
+                max_minutes_to_bovisa is not None
+                and max_minutes_to_leonardo is None) else "leonardo"
+            return f"duration_to_{campus}_{commute_mode.value}"
+        return "message_date"
+
+    @classmethod
+    def search_statement(
+        cls,
+        columns: Optional[Sequence[str]] = None,
+        location: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        property_type: Optional[PropertyType] = None,
+        tenant_preference: Optional[TenantPreference] = None,
+        offset: int = 0,
+        limit: int = 20,
+        after: Optional[Tuple[Any, UUID]] = None,
+        q: Optional[str] = None,
+        hide_duplicates: bool = False,
+        max_minutes_to_leonardo: Optional[float] = None,
+        max_minutes_to_bovisa: Optional[float] = None,
+        commute_mode: CommuteMode = CommuteMode.transit,
+        sort: Optional[RentalSort] = None,
+    ) -> Select:
+        """
+        The SELECT run by `search`, or by `search_rows` when `columns` are
+        given (also used by benchmarks/search_indexes.py).
+        """
+        if columns:
+            stmt = select(*(getattr(Rental, name) for name in columns))
+        else:
+            stmt = select(Rental)
         filters = []
         if location:
             filters.append(Rental.location == location)
@@ -97,11 +393,51 @@ class RentalRepository(SQLAlchemyRepository[Rental]):
             filters.append(Rental.price <= max_price)
         if property_type:
             filters.append(Rental.property_type == property_type)
+        for campus, max_minutes in zip(
+                CAMPUSES, (max_minutes_to_leonardo, max_minutes_to_bovisa)):
+            if max_minutes is not None:
+                duration = getattr(
+                    Rental, f"duration_to_{campus}_{commute_mode.value}")
+                filters.append(duration <= max_minutes)
         if filters:
             stmt = stmt.where(*filters)
         if tenant_preference:
             stmt = stmt.where(Rental.tenant_preference == tenant_preference)
-        stmt = stmt.order_by(Rental.message_date.desc())
-        stmt = stmt.offset(offset).limit(limit)
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
+        if hide_duplicates:
+            stmt = stmt.where(Rental.duplicate_of.is_(None))
+
+        sort_field = cls.sort_field(
+            sort, commute_mode, max_minutes_to_leonardo, max_minutes_to_bovisa)
+        key = getattr(Rental, sort_field)
+        # Newest first; prices and durations from the lowest
+        descending = sort_field == "message_date"
+        if descending:
+            order_by = [key.desc().nulls_last(), Rental.id.desc()]
+        else:
+            order_by = [key.asc().nulls_last(), Rental.id.asc()]
+        if q:
+            query = search_query(q)
+            stmt = stmt.where(Rental.search_vector.op("@@")(query))
+            if sort is None:
+                if after is not None:
+                    raise ValueError("Keyset paging is not available with q")
+                order_by.insert(
+                    0, func.ts_rank_cd(Rental.search_vector, query).desc())
+        if after is not None:
+            stmt = stmt.where(cls._after_key(key, descending, *after))
+        stmt = stmt.order_by(*order_by)
+        if after is None:
+            stmt = stmt.offset(offset)
+        return stmt.limit(limit)
+
+    @staticmethod
+    def _after_key(key, descending: bool, value: Any, rental_id: UUID):
+        """
+        Rows after (value, id) in `key desc nulls last, id desc` order, or
+        `key asc nulls last, id asc` when not descending.
+        """
+        if value is None:
+            after_id = Rental.id < rental_id if descending else Rental.id > rental_id
+            return and_(key.is_(None), after_id)
+        pair, last = tuple_(key, Rental.id), tuple_(value, rental_id)
+        return or_(pair < last if descending else pair > last, key.is_(None))
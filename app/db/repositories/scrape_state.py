@@ -0,0 +1,38 @@
+# app/db/repositories/scrape_state.py
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ScrapeState
+from app.db.repositories.base import SQLAlchemyRepository
+
+
+class ScrapeStateRepository(SQLAlchemyRepository[ScrapeState]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, ScrapeState)
+
+    async def get_last_message_id(self, channel: str) -> Optional[int]:
+        """Return the high-water mark of a channel, or None if never scraped."""
+        state = await self.db.get(ScrapeState, channel)
+        return state.last_message_id if state else None
+
+    async def set_last_message_id(self, channel: str, message_id: int) -> None:
+        """Store the high-water mark of a channel; it never moves backwards."""
+        stmt = insert(ScrapeState).values(
+            channel=channel,
+            last_message_id=message_id,
+            updated_at=datetime.utcnow(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScrapeState.channel],
+            set_={
+                "last_message_id": func.greatest(
+                    ScrapeState.last_message_id, stmt.excluded.last_message_id),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
@@ -0,0 +1,38 @@
+"""
+Italian full-text search over rentals, with accents folded.
+"""
+from sqlalchemy import func, literal_column
+from sqlalchemy.sql.elements import ColumnElement
+
+TEXT_SEARCH_CONFIG = "italian_unaccent"
+
+# Document of Rental.search_vector: the summary ranks above the raw message.
+# Keep in sync with the rentals_full_text_search migration.
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}'::regconfig, coalesce(summary, '')), 'A') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}'::regconfig, coalesce(raw_text, '')), 'B')"
+)
+
+# Idempotent; run by init_db before the tables are created
+CREATE_TEXT_SEARCH_CONFIG = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{TEXT_SEARCH_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {TEXT_SEARCH_CONFIG} (COPY = italian);
+            ALTER TEXT SEARCH CONFIGURATION {TEXT_SEARCH_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, italian_stem;
+        END IF;
+    END
+    $$
+    """,
+)
+
+
+def search_query(text: str) -> ColumnElement:
+    """
+    tsquery for user input, in web search syntax ("quoted phrase", -not, or).
+    """
+    return func.websearch_to_tsquery(
+        literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), text)
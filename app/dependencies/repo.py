@@ -4,9 +4,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.manage_db import get_async_session
 from app.db.repositories.base import SQLAlchemyRepository
 from app.db.repositories.rental import RentalRepository
+from app.db.repositories.data_version import DataVersionRepository
 
 
 def get_rental_repository(
     db: AsyncSession = Depends(get_async_session),
 ) -> RentalRepository:
     return RentalRepository(db=db)
+
+
+def get_data_version_repository(
+    db: AsyncSession = Depends(get_async_session),
+) -> DataVersionRepository:
+    return DataVersionRepository(db=db)
@@ -1,19 +1,122 @@
+from typing import Optional
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_scraper_settings
 from app.db.manage_db import get_async_session
 from app.scraping.scraper_service import ScrapingService
 from app.telegram.client import TelegramClientWrapper
 from app.parsing.llm_parser import SimpleMistralParser
+from app.parsing.cache import LLMResultCache
+from app.parsing.rate_limiter import LLMRateLimiter
+from app.parsing.rule_extractor import RuleBasedExtractor
+from app.utility.distances import DistanceMatrixClient
+from app.utility.minhash import LSHIndex
+from app.scheduler.leader import LEADER_SHARD, AdvisoryLocks, ShardElection
+from app.db.repositories.llm_cache import LLMCacheRepository
+from app.db.repositories.commute_cache import CommuteCacheRepository
+from app.db.repositories.scrape_state import ScrapeStateRepository
 from app.dependencies.repo import get_rental_repository
 from app.db.repositories.rental import RentalRepository
 
+settings = get_scraper_settings()
+
+
+_distance_client: Optional[DistanceMatrixClient] = None
+_llm_cache: Optional[LLMResultCache] = None
+_llm_rate_limiter: Optional[LLMRateLimiter] = None
+
+
+def get_distance_client() -> DistanceMatrixClient:
+    """Process-wide pooled client for the distance matrix API."""
+    global _distance_client
+    if _distance_client is None:
+        _distance_client = DistanceMatrixClient()
+    return _distance_client
+
+
+async def close_distance_client() -> None:
+    """Close the shared distance matrix client, if it was created."""
+    global _distance_client
+    if _distance_client is not None:
+        await _distance_client.aclose()
+        _distance_client = None
+
 
 def get_telegram_client() -> TelegramClientWrapper:
     """Dependency for Telegram client."""
     return TelegramClientWrapper()
 
 
-def get_llm_parser() -> SimpleMistralParser:
+def get_llm_cache(
+    db: AsyncSession = Depends(get_async_session),
+) -> LLMResultCache:
+    """
+    Dependency for the persistent LLM result cache: one per process, so its
+    local LRU outlives a scrape run, reading and writing through `db`.
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResultCache()
+    _llm_cache.attach(LLMCacheRepository(db=db))
+    return _llm_cache
+
+
+def get_commute_cache(
+    db: AsyncSession = Depends(get_async_session),
+) -> CommuteCacheRepository:
+    """Dependency for the persistent commute-duration cache."""
+    return CommuteCacheRepository(db=db)
+
+
+def get_scrape_state(
+    db: AsyncSession = Depends(get_async_session),
+) -> ScrapeStateRepository:
+    """Dependency for the per-channel high-water marks."""
+    return ScrapeStateRepository(db=db)
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """Process-wide rate limiter shared by every LLM parser."""
+    global _llm_rate_limiter
+    if _llm_rate_limiter is None:
+        _llm_rate_limiter = LLMRateLimiter.from_settings()
+    return _llm_rate_limiter
+
+
+def get_llm_parser(cache: Optional[LLMResultCache] = None) -> SimpleMistralParser:
     """Dependency for LLM parser."""
-    return SimpleMistralParser()
+    return SimpleMistralParser(rate_limiter=get_llm_rate_limiter(), cache=cache)
+
+
+def get_rule_extractor() -> Optional[RuleBasedExtractor]:
+    """Dependency for the regex pre-extractor (None when disabled)."""
+    if not settings.RULE_EXTRACTION_ENABLED:
+        return None
+    return RuleBasedExtractor()
+
+
+def get_near_duplicate_index() -> Optional[LSHIndex]:
+    """Dependency for the near-duplicate index (None when disabled)."""
+    if not settings.NEAR_DUPLICATE_ENABLED:
+        return None
+    return LSHIndex(settings.NEAR_DUPLICATE_THRESHOLD)
+
+
+def get_shard_election() -> Optional[ShardElection]:
+    """Dependency for the scheduler replicas' election (None when not coordinated)."""
+    mode = settings.SCHEDULER_COORDINATION
+    if mode == "none":
+        return None
+    if mode == "leader":
+        shards, replicas = [LEADER_SHARD], 1
+    elif mode == "shard":
+        shards = [channel.name for channel in settings.channel_configs()]
+        replicas = settings.SCHEDULER_REPLICAS
+    else:
+        raise ValueError(f"Unknown SCHEDULER_COORDINATION: {mode!r}")
+    locks = AdvisoryLocks(
+        settings.SCHEDULER_LOCK_DATABASE_URL or settings.DATABASE_URL,
+        settings.SCHEDULER_LEASE_SECONDS,
+    )
+    return ShardElection(locks, shards, replicas, settings.SCHEDULER_LEASE_SECONDS)
@@ -0,0 +1,148 @@
+"""
+Content-addressed cache for LLM extraction results.
+
+A small in-process LRU sits in front of the Postgres `llm_cache` table, so
+reposted listings and reruns are answered without calling the LLM again.
+"""
+import asyncio
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_scraper_settings
+from app.db.models import LLMCacheEntry
+from app.db.repositories.llm_cache import LLMCacheRepository
+
+settings = get_scraper_settings()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode and collapse whitespace so trivial edits share a key."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def cache_key(text: str, model: str, prompt_version: str) -> str:
+    """Hash of the normalized text, model name and prompt version."""
+    payload = "\x00".join((normalize_text(text), model, prompt_version))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """
+    Two-level cache (local LRU + Postgres) for parsed LLM results.
+
+    Writes are buffered and persisted in one statement by `flush()`.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[LLMCacheRepository] = None,
+        max_local_entries: int = settings.LLM_CACHE_LOCAL_SIZE,
+        ttl: timedelta = settings.LLM_CACHE_TTL,
+    ):
+        self.repository = repository
+        self.max_local_entries = max_local_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._local: "OrderedDict[str, Tuple[datetime, Dict[str, Any]]]" = OrderedDict()
+        self._known_missing: set[str] = set()
+        self._pending: Dict[str, LLMCacheEntry] = {}
+        # The repository session is shared, so DB access must be serialized
+        self._db_lock = asyncio.Lock()
+
+    def attach(self, repository: LLMCacheRepository) -> None:
+        """
+        Read and write through `repository` (e.g. the session of a new run),
+        keeping the local LRU.
+        """
+        self.repository = repository
+        # Other runs or processes may have stored these keys since
+        self._known_missing.clear()
+
+    def _expires_before(self) -> datetime:
+        return datetime.utcnow() - self.ttl
+
+    def _remember(self, key: str, created_at: datetime, result: Dict[str, Any]) -> None:
+        self._local[key] = (created_at, result)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        created_at, result = entry
+        if created_at < self._expires_before():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return result
+
+    async def prefetch(self, keys: Iterable[str]) -> None:
+        """Load many keys from Postgres with a single query."""
+        keys = [key for key in set(keys) if key not in self._local]
+        if not keys or self.repository is None:
+            return
+        async with self._db_lock:
+            entries = await self.repository.get_many(
+                keys, self._expires_before())
+        found = set()
+        for entry in entries:
+            self._remember(entry.key, entry.created_at, entry.result)
+            found.add(entry.key)
+        self._known_missing.update(set(keys) - found)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result (a copy) or None, counting hits and misses."""
+        result = self._get_local(key)
+        if result is None and self.repository is not None and key not in self._known_missing:
+            async with self._db_lock:
+                entries = await self.repository.get_many(
+                    [key], self._expires_before())
+            if entries:
+                self._remember(key, entries[0].created_at, entries[0].result)
+                result = entries[0].result
+            else:
+                self._known_missing.add(key)
+
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(result)
+
+    def put(self, key: str, model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+        """Store a result locally and queue it for the next `flush()`."""
+        entry = LLMCacheEntry(
+            key=key, model=model, prompt_version=prompt_version, result=result)
+        self._remember(key, entry.created_at, result)
+        self._known_missing.discard(key)
+        self._pending[key] = entry
+
+    async def flush(self) -> None:
+        """Persist buffered entries to Postgres."""
+        if not self._pending or self.repository is None:
+            self._pending.clear()
+            return
+        entries: List[LLMCacheEntry] = list(self._pending.values())
+        self._pending.clear()
+        async with self._db_lock:
+            await self.repository.upsert_many(entries)
+
+    async def purge_expired(self) -> int:
+        """Evict expired rows from Postgres."""
+        if self.repository is None:
+            return 0
+        async with self._db_lock:
+            return await self.repository.purge_expired(self._expires_before())
+
+    def stats(self) -> Dict[str, int]:
+        return {"llm_cache_hits": self.hits, "llm_cache_misses": self.misses}
@@ -4,130 +4,456 @@ Simple LLM parser for extracting rental data using Mistral API.
 import json
 import asyncio
 import aiohttp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from datetime import datetime
 from mistralai import Mistral
 
 
-from app.core.config import settings
+from app.core.config import get_scraper_settings
+from app.core.metrics import LLM_TOKENS, observe_call
 from app.db.models import TelegramMessageData
+from app.parsing.cache import LLMResultCache, cache_key
+from app.parsing.rate_limiter import LLMRateLimiter, estimate_tokens
 from app.utility.helpers import parse_llm_response
 
+settings = get_scraper_settings()
+
+# Expected size of the JSON answer, charged up-front to the token bucket
+COMPLETION_TOKENS_ESTIMATE = 300
+# Bump whenever the prompt changes so stale cached extractions are not reused
+PROMPT_VERSION = "1"
+
+# Output schema hint for every field the LLM can extract
+FIELD_SPECS: Dict[str, str] = {
+    "price": 'prezzo_mensile_in_euro_come_numero',
+    "location": '"via se esplicitamente presente, altrimenti zona (Leonardo|Città Studi|Bovisa) se menzionata"',
+    "property_type": '"camera_singola|camera_doppia|appartamento|monolocale"',
+    "telephone": '"numero_telefono_se_trovato"',
+    "email": '"email_se_trovata"',
+    "tenant_preference": '"scegli solo uno tra (ragazzo\' |\'ragazza\' |\'indifferente\') ,mai più di uno, mai combinazioni, mai separatori come virgole o slash"',
+    "available_start": '"YY-MM-DD_se_trovato"',
+    "available_end": '"YY-MM-DD_se_trovato"',
+    "num_bedrooms": 'numero_camere_da_letto',
+    "num_bathrooms": 'numero_bagni',
+    "flatmates_count": 'numero_coinquilini_attuali',
+    "summary": '"breve sunto delle caratteristiche aggiuntive della casa (es: arredamento, servizi, trasporti, spese incluse, condizioni speciali, etc.)"',
+    "has_extra_expenses": '"true se ci sono spese extra oltre al prezzo principale, altrimenti false"',
+    "extra_expenses_details": '"descrizione delle spese extra se presenti, altrimenti null"',
+}
+ALL_FIELDS: Tuple[str, ...] = tuple(FIELD_SPECS)
+
+# Extra guidance, only included when the field is requested
+FIELD_NOTES: Dict[str, str] = {
+    "location": """Per il campo location, estrai la via se è esplicitamente presente nel testo. Se non c'è una via, usa la zona (Leonardo, Città Studi, Bovisa) se viene menzionata. Se non trovi né via né zona, imposta a null.""",
+    "summary": """Per il campo summary, includi solo le informazioni extra non coperte dagli altri campi, come:
+- Stato dell'arredamento (arredato/non arredato)
+- Servizi inclusi (wifi, pulizie, utenze)
+- Vicinanza a trasporti pubblici
+- Caratteristiche speciali dell'immobile
+- Condizioni particolari del contratto
+- Spese aggiuntive o incluse
+
+Se non ci sono informazioni aggiuntive, imposta summary a "Nessuna informazione aggiuntiva".""",
+}
+
+
+def build_prompt(text: str, fields: Sequence[str] = ALL_FIELDS) -> str:
+    """
+    Build the extraction prompt, asking only for `fields`.
+    """
+    field_lines = _field_lines(fields)
+    notes = _field_notes(fields)
+    return f"""
+Estrai informazioni da questo messaggio di affitto italiano. Rispondi solo con JSON valido.
+
+Messaggio: "{text}"
+
+Estrai questi campi (usa null se non trovato). Se ci sono delle alternative, scegli la più probabile:
+{{
+{field_lines}
+}}
+
+{notes}Rispondi solo con JSON valido, senza testo aggiuntivo o markdown.
+JSON:
+"""
+
+
+def build_batch_prompt(
+    messages: Sequence[TelegramMessageData], fields: Sequence[str] = ALL_FIELDS
+) -> str:
+    """
+    Build one prompt extracting `fields` from several messages at once.
+
+    The model must answer with {"results": [...]}, one object per message,
+    each carrying the message "id".
+    """
+    payload = json.dumps(
+        [{"id": message.id, "testo": message.text} for message in messages],
+        ensure_ascii=False,
+        indent=1,
+    )
+    field_lines = _field_lines(
+        fields, first='    "id": id_del_messaggio_come_numero')
+    notes = _field_notes(fields)
+    return f"""
+Estrai informazioni da ciascuno di questi messaggi di affitto italiani. Rispondi solo con JSON valido.
+
+Messaggi (lista JSON con "id" e "testo"):
+{payload}
+
+Per ogni messaggio estrai questi campi (usa null se non trovato). Se ci sono delle alternative, scegli la più probabile:
+{{
+{field_lines}
+}}
+
+{notes}Rispondi con un oggetto JSON della forma {{"results": [...]}}, con esattamente un oggetto per ogni messaggio e lo stesso "id" del messaggio. Non mescolare informazioni tra messaggi diversi.
+Rispondi solo con JSON valido, senza testo aggiuntivo o markdown.
+JSON:
+"""
+
+
+def _field_lines(fields: Sequence[str], first: Optional[str] = None) -> str:
+    lines = [f'    "{name}": {FIELD_SPECS[name]}' for name in fields]
+    if first:
+        lines.insert(0, first)
+    return ",\n".join(lines)
+
+
+def _field_notes(fields: Sequence[str]) -> str:
+    return "".join(
+        f"{note}\n\n" for name, note in FIELD_NOTES.items() if name in fields)
+
+
+def with_message_metadata(
+    data: Dict[str, Any], message: TelegramMessageData
+) -> Dict[str, Any]:
+    """
+    Add the Telegram metadata expected by ScrapingService to parsed data.
+    """
+    data["message_id"] = message.id
+    data["sender_id"] = message.sender_id
+    data["sender_username"] = message.sender_username
+    data["date"] = message.date
+    data["raw_text"] = message.text
+    data["has_media"] = message.has_media
+    data["channel"] = message.channel
+    data["is_edit"] = message.is_edit
+    return data
+
 
 class SimpleMistralParser:
     """
     Simple LLM parser using Mistral free tier to extract rental data.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: Optional[LLMRateLimiter] = None,
+        cache: Optional[LLMResultCache] = None,
+    ):
         self.api_key = settings.MISTRAL_API_KEY
-        self.client = Mistral(api_key=self.api_key)
+        self.client = Mistral(
+            api_key=self.api_key, server_url=settings.MISTRAL_SERVER_URL)
         self.model = "pixtral-12b-2409"
+        self.rate_limiter = rate_limiter or LLMRateLimiter.from_settings()
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.cache = cache
+
+    @staticmethod
+    def _prompt_version(fields: Sequence[str]) -> str:
+        if tuple(fields) == ALL_FIELDS:
+            return PROMPT_VERSION
+        return f"{PROMPT_VERSION}:{'+'.join(fields)}"
+
+    def _cache_key(
+        self, message: TelegramMessageData, fields: Sequence[str] = ALL_FIELDS
+    ) -> str:
+        return cache_key(message.text, self.model, self._prompt_version(fields))
+
+    async def prefetch_cache(
+        self,
+        messages: List[TelegramMessageData],
+        fields: Optional[List[Sequence[str]]] = None,
+    ) -> None:
+        """
+        Warm the local cache for a batch of messages with one DB query.
 
-    async def parse_message(self, message: TelegramMessageData) -> Dict[str, Any]:
+        `fields` gives the requested field subset of each message, if any.
+        """
+        if not self.cache:
+            return
+        fields = fields or [ALL_FIELDS] * len(messages)
+        await self.cache.prefetch(
+            self._cache_key(message, message_fields)
+            for message, message_fields in zip(messages, fields)
+        )
+
+    async def flush_cache(self) -> None:
+        """Persist results parsed since the last flush."""
+        if self.cache:
+            await self.cache.flush()
+
+    async def _complete(
+        self, prompt: str, completion_tokens: int = COMPLETION_TOKENS_ESTIMATE
+    ) -> str:
+        """
+        Send a single chat completion through the shared rate limiter.
+
+        Retries on HTTP 429, honouring the Retry-After header when present.
+        """
+        estimated = estimate_tokens(prompt) + completion_tokens
+        user_message = [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        for attempt in range(self.max_retries + 1):
+            async with self.rate_limiter.slot(estimated):
+                try:
+                    # Call Mistral API using official client
+                    with observe_call("mistral"):
+                        chat_response = await self.client.chat.complete_async(
+                            model=self.model,
+                            messages=user_message,
+                            response_format={
+                                "type": "json_object",
+                            }
+                        )
+                except Exception as e:
+                    if _status_code(e) != 429 or attempt == self.max_retries:
+                        raise
+                    retry_after = _retry_after(e)
+                    self.rate_limiter.penalize(
+                        retry_after if retry_after is not None else 2 ** attempt)
+                    continue
+
+            usage = getattr(chat_response, "usage", None)
+            if usage is not None and usage.total_tokens:
+                self.rate_limiter.record_usage(
+                    usage.total_tokens - estimated)
+                LLM_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+                LLM_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+            return chat_response.choices[0].message.content
+
+        raise RuntimeError("LLM retries exhausted")
+
+    async def parse_message(
+        self,
+        message: TelegramMessageData,
+        fields: Sequence[str] = ALL_FIELDS,
+    ) -> Dict[str, Any]:
         """
         Parse rental message and extract key information.
 
         Args:
             message: Dictionary containing Telegram message data
+            fields: Subset of fields to ask the LLM for (default: all)
 
         Returns:
             Dict with extracted rental data
         """
+        fields = tuple(fields)
         try:
+            key = self._cache_key(message, fields)
+            data = await self.cache.get(key) if self.cache else None
+            if data is None:
+                data = await self._extract(message.text, fields)
+                self._cache_result(message, fields, data)
 
-            prompt = f"""
-Estrai informazioni da questo messaggio di affitto italiano. Rispondi solo con JSON valido.
+            # Add metadata
+            return with_message_metadata(data, message)
 
-Messaggio: "{message.text}"
+        except Exception as e:
+            return {
+                "raw_text": message.text,
+                "error": str(e)
+            }
 
-Estrai questi campi (usa null se non trovato). Se ci sono delle alternative, scegli la più probabile:
-{{
-    "price": prezzo_mensile_in_euro_come_numero,
-    "location": "via se esplicitamente presente, altrimenti zona (Leonardo|Città Studi|Bovisa) se menzionata",
-    "property_type": "camera_singola|camera_doppia|appartamento|monolocale",
-    "telephone": "numero_telefono_se_trovato",
-    "email": "email_se_trovata",
-    "tenant_preference": "scegli solo uno tra (ragazzo' |'ragazza' |'indifferente') ,mai più di uno, mai combinazioni, mai separatori come virgole o slash",
-    "available_start": "YY-MM-DD_se_trovato",
-    "available_end": "YY-MM-DD_se_trovato",
-    "num_bedrooms": numero_camere_da_letto,
-    "num_bathrooms": numero_bagni,
-    "flatmates_count": numero_coinquilini_attuali,
-    "summary": "breve sunto delle caratteristiche aggiuntive della casa (es: arredamento, servizi, trasporti, spese incluse, condizioni speciali, etc.)",
-    "has_extra_expenses": "true se ci sono spese extra oltre al prezzo principale, altrimenti false",
-    "extra_expenses_details": "descrizione delle spese extra se presenti, altrimenti null"
-}}
+    def _cache_result(
+        self, message: TelegramMessageData, fields: Sequence[str], data: Dict[str, Any]
+    ) -> None:
+        if data and self.cache:
+            self.cache.put(self._cache_key(message, fields), self.model,
+                           self._prompt_version(fields), dict(data))
 
-Per il campo location, estrai la via se è esplicitamente presente nel testo. Se non c'è una via, usa la zona (Leonardo, Città Studi, Bovisa) se viene menzionata. Se non trovi né via né zona, imposta a null.
+    async def parse_messages_batch(
+        self,
+        messages: List[TelegramMessageData],
+        fields: Sequence[str] = ALL_FIELDS,
+        token_budget: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Parse many messages with as few chat completions as possible.
 
-Per il campo summary, includi solo le informazioni extra non coperte dagli altri campi, come:
-- Stato dell'arredamento (arredato/non arredato)
-- Servizi inclusi (wifi, pulizie, utenze)
-- Vicinanza a trasporti pubblici
-- Caratteristiche speciali dell'immobile
-- Condizioni particolari del contratto
-- Spese aggiuntive o incluse
+        Uncached messages are packed into multi-message prompts sized to
+        `token_budget`. Entries missing from (or unparseable in) a batch
+        response fall back to one `parse_message` call each.
 
-Se non ci sono informazioni aggiuntive, imposta summary a "Nessuna informazione aggiuntiva".
+        Args:
+            messages: Telegram messages to parse
+            fields: Subset of fields to ask the LLM for (default: all)
+            token_budget: Max estimated tokens (prompt + answer) per request
 
-Rispondi solo con JSON valido, senza testo aggiuntivo o markdown.
-JSON:
-"""
-            user_message = [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-            # Call Mistral API using official client
-            chat_response = await self.client.chat.complete_async(
-                model=self.model,
-                messages=user_message,
-                response_format={
-                    "type": "json_object",
-                }
-            )
-
-            # Parse response
-            response_content = chat_response.choices[0].message.content
-            data = parse_llm_response(response_content)
+        Returns:
+            List of parsed data dictionaries, in input order
+        """
+        fields = tuple(fields)
+        parsed: Dict[int, Dict[str, Any]] = {}
+        pending: List[Tuple[int, TelegramMessageData]] = []
+        for index, message in enumerate(messages):
+            cached = None
+            if self.cache:
+                cached = await self.cache.get(self._cache_key(message, fields))
+            if cached is not None:
+                parsed[index] = with_message_metadata(cached, message)
+            else:
+                pending.append((index, message))
 
-            # Add metadata
-            data["message_id"] = message.id
-            data["sender_id"] = message.sender_id
-            data["sender_username"] = message.sender_username
-            data["date"] = message.date
-            data["raw_text"] = message.text
-            data["has_media"] = message.has_media
+        batches = self._pack_batches(
+            pending, fields, token_budget or settings.LLM_BATCH_TOKEN_BUDGET)
+        outputs = await asyncio.gather(
+            *(self._extract_batch([m for _, m in batch], fields)
+              for batch in batches),
+            return_exceptions=True
+        )
 
-            return data
+        fallback = []
+        for batch, output in zip(batches, outputs):
+            if isinstance(output, Exception):
+                output = {}
+            for index, message in batch:
+                data = output.get(message.id)
+                if data is None:
+                    fallback.append((index, message))
+                    continue
+                self._cache_result(message, fields, data)
+                parsed[index] = with_message_metadata(data, message)
 
+        retried = await asyncio.gather(
+            *(self._parse_uncached(message, fields) for _, message in fallback))
+        for (index, _), data in zip(fallback, retried):
+            parsed[index] = data
+
+        return [parsed[index] for index in range(len(messages))]
+
+    async def _parse_uncached(
+        self, message: TelegramMessageData, fields: Sequence[str]
+    ) -> Dict[str, Any]:
+        """Single-message extraction that skips the cache lookup."""
+        try:
+            data = await self._extract(message.text, fields)
+            self._cache_result(message, fields, data)
+            return with_message_metadata(data, message)
         except Exception as e:
             return {
                 "raw_text": message.text,
                 "error": str(e)
             }
 
-    async def batch_parse(self, messages: list[str], delay: float = 2.0) -> list[Dict[str, Any]]:
+    @staticmethod
+    def _pack_batches(
+        messages: List[Tuple[int, TelegramMessageData]],
+        fields: Sequence[str],
+        token_budget: int,
+    ) -> List[List[Tuple[int, TelegramMessageData]]]:
         """
-        Parse multiple messages with delay for rate limiting.
+        Greedily group messages so each request stays within the token budget.
+        """
+        base_tokens = estimate_tokens(build_batch_prompt([], fields))
+        max_size = settings.LLM_BATCH_MAX_MESSAGES
+        batches: List[List[Tuple[int, TelegramMessageData]]] = []
+        current: List[Tuple[int, TelegramMessageData]] = []
+        current_ids: set[int] = set()
+        used = base_tokens
+        for index, message in messages:
+            cost = estimate_tokens(message.text) + COMPLETION_TOKENS_ESTIMATE
+            if current and (
+                used + cost > token_budget
+                or len(current) >= max_size
+                or message.id in current_ids
+            ):
+                batches.append(current)
+                current, current_ids, used = [], set(), base_tokens
+            current.append((index, message))
+            current_ids.add(message.id)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _extract_batch(
+        self, messages: List[TelegramMessageData], fields: Sequence[str]
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Run one multi-message request and map the answers by message id.
+        """
+        prompt = build_batch_prompt(messages, fields)
+        response_content = await self._complete(
+            prompt, completion_tokens=COMPLETION_TOKENS_ESTIMATE * len(messages))
+        data = parse_llm_response(response_content)
+        results = data.get("results") if isinstance(data, dict) else None
+
+        expected = {message.id for message in messages}
+        by_id: Dict[int, Dict[str, Any]] = {}
+        for item in results if isinstance(results, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                message_id = int(item.pop("id"))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if message_id in expected and message_id not in by_id:
+                by_id[message_id] = item
+        return by_id
+
+    async def _extract(
+        self, text: str, fields: Sequence[str] = ALL_FIELDS
+    ) -> Dict[str, Any]:
+        """
+        Ask the LLM to extract the requested rental fields from a message text.
+        """
+        prompt = build_prompt(text, fields)
+        # Parse response
+        response_content = await self._complete(prompt)
+        return parse_llm_response(response_content)
+
+    async def batch_parse(
+        self, messages: List[TelegramMessageData]
+    ) -> List[Dict[str, Any]]:
+        """
+        Parse multiple messages concurrently.
+
+        Pacing is left to the shared rate limiter, so throughput follows the
+        configured provider quota instead of a fixed delay.
 
         Args:
-            messages: List of message texts
-            delay: Seconds to wait between API calls
+            messages: List of Telegram messages
 
         Returns:
-            List of parsed data dictionaries
+            List of parsed data dictionaries, in input order
         """
-        results = []
+        return list(await asyncio.gather(
+            *(self.parse_message(message) for message in messages)
+        ))
+
 
-        for i, message in enumerate(messages):
-            if i > 0:
-                await asyncio.sleep(delay)
+def _status_code(error: Exception) -> Optional[int]:
+    """Return the HTTP status carried by a Mistral SDK error, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "raw_response", None),
+                         "status_code", None)
+    return status
 
-            result = await self.parse_message(message)
-            results.append(result)
-            print(f"Processed {i+1}/{len(messages)}")
 
-        return results
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read the Retry-After header (in seconds) from a 429 error."""
+    response = getattr(error, "raw_response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,122 @@
+"""
+Token-bucket rate limiter shared by all LLM calls.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from app.core.config import get_scraper_settings
+
+settings = get_scraper_settings()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds to wait until `amount` tokens are available."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Take tokens out of the bucket (may go negative to record overuse)."""
+        self.tokens -= amount
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class LLMRateLimiter:
+    """
+    Limits concurrent LLM calls and paces them on requests/s and tokens/min.
+
+    A 429 from the provider blocks every caller until the Retry-After delay
+    has passed, so all concurrent workers back off together.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float,
+        tokens_per_minute: int,
+        max_concurrency: int,
+    ):
+        self._requests = TokenBucket(
+            rate=requests_per_second, capacity=max(1.0, requests_per_second))
+        self._tokens = TokenBucket(
+            rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "LLMRateLimiter":
+        return cls(
+            requests_per_second=settings.LLM_REQUESTS_PER_SECOND,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        )
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """
+        Wait until one request and `tokens` tokens can be spent.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self._blocked_until - now,
+                    self._requests.wait_time(1, now),
+                    self._tokens.wait_time(tokens, now),
+                )
+                if wait <= 0:
+                    self._requests.consume(1)
+                    self._tokens.consume(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 1) -> AsyncIterator[None]:
+        """
+        Hold one concurrency slot for the duration of an API call.
+        """
+        async with self._semaphore:
+            await self.acquire(tokens)
+            yield
+
+    def record_usage(self, extra_tokens: int) -> None:
+        """
+        Charge the difference between actual and estimated token usage.
+        """
+        if extra_tokens > 0:
+            self._tokens.consume(extra_tokens)
+
+    def penalize(self, retry_after: Optional[float]) -> None:
+        """
+        Block all callers for `retry_after` seconds after a 429 response.
+        """
+        delay = max(retry_after, 0.0) if retry_after is not None else 1.0
+        self._blocked_until = max(
+            self._blocked_until, time.monotonic() + delay)
+        self._requests.drain()
@@ -0,0 +1,164 @@
+"""
+Deterministic regex extraction of rental fields, run before the LLM.
+"""
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_scraper_settings
+from app.db.models import PropertyType
+
+settings = get_scraper_settings()
+
+PRICE_PATTERN = re.compile(
+    r"(?:€\s*(?P<pre>\d{1,2}\.\d{3}|\d{3,4})"
+    r"|(?P<post>\d{1,2}\.\d{3}|\d{3,4})(?:,\d{2})?\s*(?:€|euro\b|eur\b))",
+    re.IGNORECASE,
+)
+TELEPHONE_PATTERN = re.compile(
+    r"(?<![\d+])(?:\+39[\s.-]?)?3\d{2}[\s.-]?\d{3}[\s.-]?\d{3,4}(?!\d)")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}", re.IGNORECASE)
+ISO_DATE_PATTERN = re.compile(r"\b(20\d{2})-(\d{1,2})-(\d{1,2})\b")
+DMY_DATE_PATTERN = re.compile(r"\b(\d{1,2})[/.](\d{1,2})[/.](20\d{2}|\d{2})\b")
+STREET_PATTERN = re.compile(
+    r"\b(?P<keyword>(?i:via|viale|piazza|piazzale|corso|largo))\s+"
+    # "via WhatsApp", "scrivere via mail": a way to get in touch, not a street
+    r"(?!(?i:whats\s?app|telegram|e-?mail|mail|dm|sms|messaggi[oa]?)\b)"
+    r"(?:(?i:de[il]?|della|dei|degli|di|san|santa)\s+)?"
+    r"[A-ZÀ-Ý][\w'’À-ÿ]*(?:\s+[A-ZÀ-Ý][\w'’À-ÿ]*)*"
+    r"(?:\s*,?\s*\d{1,3}[a-zA-Z]?\b(?!\s*(?:€|euro|eur)))?",
+)
+
+# Checked in order: a room listing often also mentions "appartamento"
+PROPERTY_TYPE_GROUPS: Tuple[Dict[PropertyType, re.Pattern], ...] = (
+    {
+        PropertyType.camera_singola: re.compile(
+            r"\b(?:camera|stanza)\s+singola\b|\bsingola\b", re.IGNORECASE),
+        PropertyType.camera_doppia: re.compile(
+            r"\b(?:camera|stanza)\s+doppia\b|\bposto\s+letto\b|\bdoppia\b", re.IGNORECASE),
+    },
+    {
+        PropertyType.monolocale: re.compile(r"\bmonolocale\b", re.IGNORECASE),
+        PropertyType.appartamento: re.compile(
+            r"\b(?:appartamento|bilocale|trilocale|quadrilocale)\b", re.IGNORECASE),
+    },
+)
+ZONE_PATTERNS: Dict[str, re.Pattern] = {
+    "Leonardo": re.compile(r"\bleonardo\b", re.IGNORECASE),
+    "Città Studi": re.compile(r"\bcitt[àa]\s+studi\b", re.IGNORECASE),
+    "Bovisa": re.compile(r"\bbovisa\b", re.IGNORECASE),
+}
+
+MIN_PRICE = 100
+MAX_PRICE = 5000
+
+
+class RuleBasedExtractor:
+    """
+    Fill unambiguous fields locally so the LLM is skipped or asked for less.
+
+    Every rule only returns a value when the text contains exactly one
+    candidate; ambiguous fields are left for the LLM.
+    """
+
+    def __init__(self, required_fields: Optional[Sequence[str]] = None):
+        self.required_fields = tuple(
+            required_fields or settings.LLM_REQUIRED_FIELDS)
+        self.llm_calls_saved = 0
+        self.prompt_tokens_saved = 0
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Return the fields that could be extracted without the LLM.
+        """
+        extracted: Dict[str, Any] = {
+            "price": self._extract_price(text),
+            "telephone": self._single(TELEPHONE_PATTERN.findall(text)),
+            "email": self._single(EMAIL_PATTERN.findall(text)),
+            "property_type": self._extract_property_type(text),
+            "location": self._extract_location(text),
+        }
+        start, end = self._extract_dates(text)
+        extracted["available_start"] = start
+        extracted["available_end"] = end
+        return {name: value for name, value in extracted.items() if value is not None}
+
+    def missing_required(self, extracted: Dict[str, Any]) -> List[str]:
+        return [name for name in self.required_fields if name not in extracted]
+
+    def record_savings(self, prompt_tokens: int, skipped_call: bool) -> None:
+        self.prompt_tokens_saved += max(0, prompt_tokens)
+        if skipped_call:
+            self.llm_calls_saved += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "llm_calls_saved": self.llm_calls_saved,
+            "llm_prompt_tokens_saved": self.prompt_tokens_saved,
+        }
+
+    @staticmethod
+    def _single(matches: List[str]) -> Optional[str]:
+        """The match when all candidates agree, otherwise None."""
+        values = {match.strip() for match in matches}
+        return values.pop() if len(values) == 1 else None
+
+    @staticmethod
+    def _extract_price(text: str) -> Optional[float]:
+        prices = set()
+        for match in PRICE_PATTERN.finditer(text):
+            raw = (match.group("pre") or match.group("post")).replace(".", "")
+            value = float(raw)
+            if MIN_PRICE <= value <= MAX_PRICE:
+                prices.add(value)
+        return prices.pop() if len(prices) == 1 else None
+
+    @staticmethod
+    def _extract_property_type(text: str) -> Optional[str]:
+        for patterns in PROPERTY_TYPE_GROUPS:
+            found = [ptype for ptype, pattern in patterns.items()
+                     if pattern.search(text)]
+            if len(found) == 1:
+                return found[0].value
+            if found:
+                return None
+        return None
+
+    @staticmethod
+    def _extract_location(text: str) -> Optional[str]:
+        streets, capitalised = set(), set()
+        for match in STREET_PATTERN.finditer(text):
+            street = re.sub(r"\s+", " ", match.group(0)).strip(" ,")
+            streets.add(street)
+            if match.group("keyword")[0].isupper():
+                capitalised.add(street)
+        if capitalised:
+            return capitalised.pop() if len(capitalised) == 1 else None
+        zones = [zone for zone, pattern in ZONE_PATTERNS.items()
+                 if pattern.search(text)]
+        if zones:
+            return zones[0] if len(zones) == 1 else None
+        # A lowercase "via" may just mean "by"; trusted only without a zone
+        return streets.pop() if len(streets) == 1 else None
+
+    @staticmethod
+    def _extract_dates(text: str) -> Tuple[Optional[str], Optional[str]]:
+        dates = []
+        for year, month, day in ISO_DATE_PATTERN.findall(text):
+            dates.append(_safe_date(int(year), int(month), int(day)))
+        for day, month, year in DMY_DATE_PATTERN.findall(text):
+            year = int(year) + 2000 if len(year) == 2 else int(year)
+            dates.append(_safe_date(year, int(month), int(day)))
+        dates = sorted({d for d in dates if d is not None})
+        if len(dates) == 1:
+            return dates[0].isoformat(), None
+        if len(dates) == 2:
+            return dates[0].isoformat(), dates[1].isoformat()
+        return None, None
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
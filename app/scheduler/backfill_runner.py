@@ -0,0 +1,186 @@
+"""
+Backfill channel history older than the scheduler's scraping window.
+
+Walks message ids oldest first in fixed-size ranges, each run through the
+scraping pipeline (parallel parsing, bulk saves). After every range its last
+id is stored as a checkpoint under "backfill:<channel>" in scrape_state, so
+a killed backfill resumes with the next range; LLM results of a range that
+was cut short are found again in the LLM cache.
+
+History ends at the scheduler's high-water mark, or the newest message when
+the scheduler never ran. Near-duplicates are not checked, since history is
+loaded after newer listings: run near_duplicates_runner afterwards.
+
+Usage:
+    python -m app.scheduler.backfill_runner [--since 2025-01-01] [--chunk-size 1000]
+        [--parse-workers 4] [--until-id N] [--channel @name]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import get_scraper_settings
+from app.core.logger import setup_logging
+from app.db.manage_db import async_session
+from app.db.repositories.scrape_state import ScrapeStateRepository
+from app.dependencies.repo import get_data_version_repository, get_rental_repository
+from app.dependencies.scrape import (
+    close_distance_client,
+    get_commute_cache,
+    get_distance_client,
+    get_llm_cache,
+    get_llm_parser,
+    get_rule_extractor,
+    get_scrape_state,
+    get_telegram_client,
+)
+from app.scraping.scraper_service import ScrapingService
+
+settings = get_scraper_settings()
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PREFIX = "backfill:"
+
+
+def checkpoint_key(channel: str) -> str:
+    """scrape_state key of a channel's backfill checkpoint."""
+    return f"{CHECKPOINT_PREFIX}{channel}"
+
+
+async def run_backfill(
+    service: ScrapingService,
+    state: ScrapeStateRepository,
+    first_id: int,
+    last_id: int,
+    chunk_size: int,
+    channel: Optional[str] = None,
+) -> dict:
+    """
+    Process message ids after `first_id` up to `last_id` of a channel (the
+    client's first by default), one range at a time.
+
+    The checkpoint only moves past a range once it is saved; a failing range
+    stops the backfill so it is retried on the next run.
+
+    Returns:
+        dict: Totals of the processed ranges
+    """
+    channel = channel or service.telegram_client.channel_name
+    totals = {"chunks": 0, "messages_fetched": 0, "messages_saved": 0,
+              "duplicates_skipped": 0, "llm_calls_saved": 0, "errors": []}
+    total_ids = max(last_id - first_id, 0)
+    started = time.monotonic()
+
+    checkpoint = first_id
+    while checkpoint < last_id:
+        chunk_end = min(checkpoint + chunk_size, last_id)
+        results = await service.scrape_and_process_messages(
+            max_messages=None, min_id=checkpoint, max_id=chunk_end + 1,
+            channels=[channel])
+        for name in ("messages_fetched", "messages_saved",
+                     "duplicates_skipped", "llm_calls_saved"):
+            totals[name] += results[name]
+        if results["errors"]:
+            totals["errors"].extend(results["errors"])
+            logger.error(
+                f"Backfill stopped at message {checkpoint}: {results['errors']}")
+            break
+
+        checkpoint = chunk_end
+        await state.set_last_message_id(checkpoint_key(channel), checkpoint)
+        totals["chunks"] += 1
+
+        elapsed = time.monotonic() - started
+        done = checkpoint - first_id
+        eta = timedelta(seconds=round(elapsed * (total_ids - done) / done))
+        logger.info(
+            f"Backfill {done}/{total_ids} ids ({100 * done / total_ids:.1f}%): "
+            f"{totals['messages_fetched']} listings, {totals['messages_saved']} saved, "
+            f"{totals['messages_fetched'] / elapsed:.1f} listings/s, "
+            f"{done / elapsed:.0f} ids/s, ETA {eta}")
+
+    totals["last_message_id"] = checkpoint
+    return totals
+
+
+async def backfill(
+    since: Optional[datetime],
+    chunk_size: int,
+    parse_workers: int,
+    until_id: Optional[int] = None,
+    channel: Optional[str] = None,
+) -> dict:
+    telegram_client = get_telegram_client()
+    channel = channel or telegram_client.channel_name
+    # As in scrape_job, each cache gets its own session
+    async with async_session() as db, async_session() as cache_db, \
+            async_session() as commute_db:
+        state = get_scrape_state(db)
+        service = ScrapingService(
+            telegram_client,
+            get_llm_parser(get_llm_cache(cache_db)),
+            get_rental_repository(db),
+            get_rule_extractor(),
+            commute_cache=get_commute_cache(commute_db),
+            distance_client=get_distance_client(),
+            data_version=get_data_version_repository(db),
+        )
+        service.parse_workers = parse_workers
+
+        # One connection for all ranges
+        await telegram_client.connect()
+        try:
+            first_id = await state.get_last_message_id(checkpoint_key(channel))
+            if first_id is not None:
+                logger.info(f"Resuming backfill of {channel} after message {first_id}")
+            elif since is not None:
+                first_id = await telegram_client.get_message_id_before(since, channel)
+            else:
+                first_id = 0
+
+            last_id = (until_id
+                       or await state.get_last_message_id(channel)
+                       or await telegram_client.get_latest_message_id(channel))
+            logger.info(f"Backfilling {channel}: messages {first_id + 1} to {last_id}")
+            return await run_backfill(
+                service, state, first_id, last_id, chunk_size, channel)
+        finally:
+            await telegram_client.disconnect()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill channel history")
+    parser.add_argument("--since", type=datetime.fromisoformat,
+                        help="Start from this date on the first run (default: channel start)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Message ids per checkpointed range")
+    parser.add_argument("--parse-workers", type=int,
+                        default=settings.PIPELINE_PARSE_WORKERS)
+    parser.add_argument("--until-id", type=int,
+                        help="Last message id to backfill")
+    parser.add_argument("--channel",
+                        help="Channel to backfill (default: the first configured one)")
+    args = parser.parse_args()
+
+    since = args.since
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    try:
+        totals = await backfill(
+            since, args.chunk_size, args.parse_workers, args.until_id, args.channel)
+    finally:
+        await close_distance_client()
+    logger.info(f"Backfill done: {totals}")
+    if totals["errors"]:
+        raise RuntimeError("; ".join(totals["errors"]))
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        raise Exception(f"Failed to run backfill: {e}") from e
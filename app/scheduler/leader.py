@@ -0,0 +1,184 @@
+"""
+Leader election and sharding of scrape work between scheduler replicas.
+
+Each shard (the whole scrape in "leader" mode, a channel in "shard" mode)
+is a session-level Postgres advisory lock. A replica holds its locks on one
+dedicated connection, so they last exactly as long as that connection:
+Postgres releases them when the replica exits, crashes or drops off the
+network (TCP keepalives detect a silent peer within the lease). Replicas
+retry free locks every election round, which bounds failover to about the
+lease plus one round.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.metrics import SCHEDULER_SHARDS_HELD
+
+logger = logging.getLogger(__name__)
+
+LEADER_SHARD = "scheduler"
+LOCK_NAMESPACE = "polihouse:scrape:"
+
+
+def lock_key(shard: str) -> int:
+    """Stable signed 64-bit advisory lock key of a shard."""
+    digest = hashlib.blake2b(f"{LOCK_NAMESPACE}{shard}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class AdvisoryLocks:
+    """
+    Advisory locks on a dedicated connection, opened on first use and
+    reopened after it failed (all locks are gone by then).
+    """
+
+    def __init__(self, url: str, lease_seconds: int):
+        self.lease_seconds = lease_seconds
+        # Keepalives make the server close the session of a replica it can
+        # no longer reach, releasing its locks
+        idle = max(1, lease_seconds // 3)
+        interval = max(1, lease_seconds // 9)
+        self.engine = create_async_engine(
+            url,
+            poolclass=NullPool,
+            connect_args={
+                "statement_cache_size": 0,
+                "server_settings": {
+                    "application_name": "house-scraper-scheduler",
+                    "tcp_keepalives_idle": str(idle),
+                    "tcp_keepalives_interval": str(interval),
+                    "tcp_keepalives_count": "3",
+                },
+            },
+        )
+        self._conn: Optional[AsyncConnection] = None
+
+    async def _connection(self) -> AsyncConnection:
+        if self._conn is None:
+            self._conn = await self.engine.connect()
+            # Autocommit: lock calls must not leave a transaction open
+            self._conn = await self._conn.execution_options(isolation_level="AUTOCOMMIT")
+        return self._conn
+
+    async def _scalar(self, sql: str, **params):
+        conn = await self._connection()
+        result = await asyncio.wait_for(
+            conn.execute(text(sql), params), timeout=self.lease_seconds)
+        return result.scalar()
+
+    async def try_lock(self, shard: str) -> bool:
+        return bool(await self._scalar(
+            "SELECT pg_try_advisory_lock(:key)", key=lock_key(shard)))
+
+    async def unlock(self, shard: str) -> None:
+        await self._scalar("SELECT pg_advisory_unlock(:key)", key=lock_key(shard))
+
+    async def ping(self) -> bool:
+        """Whether the connection, and so every lock taken on it, is alive."""
+        if self._conn is None:
+            return False
+        try:
+            await self._scalar("SELECT 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Lock connection lost: {e}")
+            await self.close()
+            return False
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                await conn.close()
+            except Exception:
+                # The server already dropped the session, and the locks with it
+                await conn.invalidate()
+
+
+class ShardElection:
+    """
+    Shards of scrape work held by this replica.
+
+    A replica takes at most its fair share, ceil(shards / replicas), and one
+    new shard per round, so replicas started together spread the shards out.
+    A shard left free for a whole lease (its replica is gone) is taken over
+    regardless of the fair share.
+    """
+
+    def __init__(
+        self,
+        locks: AdvisoryLocks,
+        shards: Sequence[str],
+        replicas: int = 1,
+        lease_seconds: int = 30,
+    ):
+        self.locks = locks
+        self.shards = list(shards)
+        self.fair_share = math.ceil(len(self.shards) / max(replicas, 1))
+        self.lease_seconds = lease_seconds
+        self.held: Set[str] = set()
+        self._free_since: Dict[str, float] = {}
+        # Replicas try free shards in different orders
+        self._offset = random.randrange(len(self.shards)) if self.shards else 0
+
+    def _order(self) -> List[str]:
+        return self.shards[self._offset:] + self.shards[:self._offset]
+
+    async def refresh(self) -> Set[str]:
+        """
+        Check the held shards and try to take free ones.
+
+        Returns:
+            Set[str]: Shards newly acquired in this round
+        """
+        if self.held and not await self.locks.ping():
+            # Retried next round, leaving other replicas a chance to take over
+            logger.warning(f"Lost scrape shards {sorted(self.held)}")
+            self.held.clear()
+            SCHEDULER_SHARDS_HELD.set(0)
+            return set()
+
+        acquired: Set[str] = set()
+        now = time.monotonic()
+        try:
+            for shard in self._order():
+                if shard in self.held:
+                    continue
+                if acquired:
+                    break
+                if not await self.locks.try_lock(shard):
+                    self._free_since.pop(shard, None)
+                    continue
+                orphaned = now - self._free_since.setdefault(shard, now) >= self.lease_seconds
+                if len(self.held) < self.fair_share or orphaned:
+                    self.held.add(shard)
+                    self._free_since.pop(shard, None)
+                    acquired.add(shard)
+                else:
+                    # Leave it to a replica below its share, for now
+                    await self.locks.unlock(shard)
+        except Exception as e:
+            logger.warning(f"Scrape shard election failed: {e}")
+            if not await self.locks.ping():
+                self.held.clear()
+                acquired.clear()
+
+        if acquired:
+            logger.info(f"Acquired scrape shards {sorted(acquired)}")
+        SCHEDULER_SHARDS_HELD.set(len(self.held))
+        return acquired
+
+    async def release(self) -> None:
+        """Give up every shard, e.g. on shutdown, for a fast handover."""
+        self.held.clear()
+        SCHEDULER_SHARDS_HELD.set(0)
+        await self.locks.close()
@@ -0,0 +1,221 @@
+"""
+Ingest listings as they are posted, over one persistent Telegram connection.
+
+New and edited messages of every channel are pushed by Telegram and run
+through the scraping pipeline in micro-batches: a batch closes after
+LISTENER_BATCH_SIZE messages or LISTENER_BATCH_WAIT_SECONDS after its first
+one, whichever comes first. An edit overwrites the listing saved for its
+message.
+
+Messages missed while disconnected are picked up by a regular polling
+scrape, run at startup and every LISTENER_RECONCILE_MINUTES; it also moves
+the high-water marks, so a later scheduler run starts where it left off.
+
+Replaces scheduler_runner; run a single instance (it takes no part in the
+scheduler replicas' election).
+
+Usage:
+    python -m app.scheduler.listener_runner
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import get_scraper_settings
+from app.core.logger import setup_logging
+from app.core.metrics import INGEST_LATENCY_SECONDS, start_exporter
+from app.db.manage_db import async_session
+from app.db.models import TelegramMessageData
+from app.dependencies.repo import get_data_version_repository, get_rental_repository
+from app.dependencies.scrape import (
+    close_distance_client,
+    get_commute_cache,
+    get_distance_client,
+    get_llm_cache,
+    get_llm_parser,
+    get_near_duplicate_index,
+    get_rule_extractor,
+    get_scrape_state,
+    get_telegram_client,
+)
+from app.scraping.scraper_service import ScrapingService
+from app.telegram.client import TelegramClientWrapper
+from app.utility.minhash import LSHIndex
+
+settings = get_scraper_settings()
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class Listener:
+    """
+    Micro-batches pushed messages into the scraping service.
+
+    Every batch and reconciliation gets a service on fresh sessions from
+    `open_service`. They run one at a time and share the near-duplicate
+    index, reseeded from the database by each reconciliation so it stays
+    within NEAR_DUPLICATE_WINDOW.
+    """
+
+    def __init__(
+        self,
+        open_service: Callable[[], AsyncContextManager[ScrapingService]],
+        batch_size: int,
+        batch_wait: float,
+    ):
+        self.open_service = open_service
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # Seeded by the last reconciliation
+        self.near_duplicates: Optional[LSHIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def push(self, message: TelegramMessageData) -> None:
+        """Queue a message for the next batch (the client's listener callback)."""
+        await self.queue.put(message)
+
+    async def next_batch(self) -> List[TelegramMessageData]:
+        """
+        Wait for a message, then collect more until the batch is full or
+        `batch_wait` has passed.
+
+        Several versions of a message in a batch are merged into the latest
+        one; a new message edited before it was saved stays new.
+        """
+        loop = asyncio.get_running_loop()
+        batch: Dict[Tuple[Optional[str], int], TelegramMessageData] = {}
+
+        def add(message: TelegramMessageData) -> None:
+            key = (message.channel, message.id)
+            earlier = batch.get(key)
+            if earlier is not None and not earlier.is_edit:
+                message = message.model_copy(update={"is_edit": False})
+            batch[key] = message
+
+        add(await self.queue.get())
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                add(await asyncio.wait_for(self.queue.get(), timeout))
+            except TimeoutError:
+                break
+        return list(batch.values())
+
+    async def process_batch(self, batch: List[TelegramMessageData]) -> dict:
+        """Run a batch through the pipeline and record its ingest latency."""
+        async with self._lock, self.open_service() as service:
+            if self.near_duplicates is not None:
+                service.use_near_duplicate_index(self.near_duplicates)
+            results = await service.process_messages(batch)
+            if service.near_duplicates_loaded:
+                # The first batch may run before the first reconciliation
+                self.near_duplicates = service.near_duplicates
+        now = datetime.now(timezone.utc)
+        for message in batch:
+            if not message.is_edit:
+                INGEST_LATENCY_SECONDS.observe(
+                    max((now - message.date).total_seconds(), 0))
+        return results
+
+    async def run_batches(self) -> None:
+        """Process batches forever; a failed batch is left to reconciliation."""
+        while True:
+            batch = await self.next_batch()
+            try:
+                results = await self.process_batch(batch)
+            except Exception as e:
+                logger.error(f"❌ Batch of {len(batch)} messages failed: {e}")
+                continue
+            logger.info(f"✅ Processed {len(batch)} pushed messages: {results}")
+
+    async def reconcile_once(self) -> dict:
+        """Purge expired cache entries and poll the channels."""
+        async with self._lock, self.open_service() as service:
+            purged = await service.llm_parser.cache.purge_expired()
+            if purged:
+                logger.info(f"Evicted {purged} expired LLM cache entries")
+            purged = await service.commute_cache.purge_expired(
+                datetime.utcnow() - settings.COMMUTE_CACHE_TTL)
+            if purged:
+                logger.info(f"Evicted {purged} expired commute cache entries")
+
+            since = datetime.now(timezone.utc) - settings.SCRAPE_SINCE_DELTA
+            results = await service.scrape_and_process_messages(
+                max_messages=100, since=since)
+            if service.near_duplicates_loaded:
+                self.near_duplicates = service.near_duplicates
+        return results
+
+    async def reconcile(self, interval_minutes: int) -> None:
+        """Poll the channels now and every `interval_minutes`."""
+        while True:
+            try:
+                results = await self.reconcile_once()
+                logger.info(f"✅ Reconciliation completed: {results}")
+            except Exception as e:
+                logger.error(f"❌ Reconciliation failed: {e}")
+            await asyncio.sleep(interval_minutes * 60)
+
+
+def service_opener(
+    telegram_client: TelegramClientWrapper,
+) -> Callable[[], AsyncContextManager[ScrapingService]]:
+    """Build services sharing the Telegram client, each on its own sessions."""
+
+    @asynccontextmanager
+    async def open_service() -> AsyncIterator[ScrapingService]:
+        # As in scrape_job, each cache gets its own session
+        async with async_session() as db, async_session() as cache_db, \
+                async_session() as commute_db:
+            yield ScrapingService(
+                telegram_client,
+                get_llm_parser(get_llm_cache(cache_db)),
+                get_rental_repository(db),
+                get_rule_extractor(),
+                commute_cache=get_commute_cache(commute_db),
+                distance_client=get_distance_client(),
+                scrape_state=get_scrape_state(db),
+                data_version=get_data_version_repository(db),
+                near_duplicates=get_near_duplicate_index()
+            )
+
+    return open_service
+
+
+async def listen(telegram_client: TelegramClientWrapper) -> None:
+    await telegram_client.run_until_disconnected()
+    raise RuntimeError("Telegram connection closed")
+
+
+async def main():
+    if settings.METRICS_ENABLED:
+        start_exporter(settings.SCHEDULER_METRICS_PORT)
+    telegram_client = get_telegram_client()
+    listener = Listener(
+        service_opener(telegram_client),
+        settings.LISTENER_BATCH_SIZE, settings.LISTENER_BATCH_WAIT_SECONDS)
+
+    await telegram_client.connect()
+    telegram_client.add_listener(listener.push)
+    logger.info(f"👂 Listening to {', '.join(telegram_client.channel_names)}")
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(listen(telegram_client))
+            tg.create_task(listener.run_batches())
+            tg.create_task(listener.reconcile(settings.LISTENER_RECONCILE_MINUTES))
+    finally:
+        await telegram_client.disconnect()
+        await close_distance_client()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        raise Exception(f"Failed to run listener: {e}") from e
@@ -0,0 +1,108 @@
+"""
+Batch job: sign stored rentals with MinHash and flag near-duplicates.
+
+Rows are visited oldest first, so the earliest post of a cluster stays the
+original and every later copy gets duplicate_of pointing to it. Existing
+links are kept; run it after adding the columns or changing the threshold.
+
+Usage:
+    python -m app.scheduler.near_duplicates_runner [--threshold 0.7] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from app.core.config import get_scraper_settings
+from app.core.logger import setup_logging
+from app.db.manage_db import async_session
+from app.db.repositories.data_version import DataVersionRepository
+from app.db.repositories.rental import RentalRepository
+from app.utility.minhash import (
+    LSHIndex,
+    minhash_signature,
+    signature_from_bytes,
+    signature_to_bytes,
+)
+
+settings = get_scraper_settings()
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def cluster_near_duplicates(threshold: float, batch_size: int) -> dict:
+    """
+    Compute missing signatures and link near-duplicates to their original.
+
+    Returns:
+        dict: Summary of the run
+    """
+    summary = {"rows": 0, "signed": 0, "flagged": 0, "clusters": 0}
+    index = LSHIndex(threshold)
+    originals_with_copies = set()
+    started = time.monotonic()
+
+    # Reads stream through a server-side cursor, so writes use a second session
+    async with async_session() as read_db, async_session() as write_db:
+        reader = RentalRepository(read_db)
+        writer = RentalRepository(write_db)
+        async for batch in reader.stream_for_clustering(batch_size):
+            updates = []
+            for rental_id, raw_text, stored_signature, duplicate_of in batch:
+                summary["rows"] += 1
+                changes = {}
+                if stored_signature is not None:
+                    signature = signature_from_bytes(stored_signature)
+                else:
+                    signature = minhash_signature(raw_text)
+                    if signature is None:
+                        continue
+                    changes["minhash_signature"] = signature_to_bytes(signature)
+                    summary["signed"] += 1
+
+                if duplicate_of is None:
+                    match = index.query(signature)
+                    if match is None:
+                        index.add(rental_id, signature)
+                    else:
+                        changes["duplicate_of"] = match[0]
+                        originals_with_copies.add(match[0])
+                        summary["flagged"] += 1
+                else:
+                    originals_with_copies.add(duplicate_of)
+
+                if changes:
+                    updates.append({"id": rental_id, **changes})
+
+            # Group rows by the columns they set, one executemany each
+            for keys in {tuple(sorted(row)) for row in updates}:
+                await writer.update_near_duplicates(
+                    [row for row in updates if tuple(sorted(row)) == keys])
+            logger.info(
+                f"Processed {summary['rows']} rentals, flagged {summary['flagged']}")
+
+        if summary["flagged"]:
+            # API processes drop their cached responses (hide_duplicates)
+            await DataVersionRepository(write_db).bump()
+
+    summary["clusters"] = len(originals_with_copies)
+    summary["seconds"] = round(time.monotonic() - started, 1)
+    return summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Flag near-duplicate rentals")
+    parser.add_argument("--threshold", type=float,
+                        default=settings.NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    summary = await cluster_near_duplicates(args.threshold, args.batch_size)
+    logger.info(f"Near-duplicate clustering done: {summary}")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        raise Exception(f"Failed to cluster near-duplicates: {e}") from e
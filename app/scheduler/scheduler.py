@@ -1,33 +1,95 @@
 import asyncio
 import logging
 from datetime import datetime, timezone
+from typing import List, Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from app.core.config import settings
-from app.dependencies.scrape import get_telegram_client, get_llm_parser
-from app.dependencies.repo import get_rental_repository
+from app.core.config import get_scraper_settings
+from app.dependencies.scrape import (
+    get_telegram_client,
+    get_llm_parser,
+    get_llm_cache,
+    get_rule_extractor,
+    get_commute_cache,
+    get_distance_client,
+    get_scrape_state,
+    get_near_duplicate_index,
+    get_shard_election,
+)
+from app.dependencies.repo import get_data_version_repository, get_rental_repository
 from app.db.manage_db import get_async_session, async_session
 from app.scraping.scraper_service import ScrapingService
+
+settings = get_scraper_settings()
 logger = logging.getLogger(__name__)
 
 
+SCRAPE_JOB_ID = "main_scrape_job"
+ELECTION_JOB_ID = "shard_election_job"
+
 scheduler = AsyncIOScheduler()
+# Set when replicas coordinate (SCHEDULER_COORDINATION)
+election = get_shard_election()
+_scrape_task: Optional[asyncio.Task] = None
+
+
+def scraped_channels() -> Optional[List[str]]:
+    """Channels this replica scrapes; None for all of them."""
+    if election is None or settings.SCHEDULER_COORDINATION != "shard":
+        return None
+    return sorted(election.held)
+
+
+async def election_job():
+    """Keep this replica's shards, take free ones and scrape them right away."""
+    held = set(election.held)
+    acquired = await election.refresh()
+    if held - election.held and _scrape_task is not None:
+        # Another replica may take over: stop before saving the same listings
+        logger.warning("⚠️ Lost scrape shards, cancelling the running scrape job")
+        _scrape_task.cancel()
+    if acquired:
+        scheduler.modify_job(SCRAPE_JOB_ID, next_run_time=datetime.now(timezone.utc))
 
 
 async def scrape_job():
     """Simple scraping job - does the main work."""
+    global _scrape_task
+    if election is not None and not election.held:
+        logger.info("Standby replica, another one is scraping")
+        return
     logger.info("🚀 Starting scrape job...")
+    _scrape_task = asyncio.current_task()
 
     try:
         # Get what we need
-        async with async_session() as db:
-            # NOTE we just need one session, when using Depends it already creates just one session
+        # The pipeline stages run concurrently, so each cache gets its own
+        # session; the service serializes its use of `db`
+        async with async_session() as db, async_session() as cache_db, \
+                async_session() as commute_db:
+            llm_cache = get_llm_cache(cache_db)
+            purged = await llm_cache.purge_expired()
+            if purged:
+                logger.info(f"Evicted {purged} expired LLM cache entries")
+
+            commute_cache = get_commute_cache(commute_db)
+            purged = await commute_cache.purge_expired(
+                datetime.utcnow() - settings.COMMUTE_CACHE_TTL)
+            if purged:
+                logger.info(f"Evicted {purged} expired commute cache entries")
+
             scraping_service = ScrapingService(
                 get_telegram_client(),
-                get_llm_parser(),
-                get_rental_repository(db)
+                get_llm_parser(llm_cache),
+                get_rental_repository(db),
+                get_rule_extractor(),
+                commute_cache=commute_cache,
+                distance_client=get_distance_client(),
+                scrape_state=get_scrape_state(db),
+                data_version=get_data_version_repository(db),
+                near_duplicates=get_near_duplicate_index()
             )
 
             # Do the work
@@ -36,12 +98,18 @@ async def scrape_job():
             results = await scraping_service.scrape_and_process_messages(
                 max_messages=100,
                 since=since,
+                channels=scraped_channels(),
             )
             logger.info(f"✅ Scrape job completed: {results}")
             logger.info(f"✅ Job done: {results}")
 
+    except asyncio.CancelledError:
+        # The high-water mark only moves after a complete run
+        logger.warning("Scrape job cancelled")
     except Exception as e:
         logger.error(f"❌ Job failed: {e}")
+    finally:
+        _scrape_task = None
 
 
 def start_scheduler():
@@ -50,14 +118,26 @@ def start_scheduler():
         logger.info("Scheduler already running")
         return
 
+    now = datetime.now(timezone.utc)
+    # Coordinated replicas start scraping once elected (election_job)
+    first_run = {"next_run_time": now} if election is None else {}
     scheduler.add_job(
         scrape_job,
         trigger=IntervalTrigger(minutes=settings.SCRAPE_INTERVAL_MINUTES),
-        id="main_scrape_job",
+        id=SCRAPE_JOB_ID,
         max_instances=1,  # Don't run multiple at once
         replace_existing=True,
-        next_run_time=datetime.now(timezone.utc)
+        **first_run
     )
+    if election is not None:
+        scheduler.add_job(
+            election_job,
+            trigger=IntervalTrigger(seconds=settings.SCHEDULER_ELECTION_INTERVAL_SECONDS),
+            id=ELECTION_JOB_ID,
+            max_instances=1,
+            replace_existing=True,
+            next_run_time=now,
+        )
 
     scheduler.start()
     logger.info(
@@ -69,3 +149,9 @@ def stop_scheduler():
     if scheduler.running:
         scheduler.shutdown(wait=True)
         logger.info("📅 Scheduler stopped")
+
+
+async def release_shards():
+    """Hand this replica's shards over to the others right away."""
+    if election is not None:
+        await election.release()
@@ -1,14 +1,26 @@
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app.scheduler.scheduler import start_scheduler
+from app.scheduler.scheduler import release_shards, start_scheduler, stop_scheduler
+from app.dependencies.scrape import close_distance_client
+from app.core.config import get_scraper_settings
 from app.core.logger import setup_logging
+from app.core.metrics import start_exporter
+
+settings = get_scraper_settings()
 
 setup_logging()
 
 
 async def main():
+    if settings.METRICS_ENABLED:
+        start_exporter(settings.SCHEDULER_METRICS_PORT)
     start_scheduler()
-    await asyncio.Event().wait()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        stop_scheduler()
+        await release_shards()
+        await close_distance_client()
 
 if __name__ == "__main__":
     try:
@@ -2,18 +2,88 @@
 Main scraping service that orchestrates the entire scraping pipeline.
 """
 import logging
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
 from datetime import datetime, timedelta, date
-from app.utility.distances import add_durations
+from uuid import UUID, uuid4
+from app.core.config import get_scraper_settings
+from app.utility.distances import DistanceMatrixClient, add_durations
 from app.telegram.client import TelegramClientWrapper
-from app.parsing.llm_parser import SimpleMistralParser
-from app.db.repositories.rental import RentalRepository
+from app.parsing.llm_parser import (
+    ALL_FIELDS,
+    SimpleMistralParser,
+    build_prompt,
+    with_message_metadata,
+)
+from app.parsing.rate_limiter import estimate_tokens
+from app.parsing.rule_extractor import RuleBasedExtractor
+from app.db.repositories.rental import BulkInsertResult, RentalRepository
+from app.db.repositories.commute_cache import CommuteCacheRepository
+from app.db.repositories.scrape_state import ScrapeStateRepository
+from app.db.repositories.data_version import DataVersionRepository
 from app.db.models import Rental, TelegramMessageData, PropertyType, TenantPreference
-from app.utility.helpers import normalize_tenant_preference, parse_date
+from app.utility.helpers import normalize_tenant_preference, parse_date, rental_fingerprint
+from app.utility.minhash import (
+    LSHIndex,
+    minhash_signature,
+    signature_from_bytes,
+    signature_to_bytes,
+)
+from app.core.metrics import (
+    SCRAPE_FAILURES,
+    SCRAPE_RUN_SECONDS,
+    STAGE_SECONDS,
+    record_scrape_results,
+)
 import asyncio
+import time
+
+settings = get_scraper_settings()
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a pipeline stage's input
+_END = object()
+
+
+def _relink_near_duplicates(rentals: List[Rental], lost: Set[UUID]) -> List[Rental]:
+    """
+    Point copies of originals that were not stored to the first of their
+    copies instead, which becomes the original.
+
+    Returns:
+        List[Rental]: The rentals whose duplicate_of changed
+    """
+    replacements: Dict[UUID, UUID] = {}
+    relinked = []
+    for rental in rentals:
+        original = rental.duplicate_of
+        if original is None or original not in lost:
+            continue
+        rental.duplicate_of = replacements.get(original)
+        replacements.setdefault(original, rental.id)
+        relinked.append(rental)
+    return relinked
+
+
+async def _next_batch(queue: asyncio.Queue, size: int) -> Tuple[list, bool]:
+    """
+    Wait for one item, then take whatever else is already queued, up to size.
+
+    Returns:
+        Tuple of (items, whether the end marker was reached)
+    """
+    items = []
+    item = await queue.get()
+    while item is not _END:
+        items.append(item)
+        if len(items) >= size:
+            return items, False
+        try:
+            item = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return items, False
+    return items, True
+
 
 class ScrapingService:
     """
@@ -24,133 +94,667 @@ class ScrapingService:
         self,
         telegram_client: TelegramClientWrapper,
         llm_parser: SimpleMistralParser,
-        rental_repository: RentalRepository
+        rental_repository: RentalRepository,
+        rule_extractor: Optional[RuleBasedExtractor] = None,
+        parse_mode: Optional[str] = None,
+        commute_cache: Optional[CommuteCacheRepository] = None,
+        distance_client: Optional[DistanceMatrixClient] = None,
+        scrape_state: Optional[ScrapeStateRepository] = None,
+        data_version: Optional[DataVersionRepository] = None,
+        near_duplicates: Optional[LSHIndex] = None
     ):
         self.telegram_client = telegram_client
         self.llm_parser = llm_parser
         self.rental_repository = rental_repository
+        self.rule_extractor = rule_extractor
+        self.parse_mode = parse_mode or settings.LLM_PARSE_MODE
+        self.commute_cache = commute_cache
+        self.distance_client = distance_client
+        self.scrape_state = scrape_state
+        self.data_version = data_version
+        # Seeded from stored signatures on the first run
+        self.near_duplicates = near_duplicates
+        self.near_duplicate_action = settings.NEAR_DUPLICATE_ACTION
+        self._near_duplicates_loaded = False
+        # (channel, message id) -> (rental id, signature, duplicate_of) until saved
+        self._near_duplicate_info: Dict[
+            Tuple[Optional[str], int], Tuple[UUID, bytes, Optional[UUID]]] = {}
+        # Originals of this run's near-duplicates that failed to parse
+        self._lost_originals: Set[UUID] = set()
+        # Lowest message id per channel that failed to parse in this run
+        self._failed_message_ids: Dict[Optional[str], int] = {}
+        self.queue_size = settings.PIPELINE_QUEUE_SIZE
+        self.batch_size = settings.PIPELINE_BATCH_SIZE
+        self.parse_workers = settings.PIPELINE_PARSE_WORKERS
+        # Stages run concurrently; the rental repository and scrape state
+        # share one session, which must not be used by two of them at once
+        self._db_lock = asyncio.Lock()
+
+    @property
+    def near_duplicates_loaded(self) -> bool:
+        """Whether the near-duplicate index was seeded from stored rentals."""
+        return self._near_duplicates_loaded
+
+    def use_near_duplicate_index(self, index: LSHIndex) -> None:
+        """Share an index seeded by an earlier service, instead of loading one."""
+        self.near_duplicates = index
+        self._near_duplicates_loaded = True
 
     async def scrape_and_process_messages(
         self,
         since: Optional[datetime] = None,
-        max_messages: int = 50
+        max_messages: Optional[int] = 50,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        channels: Optional[Sequence[str]] = None
     ) -> dict:
         """
-        Complete scraping pipeline: fetch -> parse -> store.
+        Complete scraping pipeline: fetch -> parse -> geocode -> store.
+
+        The stages run concurrently and hand micro-batches to each other
+        through bounded queues: listings are saved while later messages are
+        still downloading, and a slow stage (usually the LLM) pauses the
+        stages before it instead of piling messages up in memory.
+
+        All `channels` (default: the client's) are fetched concurrently into
+        the same pipeline, up to `max_messages` listings each. A channel that
+        cannot be fetched is reported under its name in `results["channels"]`
+        and in `results["errors"]`; the others are still processed.
+
+        With `min_id` only the messages between `min_id` and `max_id`
+        (exclusive) of a single channel are processed, as by the backfill
+        runner; the stored high-water mark is neither used nor updated.
 
         Returns:
             dict: Summary of processing results
         """
-        results = {
+        channels = list(channels or self.telegram_client.channel_names)
+        if min_id is not None and len(channels) != 1:
+            raise ValueError("min_id applies to a single channel")
+        results = self._new_results(channels)
+
+        async def fetch(outbox: asyncio.Queue) -> None:
+            await self._fetch_stage(
+                channels, since, max_messages, outbox, results, min_id, max_id)
+
+        async def store_marks() -> None:
+            if min_id is None:
+                await self._store_high_water_marks(channels)
+
+        return await self._run_pipeline(fetch, results, store_marks)
+
+    async def process_messages(
+        self, messages: Sequence[TelegramMessageData]
+    ) -> dict:
+        """
+        Parse, geocode and store messages received otherwise, e.g. pushed
+        to the listener.
+
+        Edited messages (`is_edit`) overwrite the listing stored for them,
+        or are saved as new ones when there is none. High-water marks are
+        left to the polling fetches, which pick up any message missed in
+        between; already saved ones are skipped there before the LLM.
+
+        Returns:
+            dict: Summary of processing results, as scrape_and_process_messages
+        """
+        results = self._new_results(
+            sorted({message.channel for message in messages if message.channel}))
+
+        async def push(outbox: asyncio.Queue) -> None:
+            for message in messages:
+                results["messages_fetched"] += 1
+                counts = results["channels"].get(message.channel)
+                if counts is not None:
+                    counts["messages_fetched"] += 1
+                await outbox.put(message)
+            for _ in range(self.parse_workers):
+                await outbox.put(_END)
+
+        return await self._run_pipeline(push, results)
+
+    @staticmethod
+    def _new_results(channels: Sequence[str]) -> dict:
+        return {
             "messages_fetched": 0,
             "messages_parsed": 0,
             "messages_saved": 0,
+            "messages_updated": 0,
+            "duplicates_skipped": 0,
+            "near_duplicates": 0,
+            "llm_cache_hits": 0,
+            "llm_cache_misses": 0,
+            "llm_calls_saved": 0,
+            "llm_prompt_tokens_saved": 0,
+            "channels": {
+                channel: {"messages_fetched": 0, "messages_saved": 0, "error": None}
+                for channel in channels
+            },
             "errors": []
         }
 
+    async def _run_pipeline(
+        self,
+        source: Callable[[asyncio.Queue], Awaitable[None]],
+        results: dict,
+        on_complete: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> dict:
+        """
+        Run the stages on the messages `source` puts in the parse queue
+        (followed by one end marker per parse worker); `on_complete` runs
+        once everything is saved.
+        """
+        stats_before = self._parse_stats()
+        started = time.perf_counter()
+        # Every queue holds about queue_size listings, as messages or batches
+        batch_slots = max(1, self.queue_size // self.batch_size)
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        distance_queue: asyncio.Queue = asyncio.Queue(maxsize=batch_slots)
+        save_queue: asyncio.Queue = asyncio.Queue(maxsize=batch_slots)
+
+        async def close_parse_stage(workers: List[asyncio.Task]) -> None:
+            await asyncio.gather(*workers)
+            await distance_queue.put(_END)
+
         try:
-            # Step 1: Fetch messages from Telegram
             logger.info("Starting message scraping...")
-            messages = await self._fetch_messages(since, max_messages)
-            results["messages_fetched"] = len(messages)
-
-            if not messages:
+            await self._load_near_duplicates()
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(source(parse_queue))
+                parse_workers = [
+                    tg.create_task(self._parse_stage(
+                        parse_queue, distance_queue, results))
+                    for _ in range(self.parse_workers)
+                ]
+                tg.create_task(close_parse_stage(parse_workers))
+                tg.create_task(self._distance_stage(distance_queue, save_queue))
+                tg.create_task(self._save_stage(save_queue, results))
+
+            if not results["messages_fetched"]:
                 logger.info("No new messages found")
-                return results
-
-            # Step 2: Parse messages with LLM
-            logger.info(f"Parsing {len(messages)} messages...")
-            parsed_data = await self._parse_messages(messages)
-            results["messages_parsed"] = len(parsed_data)
-
-            await add_durations(parsed_data, batch_size=20)
-
-            # Step 3: Save to database
-            logger.info("Saving to database...")
-            saved_count = await self._save_rentals(parsed_data)
-            results["messages_saved"] = saved_count
+            if on_complete is not None:
+                await on_complete()
 
             logger.info(f"Scraping completed: {results}")
             return results
 
         except Exception as e:
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
             error_msg = f"Scraping pipeline failed: {e}"
             logger.error(error_msg)
             results["errors"].append(error_msg)
             return results
 
-    async def _fetch_messages(
+        finally:
+            # Left over by messages that were never saved
+            self._near_duplicate_info.clear()
+            self._lost_originals.clear()
+            self._failed_message_ids.clear()
+            for name, value in self._parse_stats().items():
+                results[name] = value - stats_before[name]
+            SCRAPE_RUN_SECONDS.observe(time.perf_counter() - started)
+            record_scrape_results(results)
+
+    async def _fetch_stage(
         self,
+        channels: Sequence[str],
         since: Optional[datetime],
-        max_messages: int
-    ) -> List[TelegramMessageData]:
-        """Fetch messages from Telegram."""
+        max_messages: Optional[int],
+        outbox: asyncio.Queue,
+        results: dict,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None
+    ) -> None:
+        """
+        Stream messages of every channel from Telegram into the parse queue.
+
+        Channels are read concurrently over the one client connection, so a
+        slow channel does not hold the others back; a flood wait applies to
+        the whole account and so to all of them. A connection opened by the
+        caller is left open.
+        """
+        owns_connection = not self.telegram_client.is_connected
+        started = time.perf_counter()
         try:
             await self.telegram_client.connect()
-            messages = await self.telegram_client.fetch_new_messages(since)
+            await asyncio.gather(*(
+                self._fetch_channel(
+                    channel, since, max_messages, outbox, results, min_id, max_id)
+                for channel in channels
+            ))
+        finally:
+            if owns_connection:
+                await self.telegram_client.disconnect()
+            STAGE_SECONDS.labels("fetch").observe(time.perf_counter() - started)
+
+        for _ in range(self.parse_workers):
+            await outbox.put(_END)
 
+    async def _fetch_channel(
+        self,
+        channel: str,
+        since: Optional[datetime],
+        max_messages: Optional[int],
+        outbox: asyncio.Queue,
+        results: dict,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None
+    ) -> None:
+        """
+        Stream one channel's messages; a failure is recorded, not raised.
+
+        When a high-water mark is stored for the channel (or `min_id` is
+        given) only messages after it are fetched; otherwise the `since`
+        window is used.
+        """
+        counts = results["channels"][channel]
+        try:
+            if min_id is None:
+                min_id = await self._load_high_water_mark(channel)
             # Limit messages to avoid overwhelming the LLM API
-            if len(messages) > max_messages:
+            async for message in self.telegram_client.iter_new_messages(
+                    since, min_id=min_id, limit=max_messages, max_id=max_id,
+                    channel=channel):
+                counts["messages_fetched"] += 1
+                results["messages_fetched"] += 1
+                await outbox.put(message)
+
+            if max_messages is not None and counts["messages_fetched"] >= max_messages:
                 logger.warning(
-                    f"Limiting messages from {len(messages)} to {max_messages}")
-                messages = messages[:max_messages]
-
-            return messages
+                    f"Limiting messages of {channel} to {max_messages}")
 
         except Exception as e:
-            logger.error(f"Failed to fetch messages: {e}")
-            raise
-        finally:
-            await self.telegram_client.disconnect()
+            error_msg = f"Failed to fetch messages from {channel}: {e}"
+            logger.error(error_msg)
+            counts["error"] = error_msg
+            results["errors"].append(error_msg)
+            if min_id is None:
+                # Newest first: older messages of the window were not read
+                self.telegram_client.high_water_marks.pop(channel, None)
+
+    async def _parse_stage(
+        self,
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue,
+        results: dict
+    ) -> None:
+        """Drop known reposts and parse micro-batches of messages."""
+        done = False
+        while not done:
+            messages, done = await _next_batch(inbox, self.batch_size)
+            # Skip already stored reposts before paying for the LLM
+            messages = await self._drop_known_duplicates(messages, results)
+            messages = await self._check_near_duplicates(messages, results)
+            if not messages:
+                continue
+
+            logger.info(f"Parsing {len(messages)} messages...")
+            with STAGE_SECONDS.labels("parse").time():
+                parsed_data = await self._parse_messages(messages, results)
+            results["messages_parsed"] += len(parsed_data)
+            if parsed_data:
+                await outbox.put(parsed_data)
+
+    async def _distance_stage(
+        self,
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue
+    ) -> None:
+        """
+        Add commute durations to parsed batches.
+
+        A single worker: requests within a batch already run concurrently on
+        the pooled client, and the commute cache session is not shared.
+        """
+        while (parsed_data := await inbox.get()) is not _END:
+            with STAGE_SECONDS.labels("distance").time():
+                await add_durations(
+                    parsed_data, batch_size=20, cache=self.commute_cache,
+                    client=self.distance_client)
+            await outbox.put(parsed_data)
+        await outbox.put(_END)
+
+    async def _save_stage(self, inbox: asyncio.Queue, results: dict) -> None:
+        """Bulk insert each batch as soon as it is ready."""
+        while (parsed_data := await inbox.get()) is not _END:
+            logger.info(f"Saving {len(parsed_data)} rentals to database...")
+            with STAGE_SECONDS.labels("save").time():
+                saved = await self._save_rentals(parsed_data)
+            results["messages_saved"] += len(saved.inserted)
+            results["messages_updated"] += len(saved.updated)
+            results["duplicates_skipped"] += len(saved.skipped)
+            for rental in saved.inserted:
+                counts = results["channels"].get(rental.channel)
+                if counts is not None:
+                    counts["messages_saved"] += 1
+
+    async def _load_high_water_mark(self, channel: str) -> Optional[int]:
+        """Last processed message id of the channel, if tracked."""
+        if self.scrape_state is None:
+            return None
+        async with self._db_lock:
+            return await self.scrape_state.get_last_message_id(channel)
+
+    async def _store_high_water_marks(self, channels: Sequence[str]) -> None:
+        """
+        Persist the highest message id of each channel seen by the last
+        fetch, or the one before the first message that failed to parse.
+        """
+        if self.scrape_state is None:
+            return
+        for channel in channels:
+            message_id = self.telegram_client.high_water_marks.get(channel)
+            if message_id is None:
+                continue
+            failed = self._failed_message_ids.get(channel)
+            if failed is not None:
+                message_id = min(message_id, failed - 1)
+            async with self._db_lock:
+                await self.scrape_state.set_last_message_id(channel, message_id)
 
     async def _parse_messages(
         self,
-        messages: List[TelegramMessageData]
+        messages: List[TelegramMessageData],
+        results: dict
     ) -> List[dict]:
-        """Parse messages using LLM."""
-        parsed_data = []
+        """
+        Parse messages using LLM.
 
-        for i, message in enumerate(messages):
-            try:
-                # Add delay to respect rate limits
-                if i > 0:
-                    await asyncio.sleep(1.5)
+        The rule-based extractor runs first: messages whose required fields it
+        fills are not sent to the LLM at all, the others only ask the LLM for
+        the fields still missing. LLM calls run concurrently; concurrency and
+        pacing are enforced by the parser's shared rate limiter.
 
-                parsed = await self.llm_parser.parse_message(message)
-                parsed_data.append(parsed)
+        In "batch" parse mode the remaining messages are packed into
+        multi-message prompts, all asking for the union of missing fields.
 
-            except Exception as e:
-                logger.error(f"Failed to parse message {message.id}: {e}")
+        Messages the LLM failed on are dropped and reported in
+        `results["errors"]`.
+        """
+        plans = [self._plan_extraction(message) for message in messages]
+        to_parse = [
+            (message, fields)
+            for message, (_, fields, _) in zip(messages, plans) if fields
+        ]
+        batch_mode = self.parse_mode == "batch"
+        if batch_mode:
+            requested = {name for _, fields in to_parse for name in fields}
+            union = tuple(name for name in ALL_FIELDS if name in requested)
+            to_parse = [(message, union) for message, _ in to_parse]
+
+        await self.llm_parser.prefetch_cache(
+            [message for message, _ in to_parse],
+            [fields for _, fields in to_parse],
+        )
+        if batch_mode and to_parse:
+            llm_results = iter(await self._parse_batched(to_parse))
+        else:
+            llm_results = iter(await asyncio.gather(
+                *(self.llm_parser.parse_message(message, fields)
+                  for message, fields in to_parse),
+                return_exceptions=True
+            ))
+        try:
+            await self.llm_parser.flush_cache()
+        except Exception as e:
+            logger.error(f"Failed to persist LLM cache: {e}")
+
+        parsed_data = []
+        for message, (prefilled, fields, tokens_saved) in zip(messages, plans):
+            if not fields:
+                self._record_savings(tokens_saved, skipped_call=True)
+                parsed_data.append(
+                    with_message_metadata(dict(prefilled), message))
+                continue
+
+            parsed = next(llm_results)
+            # The parser reports failures as {"raw_text", "error"} dicts
+            if isinstance(parsed, Exception) or "error" in parsed:
+                error = parsed if isinstance(parsed, Exception) else parsed["error"]
+                error_msg = f"Failed to parse message {message.id}: {error}"
+                logger.error(error_msg)
+                results["errors"].append(error_msg)
+                SCRAPE_FAILURES.labels("parse").inc()
+                # The channel's mark stays below it, so the next run retries it
+                failed = self._failed_message_ids.get(message.channel)
+                if failed is None or message.id < failed:
+                    self._failed_message_ids[message.channel] = message.id
+                info = self._near_duplicate_info.pop((message.channel, message.id), None)
+                if info is not None and info[2] is None:
+                    self._lost_originals.add(info[0])
                 # Continue with other messages
                 continue
+            self._record_savings(tokens_saved, skipped_call=False)
+            parsed.update(prefilled)
+            parsed_data.append(parsed)
 
         return parsed_data
 
-    async def _save_rentals(self, parsed_data: List[dict]) -> int:
-        """Save parsed data to database."""
-        saved_count = 0
+    async def _parse_batched(
+        self, to_parse: List[Tuple[TelegramMessageData, Sequence[str]]]
+    ) -> List[Any]:
+        """Parse with multi-message prompts; all entries share one field set."""
+        messages = [message for message, _ in to_parse]
+        try:
+            return await self.llm_parser.parse_messages_batch(
+                messages, to_parse[0][1])
+        except Exception as e:
+            return [e] * len(messages)
 
-        for data in parsed_data:
-            try:
-                rental = self._create_rental_from_data(
-                    data
+    def _plan_extraction(
+        self, message: TelegramMessageData
+    ) -> Tuple[Dict[str, Any], Sequence[str], int]:
+        """
+        Pre-extract fields with rules and decide what to ask the LLM.
+
+        Returns:
+            Tuple of (fields filled locally, fields to request from the LLM,
+            prompt tokens saved); an empty field list means the LLM call is
+            skipped. Savings are recorded once the message is parsed.
+        """
+        if self.rule_extractor is None:
+            return {}, ALL_FIELDS, 0
+
+        prefilled = self.rule_extractor.extract(message.text)
+        full_prompt_tokens = estimate_tokens(build_prompt(message.text))
+        if not self.rule_extractor.missing_required(prefilled):
+            return prefilled, (), full_prompt_tokens
+
+        fields = tuple(name for name in ALL_FIELDS if name not in prefilled)
+        return prefilled, fields, (
+            full_prompt_tokens - estimate_tokens(build_prompt(message.text, fields)))
+
+    def _record_savings(self, prompt_tokens: int, skipped_call: bool) -> None:
+        if self.rule_extractor is not None:
+            self.rule_extractor.record_savings(prompt_tokens, skipped_call)
+
+    def _parse_stats(self) -> dict:
+        """
+        Cumulative LLM cache and rule extractor counters (zero when disabled).
+        """
+        stats = {
+            "llm_cache_hits": 0,
+            "llm_cache_misses": 0,
+            "llm_calls_saved": 0,
+            "llm_prompt_tokens_saved": 0,
+        }
+        if self.llm_parser.cache is not None:
+            stats.update(self.llm_parser.cache.stats())
+        if self.rule_extractor is not None:
+            stats.update(self.rule_extractor.stats())
+        return stats
+
+    async def _drop_known_duplicates(
+        self,
+        messages: List[TelegramMessageData],
+        results: dict
+    ) -> List[TelegramMessageData]:
+        """
+        Remove messages whose dedup fingerprint is already stored (one query).
+
+        Edits are kept: their fingerprint may well be the one of the listing
+        they replace.
+        """
+        if not messages:
+            return messages
+        try:
+            async with self._db_lock:
+                existing = await self.rental_repository.find_existing_fingerprints(
+                    rental_fingerprint(message.sender_id, message.text)
+                    for message in messages
                 )
+        except Exception as e:
+            logger.error(f"Failed to check duplicates: {e}")
+            return messages
+
+        fresh = [
+            message for message in messages
+            if message.is_edit
+            or rental_fingerprint(message.sender_id, message.text) not in existing
+        ]
+        results["duplicates_skipped"] += len(messages) - len(fresh)
+        return fresh
+
+    async def _load_near_duplicates(self) -> None:
+        """Seed the near-duplicate index with recent stored signatures."""
+        if self.near_duplicates is None or self._near_duplicates_loaded:
+            return
+        since = datetime.utcnow() - settings.NEAR_DUPLICATE_WINDOW
+        async with self._db_lock:
+            rows = await self.rental_repository.find_signatures(since)
+        for rental_id, signature in rows:
+            self.near_duplicates.add(rental_id, signature_from_bytes(signature))
+        self._near_duplicates_loaded = True
+        logger.info(f"Loaded {len(rows)} signatures for near-duplicate detection")
+
+    async def _check_near_duplicates(
+        self,
+        messages: List[TelegramMessageData],
+        results: dict
+    ) -> List[TelegramMessageData]:
+        """
+        Find messages similar to a stored or earlier listing, across senders.
+
+        Near-duplicates are dropped in "skip" mode, otherwise they are saved
+        with duplicate_of pointing to the original. The index only holds
+        stored listings; copies within the batch are matched against a
+        batch index, as they are parsed and saved together with their
+        original. Edits are only signed, as they would match the listing
+        they replace.
+
+        Signing is CPU-bound (milliseconds per message), so it runs in a
+        worker thread rather than on the event loop.
+        """
+        if self.near_duplicates is None or not messages:
+            return messages
 
-                # Check if already exists
-                existing = await self._check_duplicate(rental)
-                if existing:
-                    logger.debug(
-                        f"Skipping duplicate message {rental.telegram_message_id}")
+        signatures = await asyncio.to_thread(
+            lambda: [minhash_signature(message.text) for message in messages])
+        batch_index = LSHIndex(self.near_duplicates.threshold)
+        kept = []
+        for message, signature in zip(messages, signatures):
+            if signature is None:
+                kept.append(message)
+                continue
+
+            match = None
+            if not message.is_edit:
+                match = (self.near_duplicates.query(signature)
+                         or batch_index.query(signature))
+            if match is not None:
+                results["near_duplicates"] += 1
+                logger.debug(
+                    f"Message {message.id} is a near-duplicate of {match[0]} "
+                    f"(similarity {match[1]:.2f})")
+                if self.near_duplicate_action == "skip":
                     continue
 
-                await self.rental_repository.create(rental)
-                saved_count += 1
+            rental_id = uuid4()
+            if match is None and not message.is_edit:
+                batch_index.add(rental_id, signature)
+            self._near_duplicate_info[(message.channel, message.id)] = (
+                rental_id, signature_to_bytes(signature),
+                match[0] if match else None)
+            kept.append(message)
+        return kept
+
+    async def _save_rentals(self, parsed_data: List[dict]) -> BulkInsertResult:
+        """
+        Save parsed data to database with a single bulk insert.
 
+        Duplicates (already stored or repeated within the batch) are skipped.
+        Edits first overwrite the listing stored for their message; those
+        without one are inserted with the rest.
+        """
+        rentals = []
+        edits = []
+        for data in parsed_data:
+            try:
+                rental = self._create_rental_from_data(data)
             except Exception as e:
                 logger.error(f"Failed to save rental: {e}")
                 continue
+            (edits if data.get("is_edit") else rentals).append(rental)
+
+        if not rentals and not edits:
+            return BulkInsertResult()
+        _relink_near_duplicates(rentals, self._lost_originals)
 
-        return saved_count
+        try:
+            async with self._db_lock:
+                edited, unknown = BulkInsertResult(), []
+                if edits:
+                    edited, unknown = await self.rental_repository.update_from_edits(edits)
+                result = await self.rental_repository.bulk_upsert(rentals + unknown)
+            result.updated = edited.updated
+            result.skipped.extend(edited.skipped)
+        except Exception as e:
+            # Re-raise so the high-water mark is not advanced past unsaved messages
+            logger.error(f"Failed to save rentals: {e}")
+            raise
+
+        for rental in result.skipped:
+            logger.debug(
+                f"Skipping duplicate message {rental.telegram_message_id}")
+        await self._index_saved_rentals(result)
+        if result.inserted or result.updated:
+            await self._bump_data_version()
+        return result
+
+    async def _index_saved_rentals(self, result: BulkInsertResult) -> None:
+        """
+        Add the inserted originals to the near-duplicate index, first moving
+        the links of copies whose original was skipped to another copy.
+        """
+        if self.near_duplicates is None:
+            return
+        skipped = {rental.id for rental in result.skipped
+                   if rental.minhash_signature and rental.duplicate_of is None}
+        relinked = _relink_near_duplicates(result.inserted, skipped)
+        if relinked:
+            try:
+                async with self._db_lock:
+                    await self.rental_repository.update_near_duplicates(
+                        [{"id": rental.id, "duplicate_of": rental.duplicate_of}
+                         for rental in relinked])
+            except Exception as e:
+                logger.error(f"Failed to relink near-duplicates: {e}")
+
+        for rental in result.inserted:
+            if rental.minhash_signature and rental.duplicate_of is None:
+                self.near_duplicates.add(
+                    rental.id, signature_from_bytes(rental.minhash_signature))
+
+    async def _bump_data_version(self) -> None:
+        """Tell API processes that cached rental responses are stale."""
+        if self.data_version is None:
+            return
+        try:
+            async with self._db_lock:
+                await self.data_version.bump()
+        except Exception as e:
+            logger.error(f"Failed to bump rentals data version: {e}")
 
     def _create_rental_from_data(
         self,
@@ -163,13 +767,28 @@ class ScrapingService:
 
         tenant_pref = normalize_tenant_preference(parsed.get("tenant_preference"))
 
+        near_duplicate = {}
+        info = self._near_duplicate_info.pop(
+            (parsed.get("channel"), parsed.get("message_id")), None)
+        if info is not None:
+            rental_id, signature, duplicate_of = info
+            near_duplicate = {
+                "id": rental_id,
+                "minhash_signature": signature,
+                "duplicate_of": duplicate_of,
+            }
+
         return Rental(
+            **near_duplicate,
             telegram_message_id=parsed.get(
                 "message_id"),
+            channel=parsed.get("channel"),
             sender_id=parsed.get("sender_id"),
             sender_username=parsed.get("sender_username"),
             message_date=message_date,
             raw_text=parsed.get("raw_text", ""),
+            dedup_fingerprint=rental_fingerprint(
+                parsed.get("sender_id"), parsed.get("raw_text", "")),
             summary=parsed.get("summary"),
             price=parsed.get("price"),
             has_extra_expenses=parsed.get("has_extra_expenses"),
@@ -197,14 +816,3 @@ class ScrapingService:
 
 
         )
-
-    async def _check_duplicate(self, rental: Rental) -> bool:
-        """
-        Check if rental already exists in database by sender_id and a substring of raw_text.
-        """
-        if rental.sender_id and rental.raw_text:
-            existing = await self.rental_repository.find_duplicate_by_substring(
-                rental.sender_id, rental.raw_text, length=30
-            )
-            return existing is not None
-        return False
@@ -1,37 +1,88 @@
 """
 Telegram client wrapper using Telethon.
 """
-from typing import List, Optional, AsyncGenerator
+from typing import Awaitable, Callable, Dict, List, Optional, AsyncGenerator, Sequence
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
+import math
+import time
 
-from telethon import TelegramClient
+from telethon import TelegramClient, events
 from telethon.tl.types import Message
 from telethon.sessions import StringSession
 from telethon.errors import ChannelPrivateError, UsernameNotOccupiedError, FloodWaitError
-from app.core.config import settings
+from app.core.config import ChannelSettings, get_scraper_settings
+from app.core.metrics import EXTERNAL_CALL_SECONDS, observe_call
 from app.db.models import TelegramMessageData
 
+settings = get_scraper_settings()
+
+
+class _TimedIterator:
+    """
+    Async iterator wrapper adding up the time spent waiting on it, which
+    leaves out the time the consumer spends between items.
+    """
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.seconds = 0.0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        start = time.perf_counter()
+        try:
+            return await self.iterator.__anext__()
+        finally:
+            self.seconds += time.perf_counter() - start
+
 
 class TelegramClientWrapper:
     """
     Wrapper around Telethon client for scraping rental messages.
+
+    One authenticated client serves every channel; fetches of different
+    channels can run concurrently on it.
     """
 
-    def __init__(self):
+    def __init__(self, channels: Optional[Sequence[ChannelSettings]] = None):
         """Initialize Telegram client."""
         self.client = TelegramClient(
             StringSession(settings.TELEGRAM_SESSION_STRING),
             settings.TELEGRAM_API_ID,
-            settings.TELEGRAM_API_HASH
+            settings.TELEGRAM_API_HASH,
+            flood_sleep_threshold=settings.TELEGRAM_FLOOD_SLEEP_THRESHOLD,
         )
         self._is_connected = False
-        self.channel_name = settings.CHANNEL_NAME
+        self.channels = list(channels or settings.channel_configs())
+        self._keywords = {
+            channel.name: [keyword.lower() for keyword in channel.keywords]
+            for channel in self.channels
+        }
+        # Default channel of the single-channel calls (e.g. the backfill)
+        self.channel_name = self.channels[0].name
+        # Highest message id seen per channel during the last fetch
+        self.high_water_marks: Dict[str, int] = {}
+        # Monotonic time until which the account is flood-waited: waits
+        # apply per account and method, and every channel uses GetHistory
+        self._flood_wait_until = 0.0
+
+    @property
+    def channel_names(self) -> List[str]:
+        return [channel.name for channel in self.channels]
+
+    @property
+    def is_connected(self) -> bool:
+        return self._is_connected
 
     async def connect(self) -> None:
         """
-        Connect to Telegram and authenticate.
+        Connect to Telegram and authenticate; no-op when already connected.
         """
+        if self._is_connected:
+            return
         try:
             await self.client.start(phone=settings.TELEGRAM_PHONE)
             self._is_connected = True
@@ -46,53 +97,174 @@ class TelegramClientWrapper:
             await self.client.disconnect()
             self._is_connected = False
 
+    def add_listener(
+        self, callback: Callable[[TelegramMessageData], Awaitable[None]]
+    ) -> None:
+        """
+        Call `callback` with every new or edited rental message posted to
+        the channels while the client is connected.
+
+        Edits come with `is_edit` set; messages whose edit no longer looks
+        like a listing are ignored.
+        """
+        for channel in self.channel_names:
+            async def handler(event, channel=channel):
+                message = event.message
+                if not (message.text and self._is_rental_message(message.text, channel)):
+                    return
+                # Pushed updates don't carry the sender entity
+                await message.get_sender()
+                data = self._extract_message_data(message, channel)
+                data.is_edit = isinstance(event, events.MessageEdited.Event)
+                await callback(data)
+
+            self.client.add_event_handler(handler, events.NewMessage(chats=channel))
+            self.client.add_event_handler(handler, events.MessageEdited(chats=channel))
+
+    async def run_until_disconnected(self) -> None:
+        """
+        Receive updates for the listeners until the connection is closed
+        for good (Telethon reconnects by itself after network errors).
+        """
+        if not self._is_connected:
+            await self.connect()
+        await self.client.run_until_disconnected()
+        self._is_connected = False
+
     async def fetch_new_messages(
         self,
-        since: Optional[datetime] = None
+        since: Optional[datetime] = None,
+        min_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        channel: Optional[str] = None
     ) -> List[TelegramMessageData]:
         """
-        Fetch new messages from a channel since given datetime.
+        Fetch new messages from a channel into a list.
 
-        Args:
-            since: Fetch messages since this datetime (default: last hour)
+        See `iter_new_messages` for the arguments.
 
         Returns:
             List[Message]: List of Telegram message objects for batch processing
         """
+        return [
+            message
+            async for message in self.iter_new_messages(
+                since, min_id, limit, channel=channel)
+        ]
+
+    async def iter_new_messages(
+        self,
+        since: Optional[datetime] = None,
+        min_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        max_id: Optional[int] = None,
+        channel: Optional[str] = None
+    ) -> AsyncGenerator[TelegramMessageData, None]:
+        """
+        Stream new rental messages from a channel as they are downloaded.
+
+        With `min_id` (the last processed message id) the fetch is strictly
+        incremental: only newer messages are downloaded, oldest first, and
+        `since` is ignored. Without it, messages are read newest first until
+        `since` is reached.
+
+        The highest message id iterated so far (rental or not) is kept in
+        `high_water_marks` so the caller can persist it.
+
+        Args:
+            since: Fetch messages since this datetime (default: last hour)
+            min_id: Only fetch messages with a greater id
+            limit: Stop after this many rental messages; in incremental mode
+                the rest is picked up by the next fetch
+            max_id: In incremental mode, only fetch messages with a smaller id
+            channel: Channel to read (default: the first configured one)
+
+        Yields:
+            TelegramMessageData for each message that looks like a listing
+        """
+        channel = channel or self.channel_name
+        wait = self._flood_wait_until - time.monotonic()
+        if wait > 0:
+            # Still flood-waited: don't make it longer by asking again
+            raise Exception(
+                f"Rate limited, skipping {channel}. Wait {math.ceil(wait)} seconds")
+
         if not self._is_connected:
             await self.connect()
 
         if since is None:
             since = datetime.now(timezone.utc) - timedelta(hours=1)
 
+        outcome = "error"
+        iterator = None
         try:
-            messages_count = 0
-            messages = []
-            # async for because Telethon's iter_messages is async generator
-            async for message in self.client.iter_messages(
-                self.channel_name,
-                limit=None
-            ):
+            count = 0
+            high_water = min_id or 0
+            if min_id is not None:
+                # oldest first, so a `limit` never skips older messages
+                iterator = _TimedIterator(self.client.iter_messages(
+                    channel, min_id=min_id, max_id=max_id or 0,
+                    reverse=True))
+            else:
+                iterator = _TimedIterator(self.client.iter_messages(
+                    channel, limit=None))
 
-                if message.date and message.date < since:
+            # async for because Telethon's iter_messages is async generator
+            async for message in iterator:
+                if min_id is None and message.date and message.date < since:
                     break
-                if message.text and self._is_rental_message(message.text):
-                    messages_count += 1
-                    messages.append(self._extract_message_data(message))
-
-            return messages
+                high_water = max(high_water, message.id)
+                self.high_water_marks[channel] = high_water
+                if message.text and self._is_rental_message(message.text, channel):
+                    count += 1
+                    yield self._extract_message_data(message, channel)
+                    if limit is not None and count >= limit:
+                        break
+            outcome = "ok"
 
+        except GeneratorExit:
+            # Closed early by the consumer
+            outcome = "ok"
+            raise
         except ChannelPrivateError:
             raise Exception(
-                f"Cannot access private channel: {self.channel_name}")
+                f"Cannot access private channel: {channel}")
         except UsernameNotOccupiedError:
-            raise Exception(f"Channel not found: {self.channel_name}")
+            raise Exception(f"Channel not found: {channel}")
         except FloodWaitError as e:
-            raise Exception(f"Rate limited. Wait {e.seconds} seconds")
+            # Longer than flood_sleep_threshold: every channel waits
+            self._flood_wait_until = max(
+                self._flood_wait_until, time.monotonic() + e.seconds)
+            raise Exception(f"Rate limited on {channel}. Wait {e.seconds} seconds")
         except Exception as e:
             raise Exception(f"Failed to fetch messages: {e}")
+        finally:
+            if iterator is not None:
+                EXTERNAL_CALL_SECONDS.labels("telegram", outcome).observe(
+                    iterator.seconds)
+
+    async def get_latest_message_id(self, channel: Optional[str] = None) -> int:
+        """Id of the newest message of the channel, 0 if it is empty."""
+        return await self.get_message_id_before(None, channel)
+
+    async def get_message_id_before(
+        self, date: Optional[datetime], channel: Optional[str] = None
+    ) -> int:
+        """
+        Id of the newest message posted before `date` (any date if None),
+        0 if there is none.
+        """
+        if not self._is_connected:
+            await self.connect()
+        with observe_call("telegram"):
+            async for message in self.client.iter_messages(
+                    channel or self.channel_name, offset_date=date, limit=1):
+                return message.id
+        return 0
 
-    def _extract_message_data(self, message: Message) -> TelegramMessageData:
+    def _extract_message_data(
+        self, message: Message, channel: Optional[str] = None
+    ) -> TelegramMessageData:
         """        Extract relevant data from a Telegram message.
         Args:
             message: Telegram message object
@@ -107,22 +279,22 @@ class TelegramClientWrapper:
                               None) if message.sender else None,
             sender_username=getattr(
                 message.sender, 'username', None) if message.sender else None,
-            has_media=bool(message.media)
+            has_media=bool(message.media),
+            channel=channel or self.channel_name,
         )
 
-    def _is_rental_message(self, text: str) -> bool:
+    def _is_rental_message(self, text: str, channel: Optional[str] = None) -> bool:
         """
         Basic filtering to identify potential rental messages.
 
         Args:
             text: Message text
+            channel: Channel whose keywords apply (default: the first one)
 
         Returns:
             bool: True if message might be a rental listing
         """
 
-        rental_keywords = ["#offro", "offered", "offro"]
+        rental_keywords = self._keywords[channel or self.channel_name]
         text_lower = text.lower()
-        if text_lower.startswith("#offro"):
-            return True
         return any(keyword in text_lower for keyword in rental_keywords)
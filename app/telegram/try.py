@@ -1,8 +1,10 @@
 from telethon import TelegramClient
 from telethon.sessions import StringSession
-from app.core.config import settings
+from app.core.config import get_scraper_settings
 import asyncio
 
+settings = get_scraper_settings()
+
 api_id = settings.TELEGRAM_API_ID
 api_hash = settings.TELEGRAM_API_HASH
 
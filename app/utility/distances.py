@@ -1,15 +1,32 @@
 import asyncio
+import importlib.util
+import logging
+import random
 import httpx
-from typing import List, Dict, Any
-from app.core.config import settings
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from app.core.config import get_scraper_settings
+from app.core.metrics import observe_call
+from app.db.models import CommuteDuration
+from app.db.repositories.commute_cache import CommuteCacheRepository
 
-API_KEY = settings.DISTANCE_MATRIX_API_KEY
-BASE_URL = settings.DISTANCE_URL
-RATE_LIMIT_SLEEP = 1.1
+settings = get_scraper_settings()
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
 
 LEONARDO = "Politecnico di Milano, Leonardo"
 BOVISA = "Politecnico di Milano, Bovisa"
 
+DURATION_FIELDS = (
+    "duration_to_leonardo_transit",
+    "duration_to_bovisa_transit",
+    "duration_to_leonardo_walking",
+    "duration_to_bovisa_walking",
+)
+
 
 def ensure_milano(address: str) -> str:
     address = address.strip()
@@ -18,73 +35,218 @@ def ensure_milano(address: str) -> str:
     return address
 
 
+class DistanceMatrixClient:
+    """
+    Long-lived, pooled HTTP client for the distance matrix API.
+
+    Keeps connections alive across batches (HTTP/2 when the `h2` package is
+    installed), bounds concurrent requests and retries 5xx/429 responses and
+    transport errors with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.DISTANCE_MAX_CONCURRENCY,
+        timeout: float = settings.DISTANCE_TIMEOUT_SECONDS,
+        max_retries: int = settings.DISTANCE_MAX_RETRIES,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_url = base_url or settings.DISTANCE_URL
+        self.api_key = api_key or settings.DISTANCE_MATRIX_API_KEY
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            timeout=httpx.Timeout(timeout),
+        )
+
+    async def __aenter__(self) -> "DistanceMatrixClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def get_duration_matrix(
+        self, origins: List[str], destinations: List[str], mode: str
+    ) -> Dict[str, Any]:
+        params = {
+            "origins": "|".join(origins),
+            "destinations": "|".join(destinations),
+            "mode": mode,
+            "key": self.api_key,
+        }
+        if mode == "transit":
+            params["transit_mode"] = "bus|train|tram|subway"
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                try:
+                    with observe_call("distance_matrix"):
+                        resp = await self._client.get(self.base_url, params=params)
+                        if resp.status_code in RETRY_STATUSES:
+                            retry_after = _retry_after(resp)
+                        resp.raise_for_status()
+                except httpx.TransportError as e:
+                    error = e
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code not in RETRY_STATUSES:
+                        raise
+                    error = e
+                else:
+                    data = resp.json()
+                    if data.get("status") != "OK":
+                        raise RuntimeError(
+                            f"Matrix API error: {data.get('status')}")
+                    return data
+
+            if attempt == self.max_retries:
+                raise error
+            await asyncio.sleep(
+                retry_after if retry_after is not None else _backoff_delay(attempt))
+
+        raise RuntimeError("Matrix API retries exhausted")
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, BACKOFF_BASE_SECONDS * 2 ** attempt)
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    try:
+        return float(resp.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
 async def get_duration_matrix_async(
-    origins: List[str], destinations: List[str], mode: str
+    origins: List[str], destinations: List[str], mode: str,
+    client: Optional[DistanceMatrixClient] = None
 ) -> Dict[str, Any]:
-    params = {
-        "origins": "|".join(origins),
-        "destinations": "|".join(destinations),
-        "mode": mode,
-        "key": API_KEY,
-    }
-    if mode == "transit":
-        params["transit_mode"] = "bus|train|tram|subway"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(BASE_URL, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        if data.get("status") != "OK":
-            raise RuntimeError(f"Matrix API error: {data.get('status')}")
-        return data
+    if client is not None:
+        return await client.get_duration_matrix(origins, destinations, mode)
+    async with DistanceMatrixClient() as client:
+        return await client.get_duration_matrix(origins, destinations, mode)
 
 
 async def add_durations(
-    apartments: List[dict], batch_size=20
+    apartments: List[dict], batch_size=20,
+    cache: Optional[CommuteCacheRepository] = None,
+    client: Optional[DistanceMatrixClient] = None
 ):
     """
-    For each apartment, append duration (in seconds) to Leonardo and Bovisa
+    For each apartment, append duration (in minutes) to Leonardo and Bovisa
     for both 'transit' and 'walking' modes. Modifies the dicts in-place.
+
+    Addresses are deduplicated and, when a cache repository is given, looked
+    up in bulk first; only cache misses are sent to the distance matrix API.
+    Pass a shared `client` to reuse pooled connections across calls.
     """
-    destinations = [LEONARDO, BOVISA]
-    addresses = []
-    idx_map = []
+    by_address: Dict[str, List[int]] = {}
     for i, apt in enumerate(apartments):
         address = apt.get("location")
         if not address:
             continue
         address = ensure_milano(address)
         apartments[i]["location"] = address
-        addresses.append(address)
-        idx_map.append(i)
+        by_address.setdefault(address, []).append(i)
+
+    durations: Dict[str, Dict[str, Optional[float]]] = {}
+    if cache is not None and by_address:
+        created_after = datetime.utcnow() - settings.COMMUTE_CACHE_TTL
+        try:
+            for entry in await cache.get_many(list(by_address), created_after):
+                durations[entry.address] = {
+                    field: getattr(entry, field) for field in DURATION_FIELDS}
+        except Exception as e:
+            logger.error(f"Commute cache lookup failed: {e}")
+
+    misses = [address for address in by_address if address not in durations]
+    if client is not None:
+        fetched, complete = await _fetch_durations(misses, batch_size, client)
+    else:
+        async with DistanceMatrixClient() as owned_client:
+            fetched, complete = await _fetch_durations(
+                misses, batch_size, owned_client)
+    durations.update(fetched)
+
+    if cache is not None and complete:
+        try:
+            await cache.upsert_many([
+                CommuteDuration(address=address, **fetched[address])
+                for address in complete
+            ])
+        except Exception as e:
+            logger.error(f"Commute cache update failed: {e}")
+
+    for address, indices in by_address.items():
+        values = durations.get(address, {})
+        for i in indices:
+            for field in DURATION_FIELDS:
+                apartments[i][field] = values.get(field)
+
+
+async def _fetch_durations(
+    addresses: List[str], batch_size: int, client: DistanceMatrixClient
+) -> Tuple[Dict[str, Dict[str, Optional[float]]], List[str]]:
+    """
+    Query the distance matrix API for unique addresses.
 
+    All batch x mode requests run concurrently; the client bounds how many
+    are in flight at once.
+
+    Returns:
+        Tuple of (durations per address, addresses whose lookups succeeded
+        in every mode and can therefore be cached)
+    """
+    destinations = [LEONARDO, BOVISA]
     modes = ["transit", "walking"]
-    for start in range(0, len(addresses), batch_size):
-        batch = addresses[start:start+batch_size]
-        tasks = [
-            get_duration_matrix_async(batch, destinations, mode=mode)
-            for mode in modes
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for mode_idx, matrix in enumerate(results):
-            mode = modes[mode_idx]
-            if isinstance(matrix, Exception):
-                for i in range(len(batch)):
-                    apt_idx = idx_map[start + i]
-                    apartments[apt_idx][f"duration_to_leonardo_{mode}"] = None
-                    apartments[apt_idx][f"duration_to_bovisa_{mode}"] = None
-
-                continue
-            for i, row in enumerate(matrix["rows"]):
-                apt_idx = idx_map[start + i]
-                elements = row["elements"]
-                # Leonardo
-                if elements[0]["status"] == "OK":
-                    apartments[apt_idx][f"duration_to_leonardo_{mode}"] = elements[0]["duration"]["value"] / 60
-                else:
-                    apartments[apt_idx][f"duration_to_leonardo_{mode}"] = None
-                # Bovisa
-                if elements[1]["status"] == "OK":
-                    apartments[apt_idx][f"duration_to_bovisa_{mode}"] = elements[1]["duration"]["value"] / 60
-                else:
-                    apartments[apt_idx][f"duration_to_bovisa_{mode}"] = None
-        await asyncio.sleep(RATE_LIMIT_SLEEP)
+    batches = [
+        addresses[start:start+batch_size]
+        for start in range(0, len(addresses), batch_size)
+    ]
+    requests = [(batch, mode) for batch in batches for mode in modes]
+    results = await asyncio.gather(
+        *(get_duration_matrix_async(batch, destinations, mode=mode, client=client)
+          for batch, mode in requests),
+        return_exceptions=True
+    )
+
+    durations: Dict[str, Dict[str, Optional[float]]] = {
+        address: {} for address in addresses}
+    failed = set()
+    for (batch, mode), matrix in zip(requests, results):
+        if isinstance(matrix, Exception):
+            logger.warning(
+                f"Distance matrix request failed ({mode}, {len(batch)} addresses): {matrix}")
+            for address in batch:
+                durations[address][f"duration_to_leonardo_{mode}"] = None
+                durations[address][f"duration_to_bovisa_{mode}"] = None
+                failed.add(address)
+
+            continue
+        for i, row in enumerate(matrix["rows"]):
+            address = batch[i]
+            elements = row["elements"]
+            # Leonardo
+            if elements[0]["status"] == "OK":
+                durations[address][f"duration_to_leonardo_{mode}"] = elements[0]["duration"]["value"] / 60
+            else:
+                durations[address][f"duration_to_leonardo_{mode}"] = None
+            # Bovisa
+            if elements[1]["status"] == "OK":
+                durations[address][f"duration_to_bovisa_{mode}"] = elements[1]["duration"]["value"] / 60
+            else:
+                durations[address][f"duration_to_bovisa_{mode}"] = None
+
+    complete = [address for address in addresses if address not in failed]
+    return durations, complete
@@ -1,6 +1,13 @@
 from datetime import datetime, date
+import base64
+import binascii
+import hashlib
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple, Union
+from uuid import UUID
+
+# Number of leading raw_text characters that identify a repost
+FINGERPRINT_PREFIX_LENGTH = 30
 
 
 def normalize_tenant_preference(value: str) -> str:
@@ -48,3 +55,60 @@ def parse_llm_response(response: str) -> Dict[str, Any]:
         return json.loads(cleaned)
     except json.JSONDecodeError:
         return {}
+
+
+def rental_fingerprint(sender_id: Optional[int], raw_text: str) -> Optional[str]:
+    """
+    Dedup fingerprint of a listing: md5 of the sender and the lowercased
+    first FINGERPRINT_PREFIX_LENGTH characters of the text.
+
+    Must stay in sync with the SQL backfill expression
+    md5(sender_id::text || ':' || lower(substr(raw_text, 1, 30))).
+    Returns None for anonymous senders, which are never deduplicated.
+    """
+    if not sender_id or not raw_text:
+        return None
+    key = f"{sender_id}:{raw_text[:FINGERPRINT_PREFIX_LENGTH].lower()}"
+    return hashlib.md5(key.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def encode_cursor(
+    sort_field: str, key: Union[datetime, float, None], rental_id: UUID
+) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+
+    The key is the value of `sort_field`: the message date, or the price or
+    a commute duration when sorting by those. The field is kept so a cursor
+    is only used with the order it was made for.
+    """
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps([sort_field, key, str(rental_id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Union[datetime, float, None], UUID]:
+    """
+    Decode a cursor produced by `encode_cursor` into its sort field, key
+    and rental id.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_field, raw_key, raw_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(sort_field, str):
+            raise TypeError(f"Unexpected cursor sort field {sort_field!r}")
+        if isinstance(raw_key, str):
+            key = datetime.fromisoformat(raw_key)
+        elif isinstance(raw_key, (int, float)) and not isinstance(raw_key, bool):
+            key = float(raw_key)
+        elif raw_key is None:
+            key = None
+        else:
+            raise TypeError(f"Unexpected cursor key {raw_key!r}")
+        return sort_field, key, UUID(raw_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
@@ -0,0 +1,141 @@
+"""
+MinHash signatures and an LSH band index to find near-duplicate listings.
+"""
+import hashlib
+import re
+import struct
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+# Signature length; changing it invalidates stored signatures
+NUM_PERM = 128
+# Characters per shingle: robust to small edits, reordered phrases and emoji
+SHINGLE_SIZE = 5
+# Max distance of the LSH S-curve midpoint from the similarity threshold
+BAND_TOLERANCE = 0.02
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutation(index: int) -> Tuple[int, int]:
+    # Derived from sha256 rather than `random`, so stored signatures stay
+    # comparable across Python versions
+    digest = hashlib.sha256(f"minhash-{index}".encode()).digest()
+    a = int.from_bytes(digest[:8], "little") % (_PRIME - 1) + 1
+    b = int.from_bytes(digest[8:16], "little") % _PRIME
+    return a, b
+
+
+_PERMUTATIONS: Tuple[Tuple[int, int], ...] = tuple(
+    _permutation(i) for i in range(NUM_PERM))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of the text, ignoring case, accents and punctuation."""
+    text = unicodedata.normalize("NFKD", text or "").lower()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = " ".join(re.sub(r"[^\w]+", " ", text).split())
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(text: str) -> Optional[Tuple[int, ...]]:
+    """
+    MinHash signature of a message, or None for an empty one.
+
+    The fraction of equal positions between two signatures estimates the
+    Jaccard similarity of their shingle sets.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return None
+    return tuple(
+        min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def signature_to_bytes(signature: Sequence[int]) -> bytes:
+    return struct.pack(f"<{len(signature)}I", *signature)
+
+
+def signature_from_bytes(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(f"<{len(data) // 4}I", data)
+
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+@lru_cache(maxsize=None)
+def band_layout(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    (bands, rows per band) for an LSH index around `threshold`.
+
+    The S-curve midpoint (1/bands)^(1/rows) is put at the threshold, so
+    pairs well below it rarely become candidates. Among the layouts within
+    BAND_TOLERANCE of it, the one using the most signature positions has
+    the steepest curve. Bands need not cover the whole signature;
+    candidates are verified on all of it.
+    """
+    layouts = [(b, r) for b in range(1, num_perm + 1)
+               for r in range(1, num_perm // b + 1)]
+    distance = {layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold)
+                for layout in layouts}
+    close = [layout for layout in layouts if distance[layout] <= BAND_TOLERANCE]
+    if not close:
+        return min(layouts, key=distance.get)
+    return max(close, key=lambda layout: (layout[0] * layout[1], -distance[layout]))
+
+
+class LSHIndex:
+    """
+    In-memory LSH band index of MinHash signatures.
+
+    A query only compares the few signatures sharing a band with it, so it
+    costs a handful of dict lookups regardless of the index size.
+    """
+
+    def __init__(self, threshold: float, num_perm: int = NUM_PERM):
+        self.threshold = threshold
+        self.bands, self.rows = band_layout(threshold, num_perm)
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[Hashable]] = defaultdict(list)
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: Sequence[int]):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def add(self, key: Hashable, signature: Sequence[int]) -> None:
+        signature = tuple(signature)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].append(key)
+
+    def query(self, signature: Sequence[int]) -> Optional[Tuple[Hashable, float]]:
+        """
+        The most similar indexed key at or above the threshold, with its
+        estimated similarity; None when there is no such key.
+        """
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            score = similarity(signature, self._signatures[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
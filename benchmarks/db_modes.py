@@ -0,0 +1,176 @@
+"""
+Search endpoint latency and throughput per DB_CONNECTION_MODE.
+
+Seeds a scratch schema with synthetic rentals, then drives GET /api/rentals
+in-process (httpx ASGI transport) with concurrent clients, once per
+connection mode: "pgbouncer" prepares every statement anew, "direct" reuses
+prepared statements per connection. The response cache and the rate limit
+are disabled, so every request reaches the database.
+
+Usage:
+    python -m benchmarks.db_modes [--rows 100000] [--requests 2000] [--concurrency 16]
+
+Needs PostgreSQL 13+ reachable through DATABASE_URL (asyncpg driver); point
+--database-url at pgbouncer to measure the pgbouncer mode behind it. All
+objects live in the `bench_db_modes` schema, dropped at the end.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+import httpx
+from sqlalchemy import MetaData, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import SQLModel
+
+from app.api.response_cache import rentals_cache
+from app.app_factory import create_app
+from app.core.config import settings
+from app.db.manage_db import get_async_engine, get_async_session
+from app.db.text_search import CREATE_TEXT_SEARCH_CONFIG
+from app.middleware.rate_limiter import limiter
+from benchmarks.search_indexes import LOCATIONS, SEED_SQL, seed_params
+
+SCHEMA = "bench_db_modes"
+MODES = ("pgbouncer", "direct")
+
+QUERIES: List[Dict[str, Any]] = [
+    {},
+    {"property_type": "camera_singola"},
+    {"location": "Bovisa"},
+    {"min_price": 400, "max_price": 600},
+    {"max_price": 900, "tenant_preference": "ragazza"},
+    {"sort": "price", "limit": 50},
+    {"q": "annuncio"},
+]
+
+
+def random_query(rng: random.Random) -> Dict[str, Any]:
+    params = dict(rng.choice(QUERIES))
+    if "location" in params:
+        params["location"] = rng.choice(LOCATIONS)
+    if "min_price" in params:
+        params["min_price"] = rng.randrange(200, 1400, 50)
+        params["max_price"] = params["min_price"] + 300
+    return params
+
+
+async def seed(url: str, rows: int) -> None:
+    engine = get_async_engine(url, "direct")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA "{SCHEMA}"'))
+            await conn.execute(text(f'SET search_path TO "{SCHEMA}", public'))
+            for statement in CREATE_TEXT_SEARCH_CONFIG:
+                await conn.execute(text(statement))
+            bench_metadata = MetaData()
+            for table in SQLModel.metadata.sorted_tables:
+                table.to_metadata(bench_metadata)
+            await conn.run_sync(bench_metadata.create_all)
+            print(f"Seeding {rows} rentals...")
+            await conn.execute(text(SEED_SQL), seed_params(rows, 0))
+            await conn.execute(text("ANALYZE rentals"))
+    finally:
+        await engine.dispose()
+
+
+async def drop(url: str) -> None:
+    engine = get_async_engine(url, "direct")
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+    finally:
+        await engine.dispose()
+
+
+async def measure(url: str, mode: str, requests: int, concurrency: int,
+                  seed_value: int) -> Dict[str, float]:
+    """Latency percentiles (ms) and requests/s of the search endpoint."""
+    engine = get_async_engine(url, mode).execution_options(
+        schema_translate_map={None: SCHEMA})
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def bench_session():
+        async with session_factory() as session:
+            yield session
+
+    app = create_app()
+    app.dependency_overrides[get_async_session] = bench_session
+    rng = random.Random(seed_value)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient, count: int, record: bool) -> None:
+        nonlocal errors
+        for _ in range(count):
+            params = random_query(rng)
+            start = time.perf_counter()
+            response = await client.get("/api/rentals/", params=params)
+            if record:
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Warm up the pool and, in direct mode, the statement caches
+            await asyncio.gather(*(worker(client, 10, False) for _ in range(concurrency)))
+            start = time.perf_counter()
+            per_worker = max(1, requests // concurrency)
+            await asyncio.gather(*(worker(client, per_worker, True) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+    finally:
+        await engine.dispose()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": cuts[49] * 1000,
+        "p95": cuts[94] * 1000,
+        "p99": cuts[98] * 1000,
+        "errors": errors,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    # Every request must reach the database
+    limiter.enabled = False
+    rentals_cache.max_entries = 0
+
+    await seed(args.database_url, args.rows)
+    report = {}
+    try:
+        for mode in args.modes:
+            print(f"Measuring {mode} mode...")
+            report[mode] = await measure(
+                args.database_url, mode, args.requests, args.concurrency, args.seed)
+    finally:
+        await drop(args.database_url)
+
+    print(f"\npool_size={settings.DB_POOL_SIZE} max_overflow={settings.DB_MAX_OVERFLOW} "
+          f"concurrency={args.concurrency}")
+    print(f"{'mode':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, result in report.items():
+        print(f"{mode:<10} {result['rps']:>8.1f} {result['p50']:>8.2f} "
+              f"{result['p95']:>8.2f} {result['p99']:>8.2f} {result['errors']:>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
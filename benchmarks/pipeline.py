@@ -0,0 +1,412 @@
+"""
+Offline end-to-end benchmark of the scraping pipeline.
+
+Runs ScrapingService on synthetic Italian listings from a fake Telegram
+client, against local stub servers for the Mistral and distance matrix APIs
+with configurable latency and error rate, and reports messages/s, latency
+percentiles per stage and per external call, and peak memory.
+
+Usage:
+    python -m benchmarks.pipeline [--messages 2000] [--llm-share 0.7]
+        [--llm-latency 0.4] [--llm-error-rate 0.02]
+        [--distance-latency 0.15] [--distance-error-rate 0.02]
+        [--database-url URL | --in-memory]
+
+Rentals, LLM results and commute durations are written to the
+`bench_pipeline` schema of DATABASE_URL (PostgreSQL 13+), dropped at the
+end. SQLite cannot stand in, as the repositories use PostgreSQL upserts;
+--in-memory keeps rentals in a dict instead and runs without caches.
+LLM errors are 429s, which the parser retries; distance matrix errors are
+503s, which the distance client retries. Call latencies include rate
+limiting and retries, as the pipeline sees them.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import resource
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from aiohttp import web
+from sqlalchemy import MetaData, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+import app.scraping.scraper_service as scraper_service
+from app.core.config import get_scraper_settings
+from app.db.models import TelegramMessageData
+from app.db.repositories.commute_cache import CommuteCacheRepository
+from app.db.repositories.data_version import DataVersionRepository
+from app.db.repositories.llm_cache import LLMCacheRepository
+from app.db.repositories.rental import BulkInsertResult, RentalRepository
+from app.db.text_search import CREATE_TEXT_SEARCH_CONFIG
+from app.parsing.cache import LLMResultCache
+from app.parsing.llm_parser import SimpleMistralParser
+from app.parsing.rate_limiter import LLMRateLimiter
+from app.parsing.rule_extractor import RuleBasedExtractor
+from app.scraping.scraper_service import ScrapingService
+from app.utility.distances import DistanceMatrixClient
+from app.utility.minhash import LSHIndex
+
+settings = get_scraper_settings()
+
+SCHEMA = "bench_pipeline"
+
+STREETS = [
+    "Via Bonardi", "Via Candiani", "Via Durando", "Via Pascoli", "Viale Romagna",
+    "Via Ponzio", "Via Golgi", "Via Padova", "Via Imbonati", "Via Cosenz",
+    "Via Mac Mahon", "Via Lambruschini", "Via Bovisasca", "Via Colombo",
+]
+ZONES = ["Bovisa", "Città Studi", "Leonardo", "Lambrate", "Dergano", "Loreto"]
+ROOMS = [
+    ("Camera singola", "camera_singola"), ("Camera doppia", "camera_doppia"),
+    ("Monolocale", "monolocale"), ("Appartamento", "appartamento"),
+]
+EXTRAS = [
+    "Appartamento luminoso al terzo piano con ascensore.",
+    "Cucina abitabile, lavatrice e lavastoviglie.",
+    "Wifi incluso e pulizie settimanali delle parti comuni.",
+    "A due passi dalla metro e dal passante ferroviario.",
+    "Balcone e riscaldamento autonomo.",
+    "Casa ristrutturata di recente, arredata con gusto.",
+    "Coinquilini studenti del Politecnico, ambiente tranquillo.",
+    "Contratto regolare, cedolare secca, minimo sei mesi.",
+]
+TENANTS = ["Solo ragazze.", "Solo ragazzi.", "Ragazzi o ragazze.", ""]
+MONTHS = ["settembre", "ottobre", "novembre", "gennaio", "febbraio"]
+
+
+def make_listings(count: int, llm_share: float, seed: int = 7) -> List[TelegramMessageData]:
+    """
+    Synthetic listings; about `llm_share` of them lack a price the rule
+    extractor can read, so they need the LLM.
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    listings = []
+    for i in range(1, count + 1):
+        room, _ = rng.choice(ROOMS)
+        street = f"{rng.choice(STREETS)} {rng.randint(1, 180)}"
+        if rng.random() < llm_share:
+            price = "prezzo da concordare, scrivetemi in privato"
+        else:
+            price = f"{rng.randrange(350, 1300, 10)}€ al mese"
+        extras = " ".join(rng.sample(EXTRAS, 3))
+        listing = (
+            f"#offro {room} in {street}, zona {rng.choice(ZONES)}. {price}, "
+            f"disponibile da {rng.choice(MONTHS)}. {extras} {rng.choice(TENANTS)} "
+            f"Annuncio {i}, tel 3{rng.randrange(10**8, 10**9)}"
+        )
+        listings.append(TelegramMessageData(
+            id=i, text=listing, date=start + timedelta(minutes=7 * i),
+            sender_id=rng.randrange(1, count), sender_username=f"user{i}",
+            channel="@bench"))
+    return listings
+
+
+class FakeTelegramClient:
+    """Yields the synthetic listings, in pages of 100 like Telethon."""
+    channel_name = "@bench"
+    channel_names = [channel_name]
+
+    def __init__(self, messages: List[TelegramMessageData], page_latency: float):
+        self.messages = messages
+        self.page_latency = page_latency
+        self.high_water_marks: Dict[str, int] = {}
+        self.is_connected = False
+
+    async def connect(self) -> None:
+        self.is_connected = True
+
+    async def disconnect(self) -> None:
+        self.is_connected = False
+
+    async def iter_new_messages(self, since=None, min_id=None, limit=None, max_id=None,
+                                channel=None):
+        for i, message in enumerate(self.messages[:limit]):
+            if i % 100 == 0:
+                await asyncio.sleep(self.page_latency)
+            self.high_water_marks[self.channel_name] = message.id
+            yield message
+
+
+class InMemoryRentalRepository:
+    """Just what ScrapingService uses of RentalRepository, in a dict."""
+
+    def __init__(self):
+        self.rows: Dict[str, Any] = {}
+
+    async def find_existing_fingerprints(self, fingerprints):
+        return {fp for fp in fingerprints if fp in self.rows}
+
+    async def find_signatures(self, since):
+        return []
+
+    async def bulk_upsert(self, rentals) -> BulkInsertResult:
+        result = BulkInsertResult()
+        for rental in rentals:
+            key = rental.dedup_fingerprint or str(rental.id)
+            if key in self.rows:
+                result.skipped.append(rental)
+            else:
+                self.rows[key] = rental
+                result.inserted.append(rental)
+        return result
+
+
+class Stub:
+    """Latency and error injection shared by the stub handlers."""
+
+    def __init__(self, latency: float, error_rate: float, rng: random.Random):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = rng
+        self.requests = 0
+        self.errors = 0
+
+    async def delay(self) -> bool:
+        """Wait about `latency` seconds; True when the request should fail."""
+        self.requests += 1
+        await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        failed = self.rng.random() < self.error_rate
+        self.errors += failed
+        return failed
+
+
+def fake_extraction(rng: random.Random) -> Dict[str, Any]:
+    _, property_type = rng.choice(ROOMS)
+    return {
+        "price": rng.randrange(350, 1300, 10),
+        "location": f"{rng.choice(STREETS)} {rng.randint(1, 180)}",
+        "property_type": property_type,
+        "telephone": None,
+        "email": None,
+        "tenant_preference": rng.choice(["ragazzo", "ragazza", "indifferente"]),
+        "available_start": "25-09-01",
+        "available_end": None,
+        "num_bedrooms": rng.randint(1, 4),
+        "num_bathrooms": rng.randint(1, 2),
+        "flatmates_count": rng.randint(0, 4),
+        "summary": "Arredato, wifi incluso",
+        "has_extra_expenses": False,
+        "extra_expenses_details": None,
+    }
+
+
+def mistral_app(stub: Stub) -> web.Application:
+    async def completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        if await stub.delay():
+            return web.json_response(
+                {"message": "Rate limit exceeded"}, status=429,
+                headers={"Retry-After": "0.1"})
+        prompt = body["messages"][0]["content"]
+        ids = re.findall(r'"id": (\d+)', prompt)
+        if ids:
+            answer = {"results": [
+                {"id": int(message_id), **fake_extraction(stub.rng)}
+                for message_id in ids]}
+        else:
+            answer = fake_extraction(stub.rng)
+        content = json.dumps(answer, ensure_ascii=False)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+        return web.json_response({
+            "id": f"bench-{stub.requests}",
+            "object": "chat.completion",
+            "model": body["model"],
+            "created": int(time.time()),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+def distance_app(stub: Stub) -> web.Application:
+    async def matrix(request: web.Request) -> web.Response:
+        if await stub.delay():
+            return web.json_response({"status": "UNAVAILABLE"}, status=503)
+        origins = request.query["origins"].split("|")
+        destinations = request.query["destinations"].split("|")
+        walking = request.query["mode"] == "walking"
+        return web.json_response({
+            "status": "OK",
+            "rows": [{"elements": [
+                {"status": "OK",
+                 "duration": {"value": stub.rng.randint(300, 2400) * (3 if walking else 1)}}
+                for _ in destinations
+            ]} for _ in origins],
+        })
+
+    app = web.Application()
+    app.router.add_get("/matrix", matrix)
+    return app
+
+
+async def serve(app: web.Application) -> Tuple[web.AppRunner, str]:
+    """Start an app on a free local port; returns the runner and base URL."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+def timed(timings: List[float], fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            timings.append(time.perf_counter() - start)
+    return wrapper
+
+
+def percentiles(values: List[float]) -> Tuple[float, float, float]:
+    """p50, p95 and p99 in milliseconds."""
+    if len(values) < 2:
+        value = values[0] * 1000 if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    llm_stub = Stub(args.llm_latency, args.llm_error_rate, rng)
+    distance_stub = Stub(args.distance_latency, args.distance_error_rate, rng)
+    llm_runner, llm_url = await serve(mistral_app(llm_stub))
+    distance_runner, distance_url = await serve(distance_app(distance_stub))
+    settings.MISTRAL_SERVER_URL = llm_url
+
+    engine = None
+    timings: Dict[str, List[float]] = defaultdict(list)
+    distance_client = DistanceMatrixClient(base_url=f"{distance_url}/matrix")
+    add_durations = scraper_service.add_durations
+    try:
+        rate_limiter = LLMRateLimiter(
+            requests_per_second=args.llm_rps,
+            tokens_per_minute=10_000_000,
+            max_concurrency=args.llm_concurrency)
+        if args.in_memory:
+            sessions = []
+            repository = InMemoryRentalRepository()
+            llm_cache = commute_cache = data_version = None
+        else:
+            engine = create_async_engine(args.database_url).execution_options(
+                schema_translate_map={None: SCHEMA})
+            async with engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+                await conn.execute(text(f'CREATE SCHEMA "{SCHEMA}"'))
+                await conn.execute(text(f'SET search_path TO "{SCHEMA}", public'))
+                for statement in CREATE_TEXT_SEARCH_CONFIG:
+                    await conn.execute(text(statement))
+                bench_metadata = MetaData()
+                for table in SQLModel.metadata.sorted_tables:
+                    table.to_metadata(bench_metadata)
+                await conn.run_sync(bench_metadata.create_all)
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            sessions = [session_factory() for _ in range(3)]
+            db, cache_db, commute_db = sessions
+            repository = RentalRepository(db)
+            llm_cache = LLMResultCache(LLMCacheRepository(cache_db))
+            commute_cache = CommuteCacheRepository(commute_db)
+            data_version = DataVersionRepository(db)
+
+        parser = SimpleMistralParser(rate_limiter=rate_limiter, cache=llm_cache)
+        parser._complete = timed(timings["llm call"], parser._complete)
+        distance_client.get_duration_matrix = timed(
+            timings["distance call"], distance_client.get_duration_matrix)
+
+        messages = make_listings(args.messages, args.llm_share, args.seed)
+        service = ScrapingService(
+            FakeTelegramClient(messages, args.telegram_latency),
+            parser,
+            repository,
+            RuleBasedExtractor(),
+            parse_mode=args.parse_mode,
+            commute_cache=commute_cache,
+            distance_client=distance_client,
+            data_version=data_version,
+            near_duplicates=LSHIndex(settings.NEAR_DUPLICATE_THRESHOLD),
+        )
+        service.parse_workers = args.parse_workers
+        service._parse_messages = timed(timings["parse stage"], service._parse_messages)
+        service._save_rentals = timed(timings["save stage"], service._save_rentals)
+        scraper_service.add_durations = timed(timings["distance stage"], add_durations)
+
+        print(f"Processing {args.messages} listings...")
+        start = time.perf_counter()
+        results = await service.scrape_and_process_messages(max_messages=args.messages)
+        elapsed = time.perf_counter() - start
+        for session in sessions:
+            await session.close()
+    finally:
+        scraper_service.add_durations = add_durations
+        await distance_client.aclose()
+        await llm_runner.cleanup()
+        await distance_runner.cleanup()
+        if engine is not None:
+            async with engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+            await engine.dispose()
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n{results['messages_fetched']} listings in {elapsed:.2f}s: "
+          f"{results['messages_fetched'] / elapsed:.1f} messages/s, "
+          f"{results['messages_saved']} saved, peak RSS {peak_mb:.0f} MB")
+    print(f"LLM: {llm_stub.requests} requests ({llm_stub.errors} 429s), "
+          f"{results['llm_calls_saved']} calls saved by rules; distance matrix: "
+          f"{distance_stub.requests} requests ({distance_stub.errors} 503s)")
+    if results["errors"]:
+        print(f"Errors: {results['errors']}")
+    print(f"\n{'':<15} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, values in timings.items():
+        p50, p95, p99 = percentiles(values)
+        print(f"{name:<15} {len(values):>6} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--llm-share", type=float, default=0.7,
+                        help="Share of listings the rule extractor cannot complete")
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--llm-rps", type=float, default=50.0)
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    parser.add_argument("--parse-mode", choices=["single", "batch"],
+                        default=settings.LLM_PARSE_MODE)
+    parser.add_argument("--parse-workers", type=int,
+                        default=settings.PIPELINE_PARSE_WORKERS)
+    parser.add_argument("--distance-latency", type=float, default=0.15)
+    parser.add_argument("--distance-error-rate", type=float, default=0.02)
+    parser.add_argument("--telegram-latency", type=float, default=0.05,
+                        help="Seconds per page of 100 messages")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--in-memory", action="store_true",
+                        help="Keep rentals in memory; no database or caches")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
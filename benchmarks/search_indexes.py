@@ -0,0 +1,245 @@
+"""
+EXPLAIN ANALYZE benchmark for the rentals search indexes.
+
+Seeds a scratch schema with synthetic rentals, then runs the query shapes of
+RentalRepository.search and times a bulk insert twice: once with the legacy
+single-column indexes (`index=True` on every field) and once with the
+composite and partial indexes declared on the Rental model.
+
+Usage:
+    python -m benchmarks.search_indexes [--rows 200000] [--repeat 5]
+
+Needs PostgreSQL 13+ reachable through DATABASE_URL (asyncpg driver). All
+objects live in the `bench_search_indexes` schema, dropped at the end.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import Index, MetaData, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.config import settings
+from app.db.models import PropertyType, Rental, RentalSort, TenantPreference
+from app.db.repositories.rental import RentalRepository
+from app.db.text_search import CREATE_TEXT_SEARCH_CONFIG
+
+SCHEMA = "bench_search_indexes"
+
+# Indexed columns before the composite indexes replaced them
+LEGACY_INDEXED_COLUMNS = (
+    "telegram_message_id", "sender_id", "sender_username", "message_date",
+    "telephone", "email", "price", "location", "property_type",
+    "availability_start", "availability_end", "tenant_preference",
+    "num_bedrooms", "num_bathrooms", "flatmates_count",
+    "duration_to_leonardo_transit", "duration_to_bovisa_transit",
+    "duration_to_leonardo_walking", "duration_to_bovisa_walking",
+)
+LOCATIONS = [
+    "Bovisa", "Città Studi", "Leonardo", "Lambrate", "Navigli", "Isola",
+    "Porta Romana", "Loreto", "Dergano", "Affori", "Bicocca", "Niguarda",
+    "Centrale", "Garibaldi", "Sesto San Giovanni", "Turro", "Precotto",
+    "Gorla", "Villapizzone", "Quarto Oggiaro",
+]
+
+QUERIES: Dict[str, Dict[str, Any]] = {
+    "latest": {},
+    "property_type": {"property_type": PropertyType.camera_singola},
+    "location": {"location": "Bovisa"},
+    "price_range": {"min_price": 400, "max_price": 600},
+    "price_range+type": {
+        "min_price": 400, "max_price": 600,
+        "property_type": PropertyType.monolocale},
+    "all_filters": {
+        "location": "Città Studi", "min_price": 300, "max_price": 900,
+        "property_type": PropertyType.camera_doppia,
+        "tenant_preference": TenantPreference.ragazza},
+    "deep_offset": {"offset": 5000},
+    "keyset": {"after": (datetime(2024, 12, 1), UUID(int=2**128 - 1))},
+    "commute_range": {"max_minutes_to_leonardo": 20},
+    "commute_sort": {"max_minutes_to_bovisa": 30, "sort": RentalSort.commute},
+    "price_sort": {"sort": RentalSort.price},
+    "price_sort+keyset": {"sort": RentalSort.price, "after": (700.0, UUID(int=0))},
+}
+
+SEED_SQL = """
+INSERT INTO rentals (id, raw_text, telegram_message_id, sender_id,
+                     message_date, price, location, property_type,
+                     tenant_preference, duration_to_leonardo_transit,
+                     duration_to_bovisa_transit, duration_to_leonardo_walking,
+                     duration_to_bovisa_walking)
+SELECT gen_random_uuid(),
+       'Annuncio ' || g,
+       g + :first_id,
+       (random() * 5000)::bigint,
+       CASE WHEN random() < 0.02 THEN NULL
+            ELSE timestamp '2024-01-01' + random() * interval '600 days' END,
+       CASE WHEN random() < 0.1 THEN NULL
+            ELSE round((200 + random() * 1600)::numeric) END,
+       CASE WHEN random() < 0.15 THEN NULL
+            ELSE (CAST(:locations AS text[]))[1 + floor(random() * :n_locations)::int] END,
+       CASE WHEN random() < 0.1 THEN NULL
+            ELSE CAST((CAST(:property_types AS text[]))[1 + floor(random() * :n_property_types)::int]
+                      AS propertytype) END,
+       CAST((CAST(:preferences AS text[]))[1 + floor(random() * :n_preferences)::int]
+            AS tenantpreference),
+       leonardo, bovisa, leonardo * 3, bovisa * 3
+FROM generate_series(1, :rows) AS g,
+     LATERAL (SELECT CASE WHEN random() < 0.2 THEN NULL
+                          ELSE round((5 + random() * 60)::numeric) END AS leonardo,
+                     CASE WHEN random() < 0.2 THEN NULL
+                          ELSE round((5 + random() * 60)::numeric) END AS bovisa
+              WHERE g > 0) AS commute
+"""
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) around a statement."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return ("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+            + compiler.process(element.statement, **kw))
+
+
+def seed_params(rows: int, first_id: int) -> Dict[str, Any]:
+    property_types = [p.value for p in PropertyType]
+    preferences = [p.value for p in TenantPreference]
+    return {
+        "rows": rows,
+        "first_id": first_id,
+        "locations": LOCATIONS,
+        "n_locations": len(LOCATIONS),
+        "property_types": property_types,
+        "n_property_types": len(property_types),
+        "preferences": preferences,
+        "n_preferences": len(preferences),
+    }
+
+
+def index_sets() -> Dict[str, List[Index]]:
+    """Legacy and current index definitions on a private copy of the table."""
+    legacy_table = Rental.__table__.to_metadata(MetaData())
+    legacy = [
+        Index(f"ix_rentals_{column}", legacy_table.c[column])
+        for column in LEGACY_INDEXED_COLUMNS
+    ]
+    legacy.append(Index("ix_rentals_dedup_fingerprint",
+                        legacy_table.c.dedup_fingerprint, unique=True))
+    current_table = Rental.__table__.to_metadata(MetaData())
+    return {"legacy": legacy, "composite": list(current_table.indexes)}
+
+
+def plan_indexes(plan: Dict[str, Any]) -> List[str]:
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        names.extend(plan_indexes(child))
+    return names
+
+
+async def drop_indexes(conn: AsyncConnection) -> None:
+    result = await conn.execute(text(
+        "SELECT indexname FROM pg_indexes "
+        "WHERE schemaname = :schema AND tablename = 'rentals' "
+        "AND indexname NOT LIKE '%pkey'"), {"schema": SCHEMA})
+    for name in result.scalars().all():
+        await conn.execute(text(f'DROP INDEX "{SCHEMA}"."{name}"'))
+
+
+async def explain(conn: AsyncConnection, repeat: int) -> Dict[str, Tuple[float, str]]:
+    """Median execution time (ms) and indexes used, per query shape."""
+    results = {}
+    for name, filters in QUERIES.items():
+        stmt = RentalRepository.search_statement(limit=20, **filters)
+        timings, used = [], []
+        for _ in range(repeat):
+            raw = (await conn.execute(Explain(stmt))).scalar_one()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+            timings.append(plan["Execution Time"])
+            used = plan_indexes(plan["Plan"])
+        results[name] = (statistics.median(timings),
+                         ", ".join(dict.fromkeys(used)) or "seq scan")
+    return results
+
+
+async def time_insert(conn: AsyncConnection, rows: int, first_id: int) -> float:
+    """Seconds to bulk insert `rows` rows; rolled back afterwards."""
+    async with conn.begin_nested() as savepoint:
+        start = time.perf_counter()
+        await conn.execute(text(SEED_SQL), seed_params(rows, first_id))
+        elapsed = time.perf_counter() - start
+        await savepoint.rollback()
+    return elapsed
+
+
+async def run(database_url: str, rows: int, insert_rows: int, repeat: int) -> None:
+    engine = create_async_engine(database_url)
+    report: Dict[str, Dict[str, Tuple[float, str]]] = {}
+    insert_times: Dict[str, float] = {}
+    try:
+        async with engine.connect() as raw_conn:
+            conn = await raw_conn.execution_options(
+                schema_translate_map={None: SCHEMA})
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA "{SCHEMA}"'))
+            await conn.execute(text(f'SET search_path TO "{SCHEMA}", public'))
+            for statement in CREATE_TEXT_SEARCH_CONFIG:
+                await conn.execute(text(statement))
+            bench_metadata = MetaData()
+            Rental.__table__.to_metadata(bench_metadata)
+            await conn.run_sync(bench_metadata.create_all)
+            await conn.commit()
+
+            print(f"Seeding {rows} rentals...")
+            await conn.execute(text(SEED_SQL), seed_params(rows, 0))
+            await conn.commit()
+
+            for label, indexes in index_sets().items():
+                await drop_indexes(conn)
+                for index in indexes:
+                    await conn.run_sync(lambda sync_conn: index.create(sync_conn))
+                await conn.execute(text("ANALYZE rentals"))
+                await conn.commit()
+
+                report[label] = await explain(conn, repeat)
+                insert_times[label] = await time_insert(conn, insert_rows, rows)
+                await conn.rollback()
+
+            await conn.execute(text(f'DROP SCHEMA "{SCHEMA}" CASCADE'))
+            await conn.commit()
+    finally:
+        await engine.dispose()
+
+    print(f"\n{'query':<18} {'legacy ms':>10} {'composite ms':>13}  composite plan")
+    for name in QUERIES:
+        legacy_ms, _ = report["legacy"][name]
+        composite_ms, used = report["composite"][name]
+        print(f"{name:<18} {legacy_ms:>10.2f} {composite_ms:>13.2f}  {used}")
+    print(f"\nInsert {insert_rows} rows: legacy {insert_times['legacy']:.2f}s, "
+          f"composite {insert_times['composite']:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--insert-rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.rows, args.insert_rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Microbenchmark of the rental list serialization paths.
+
+Times one page of rentals through:
+  - orm+pydantic: ORM rows copied into RentalResponse, validated again
+    against the response model and JSON-encoded (the old search path);
+  - rows+orjson: SELECTed row tuples straight to JSON with RowSerializer;
+  - projection: the same with a `fields=` subset, skipping raw_text.
+
+Usage:
+    python -m benchmarks.serialization [--rows 100] [--number 200]
+
+Database time is not included: with a projection the SELECT also stops
+reading raw_text, which this benchmark cannot show.
+"""
+import argparse
+import json
+import random
+import timeit
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.api.serialization import RENTAL_FIELDS, RowSerializer, parse_fields
+from app.db.models import PropertyType, Rental, RentalResponse, TenantPreference
+
+PROJECTION = "id,price,location,property_type,message_date"
+
+
+def make_rentals(count: int) -> List[Rental]:
+    rng = random.Random(42)
+    words = "camera singola luminosa vicino metro spese incluse zona".split()
+    return [
+        Rental(
+            id=uuid4(),
+            telegram_message_id=10_000 + i,
+            sender_id=rng.randrange(1, 5000),
+            sender_username=f"user{i}",
+            message_date=datetime(2025, 7, 1) + timedelta(minutes=i),
+            telephone="345 123 4567",
+            raw_text=" ".join(rng.choice(words) for _ in range(120)),
+            summary="Camera singola in zona Bovisa",
+            price=float(rng.randrange(300, 1200)),
+            has_extra_expenses=True,
+            extra_expenses_details="50€ condominio",
+            location="Via Bonardi 12, Milano",
+            property_type=rng.choice(list(PropertyType)),
+            tenant_preference=rng.choice(list(TenantPreference)),
+            availability_start=date(2025, 9, 1),
+            num_bedrooms=2,
+            flatmates_count=3,
+            duration_to_leonardo_transit=12.0,
+            duration_to_bovisa_transit=25.0,
+        )
+        for i in range(count)
+    ]
+
+
+def orm_pydantic_path(rentals: List[Rental]) -> Callable[[], bytes]:
+    adapter = TypeAdapter(List[RentalResponse])
+
+    def run() -> bytes:
+        responses = [
+            RentalResponse(**{name: getattr(rental, name) for name in RENTAL_FIELDS})
+            for rental in rentals
+        ]
+        # What the response_model did: validate again, encode, dump
+        validated = adapter.validate_python(responses, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    return run
+
+
+def orjson_path(rentals: List[Rental], fields: str) -> Callable[[], bytes]:
+    serializer = RowSerializer(parse_fields(fields))
+    rows = [
+        tuple(getattr(rental, name) for name in serializer.columns)
+        for rental in rentals
+    ]
+    return lambda: serializer.dumps(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    rentals = make_rentals(args.rows)
+    paths: Dict[str, Callable[[], bytes]] = {
+        "orm+pydantic": orm_pydantic_path(rentals),
+        "rows+orjson": orjson_path(rentals, ""),
+        "projection": orjson_path(rentals, PROJECTION),
+    }
+
+    baseline = None
+    print(f"{'path':<14} {'ms/page':>9} {'speedup':>8} {'bytes':>8}")
+    for name, run in paths.items():
+        body = run()
+        best = min(timeit.repeat(run, number=args.number, repeat=5)) / args.number
+        baseline = baseline or best
+        print(f"{name:<14} {best * 1000:>9.3f} {baseline / best:>7.1f}x {len(body):>8}")
+
+
+if __name__ == "__main__":
+    main()
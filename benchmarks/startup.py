@@ -0,0 +1,90 @@
+"""
+Import time and memory of the API and scraping processes.
+
+Imports each entry point in fresh interpreters and reports the median wall
+time of the import, the peak RSS and the number of modules loaded, next to
+a bare interpreter. The API is imported without any scraper setting (e.g.
+the Telegram, Mistral and distance matrix secrets) in its environment.
+
+Usage:
+    python -m benchmarks.startup [--repeat 5]
+
+Needs DATABASE_URL/DATABASE_URL_SUPABASE for both processes and the scraper
+secrets for the scraping ones (.env works). Nothing connects anywhere.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+from app.core.config import ScraperSettings, Settings
+
+# Entry point module of each process; importing app.main builds the app
+TARGETS = {
+    "interpreter": None,
+    "api": "app.main",
+    "scheduler": "app.scheduler.scheduler_runner",
+    "listener": "app.scheduler.listener_runner",
+}
+
+# Settings of the scraping processes only
+SCRAPER_ONLY = ScraperSettings.model_fields.keys() - Settings.model_fields.keys()
+
+PROBE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+if {module!r}:
+    importlib.import_module({module!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "scraping_stack": sorted(
+        name for name in ("telethon", "mistralai", "httpx", "apscheduler", "aiohttp")
+        if name in sys.modules),
+}}))
+"""
+
+
+def probe(module: str, env: Dict[str, str]) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def measure(name: str, repeat: int) -> dict:
+    env = dict(os.environ)
+    if name == "api":
+        env = {key: value for key, value in env.items() if key not in SCRAPER_ONLY}
+    runs: List[dict] = [probe(TARGETS[name], env) for _ in range(repeat)]
+    return {
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "rss_mb": statistics.median(run["rss_mb"] for run in runs),
+        "modules": runs[-1]["modules"],
+        "scraping_stack": runs[-1]["scraping_stack"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS),
+                        default=list(TARGETS))
+    args = parser.parse_args()
+
+    print(f"{'process':<12} {'import ms':>10} {'RSS MB':>8} {'modules':>8}  scraping stack")
+    for name in args.targets:
+        result = measure(name, args.repeat)
+        print(f"{name:<12} {result['seconds'] * 1000:>10.0f} {result['rss_mb']:>8.1f} "
+              f"{result['modules']:>8}  {', '.join(result['scraping_stack']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import httpx
+import pytest
+import app.utility.distances as distances
+from app.utility.distances import DistanceMatrixClient, add_durations, ensure_milano
+
+
+class InMemoryCommuteCache:
+    def __init__(self):
+        self.entries = {}
+
+    async def get_many(self, addresses, created_after):
+        return [self.entries[a] for a in addresses if a in self.entries]
+
+    async def upsert_many(self, entries):
+        for entry in entries:
+            self.entries[entry.address] = entry
+
+
+def test_ensure_milano():
+    assert ensure_milano(" Via Bonardi ") == "Via Bonardi, Milano"
+    assert ensure_milano("Via Bonardi, Milano") == "Via Bonardi, Milano"
+
+
+@pytest.mark.asyncio
+async def test_add_durations_deduplicates_and_caches(monkeypatch):
+    calls = []
+
+    async def fake_matrix(origins, destinations, mode, **kwargs):
+        calls.append((tuple(origins), mode))
+        ok = {"status": "OK", "duration": {"value": 600}}
+        return {"rows": [{"elements": [ok, ok]} for _ in origins]}
+
+    monkeypatch.setattr(distances, "get_duration_matrix_async", fake_matrix)
+    cache = InMemoryCommuteCache()
+
+    apartments = [{"location": "Via Bonardi"}, {"location": "Via Bonardi, Milano"}, {}]
+    await add_durations(apartments, cache=cache)
+    assert calls == [(("Via Bonardi, Milano",), "transit"),
+                     (("Via Bonardi, Milano",), "walking")]
+    assert apartments[1]["duration_to_bovisa_walking"] == 10.0
+    assert "duration_to_leonardo_transit" not in apartments[2]
+
+    again = [{"location": "Via Bonardi"}]
+    await add_durations(again, cache=cache)
+    assert len(calls) == 2
+    assert again[0]["duration_to_leonardo_transit"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_client_retries_server_errors(monkeypatch):
+    responses = iter([
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"status": "OK", "rows": []}),
+    ])
+    monkeypatch.setattr(distances, "_backoff_delay", lambda attempt: 0)
+    client = DistanceMatrixClient(max_retries=3)
+    client._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: next(responses)))
+
+    async with client:
+        data = await client.get_duration_matrix(["A"], ["B"], "walking")
+    assert data["status"] == "OK"
+
+
+@pytest.mark.asyncio
+async def test_client_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(distances, "_backoff_delay", lambda attempt: 0)
+    client = DistanceMatrixClient(max_retries=1)
+    client._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+
+    async with client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.get_duration_matrix(["A"], ["B"], "walking")
+
+
+@pytest.mark.asyncio
+async def test_client_honours_zero_retry_after(monkeypatch):
+    backoffs = []
+    monkeypatch.setattr(distances, "_backoff_delay",
+                        lambda attempt: backoffs.append(attempt) or 0)
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"status": "OK", "rows": []}),
+    ])
+    client = DistanceMatrixClient(max_retries=1)
+    client._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: next(responses)))
+
+    async with client:
+        await client.get_duration_matrix(["A"], ["B"], "walking")
+    assert backoffs == []
@@ -1,5 +1,10 @@
+import os
+import subprocess
+import sys
+
 from fastapi.testclient import TestClient
 from app.app_factory import create_app
+from app.core.config import ScraperSettings, Settings
 
 app = create_app()
 client = TestClient(app)
@@ -11,3 +16,28 @@ def test_healthcheck():
     data = response.json()
     assert data["status"] == "healthy"
     assert data["service"] == "house-scraper-api"
+
+
+def test_api_starts_without_scraping_stack():
+    # A fresh interpreter, without any scraper setting in its environment
+    scraper_only = ScraperSettings.model_fields.keys() - Settings.model_fields.keys()
+    env = {key: value for key, value in os.environ.items() if key not in scraper_only}
+    code = (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('telethon', 'mistralai', 'apscheduler') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_cors_allows_conditional_requests():
+    response = client.options("/api/rentals/", headers={
+        "Origin": "http://localhost:3000",
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "if-none-match",
+    })
+    assert response.status_code == 200
+    assert "if-none-match" in response.headers["access-control-allow-headers"].lower()
@@ -0,0 +1,95 @@
+import pytest
+from app.scheduler.leader import LEADER_SHARD, ShardElection, lock_key
+
+
+class FakeLocks:
+    """Advisory locks of one replica on a lock table shared by all replicas."""
+
+    def __init__(self, table: dict, owner: str):
+        self.table = table
+        self.owner = owner
+        self.alive = True
+
+    async def try_lock(self, shard):
+        if self.table.setdefault(shard, self.owner) != self.owner:
+            return False
+        return True
+
+    async def unlock(self, shard):
+        self.table.pop(shard, None)
+
+    async def ping(self):
+        return self.alive
+
+    async def close(self):
+        for shard in [s for s, owner in self.table.items() if owner == self.owner]:
+            del self.table[shard]
+
+    async def drop(self):
+        """The server closed the session: its locks are gone."""
+        self.alive = False
+        await self.close()
+
+
+def test_lock_key_is_stable_bigint():
+    assert lock_key("@polihouse") == lock_key("@polihouse")
+    assert lock_key("@polihouse") != lock_key(LEADER_SHARD)
+    assert -2**63 <= lock_key("@polihouse") < 2**63
+
+
+@pytest.mark.asyncio
+async def test_leader_fails_over_when_its_session_drops():
+    table = {}
+    first = ShardElection(FakeLocks(table, "first"), [LEADER_SHARD])
+    second = ShardElection(FakeLocks(table, "second"), [LEADER_SHARD])
+
+    assert await first.refresh() == {LEADER_SHARD}
+    assert await second.refresh() == set()
+    assert await first.refresh() == set()
+    assert first.held == {LEADER_SHARD}
+
+    await first.locks.drop()
+    assert await first.refresh() == set()
+    assert first.held == set()
+    assert await second.refresh() == {LEADER_SHARD}
+
+
+@pytest.mark.asyncio
+async def test_shards_spread_across_replicas():
+    table = {}
+    shards = ["a", "b", "c", "d"]
+    first = ShardElection(FakeLocks(table, "first"), shards, replicas=2, lease_seconds=60)
+    second = ShardElection(FakeLocks(table, "second"), shards, replicas=2, lease_seconds=60)
+
+    # One new shard per round, up to the fair share
+    for _ in range(3):
+        await first.refresh()
+    assert len(first.held) == 2
+    for _ in range(3):
+        await second.refresh()
+    assert len(second.held) == 2
+    assert first.held.isdisjoint(second.held)
+
+
+@pytest.mark.asyncio
+async def test_orphaned_shards_are_taken_over():
+    table = {}
+    first = ShardElection(FakeLocks(table, "first"), ["a", "b"], replicas=2, lease_seconds=0)
+
+    await first.refresh()
+    await first.refresh()
+
+    assert first.held == {"a", "b"}
+
+
+@pytest.mark.asyncio
+async def test_release_hands_shards_over():
+    table = {}
+    first = ShardElection(FakeLocks(table, "first"), [LEADER_SHARD])
+    second = ShardElection(FakeLocks(table, "second"), [LEADER_SHARD])
+    await first.refresh()
+
+    await first.release()
+
+    assert first.held == set()
+    assert await second.refresh() == {LEADER_SHARD}
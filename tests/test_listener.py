@@ -0,0 +1,108 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from app.db.models import TelegramMessageData
+from app.scheduler.listener_runner import Listener
+from app.utility.minhash import LSHIndex
+
+
+class FakeCache:
+    async def purge_expired(self, *args):
+        return 0
+
+
+class FakeService:
+    def __init__(self):
+        self.batches = []
+        self.near_duplicates = LSHIndex(0.7)
+        self.near_duplicates_loaded = False
+        self.llm_parser = SimpleNamespace(cache=FakeCache())
+        self.commute_cache = FakeCache()
+
+    def use_near_duplicate_index(self, index):
+        self.near_duplicates = index
+        self.near_duplicates_loaded = True
+
+    async def process_messages(self, messages):
+        self.batches.append(messages)
+        return {"errors": []}
+
+    async def scrape_and_process_messages(self, **kwargs):
+        # Seeds a fresh index from the database
+        self.near_duplicates_loaded = True
+        return {"errors": []}
+
+
+def opener(services):
+    """open_service handing out a new fake service each time."""
+    @asynccontextmanager
+    async def open_service():
+        service = FakeService()
+        services.append(service)
+        yield service
+
+    return open_service
+
+
+def message(id, text="#offro camera", is_edit=False, channel="@test"):
+    return TelegramMessageData(
+        id=id, text=text, date=datetime.now(timezone.utc), channel=channel,
+        is_edit=is_edit)
+
+
+@pytest.mark.asyncio
+async def test_batch_closes_when_full():
+    listener = Listener(opener([]), batch_size=2, batch_wait=60)
+    for i in range(1, 4):
+        await listener.push(message(i))
+
+    batch = await listener.next_batch()
+
+    assert [m.id for m in batch] == [1, 2]
+    assert listener.queue.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_closes_after_wait():
+    listener = Listener(opener([]), batch_size=20, batch_wait=0.01)
+    await listener.push(message(1))
+
+    batch = await listener.next_batch()
+
+    assert [m.id for m in batch] == [1]
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_latest_version_of_a_message():
+    listener = Listener(opener([]), batch_size=20, batch_wait=0.01)
+    await listener.push(message(1, "#offro camera 500"))
+    await listener.push(message(1, "#offro camera 450", is_edit=True))
+    await listener.push(message(2, "#offro stanza", is_edit=True))
+    await listener.push(message(2, "#offro stanza 300", is_edit=True))
+    await listener.push(message(1, "#offro camera 500", channel="@other"))
+
+    batch = await listener.next_batch()
+
+    assert [(m.channel, m.id, m.text, m.is_edit) for m in batch] == [
+        ("@test", 1, "#offro camera 450", False),
+        ("@test", 2, "#offro stanza 300", True),
+        ("@other", 1, "#offro camera 500", False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batches_share_the_index_of_the_last_reconciliation():
+    services = []
+    listener = Listener(opener(services), batch_size=20, batch_wait=0.01)
+
+    await listener.reconcile_once()
+    await listener.process_batch([message(1)])
+    await listener.reconcile_once()
+
+    first, batch, second = services
+    assert batch.near_duplicates is first.near_duplicates
+    assert [m.id for m in batch.batches[0]] == [1]
+    assert listener.near_duplicates is second.near_duplicates
+    assert second.near_duplicates is not first.near_duplicates
@@ -0,0 +1,45 @@
+import pytest
+from app.parsing.cache import LLMResultCache, cache_key
+
+
+def test_cache_key_normalizes_whitespace():
+    assert cache_key("#offro  camera\n a  Bovisa ", "m", "1") == cache_key(
+        "#offro camera a Bovisa", "m", "1")
+    assert cache_key("testo", "m", "1") != cache_key("testo", "m", "2")
+    assert cache_key("testo", "m", "1") != cache_key("testo", "other", "1")
+
+
+@pytest.mark.asyncio
+async def test_local_cache_hits_and_misses():
+    cache = LLMResultCache(max_local_entries=2)
+    assert await cache.get("a") is None
+    cache.put("a", "m", "1", {"price": 500})
+    assert await cache.get("a") == {"price": 500}
+    assert cache.stats() == {"llm_cache_hits": 1, "llm_cache_misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_local_cache_evicts_least_recently_used():
+    cache = LLMResultCache(max_local_entries=2)
+    cache.put("a", "m", "1", {"price": 1})
+    cache.put("b", "m", "1", {"price": 2})
+    await cache.get("a")
+    cache.put("c", "m", "1", {"price": 3})
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"price": 1}
+
+
+@pytest.mark.asyncio
+async def test_attach_keeps_local_entries_and_forgets_misses():
+    class EmptyRepository:
+        async def get_many(self, keys, expires_before):
+            return []
+
+    cache = LLMResultCache(EmptyRepository(), max_local_entries=2)
+    cache.put("a", "m", "1", {"price": 500})
+    await cache.prefetch(["b"])
+
+    cache.attach(EmptyRepository())
+
+    assert await cache.get("a") == {"price": 500}
+    assert "b" not in cache._known_missing
@@ -0,0 +1,45 @@
+import json
+from datetime import datetime
+
+import pytest
+from app.db.models import TelegramMessageData
+from app.parsing.llm_parser import SimpleMistralParser, build_batch_prompt
+
+
+def make_message(message_id: int, text: str = "#offro camera singola") -> TelegramMessageData:
+    return TelegramMessageData(id=message_id, text=text, date=datetime(2025, 7, 27))
+
+
+def test_pack_batches_respects_token_budget():
+    messages = [(i, make_message(i, "x" * 400)) for i in range(10)]
+    batches = SimpleMistralParser._pack_batches(
+        messages, ("price",), token_budget=1200)
+    assert sum(len(batch) for batch in batches) == 10
+    assert len(batches) > 1
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+def test_batch_prompt_lists_message_ids():
+    prompt = build_batch_prompt([make_message(7), make_message(9)], ("price",))
+    assert '"id": 7' in prompt and '"id": 9' in prompt
+    assert '"price"' in prompt and '"location"' not in prompt
+
+
+@pytest.mark.asyncio
+async def test_parse_messages_batch_falls_back_for_missing_entries():
+    parser = SimpleMistralParser()
+    prompts = []
+
+    async def fake_complete(prompt, completion_tokens=0):
+        prompts.append(prompt)
+        if "Messaggi (lista" in prompt:
+            return json.dumps({"results": [{"id": 1, "price": 400}]})
+        return json.dumps({"price": 500})
+
+    parser._complete = fake_complete
+    results = await parser.parse_messages_batch(
+        [make_message(1), make_message(2)], ("price",))
+
+    assert [r["price"] for r in results] == [400, 500]
+    assert [r["message_id"] for r in results] == [1, 2]
+    assert len(prompts) == 2
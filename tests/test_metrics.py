@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.app_factory import create_app
+from app.core.metrics import observe_call, record_scrape_results
+
+app = create_app()
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_reports_route_latency():
+    labels = {"method": "GET", "route": "healthcheck", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    client.get("/api/healthcheck")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+    assert 'route="healthcheck"' in response.text
+
+
+def test_observe_call_counts_errors():
+    before = sample("external_call_seconds_count", service="test", outcome="error")
+
+    with pytest.raises(RuntimeError):
+        with observe_call("test"):
+            raise RuntimeError("boom")
+
+    assert sample(
+        "external_call_seconds_count", service="test", outcome="error") == before + 1
+
+
+def test_record_scrape_results():
+    before = sample("scrape_messages_total", outcome="saved")
+    failures = sample("scrape_failures_total", kind="run")
+
+    record_scrape_results({"messages_saved": 3, "errors": ["db down"]})
+
+    assert sample("scrape_messages_total", outcome="saved") == before + 3
+    assert sample("scrape_failures_total", kind="run") == failures + 1
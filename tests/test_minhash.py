@@ -0,0 +1,62 @@
+import pytest
+from app.utility.minhash import (
+    NUM_PERM,
+    LSHIndex,
+    band_layout,
+    minhash_signature,
+    signature_from_bytes,
+    signature_to_bytes,
+    similarity,
+)
+
+LISTING = (
+    "#offro Camera singola in zona Bovisa, a 5 minuti dal Politecnico. "
+    "Affitto 550€ al mese spese incluse, disponibile da settembre. "
+    "Appartamento con due bagni, cucina abitabile e balcone. Solo ragazze."
+)
+REPOST = (
+    "🏠 OFFRO camera singola zona Bovisa, a 5 minuti dal Politecnico! "
+    "Affitto 550€/mese spese incluse, disponibile da settembre. "
+    "Appartamento con due bagni, cucina abitabile e balcone. Solo ragazze, contattatemi"
+)
+OTHER = (
+    "#cerco Monolocale in zona Città Studi per un anno, budget massimo 800€, "
+    "sono uno studente di ingegneria tranquillo e non fumatore."
+)
+
+
+def test_signature_is_stable_and_roundtrips():
+    signature = minhash_signature(LISTING)
+
+    assert len(signature) == NUM_PERM
+    assert minhash_signature(LISTING) == signature
+    assert signature_from_bytes(signature_to_bytes(signature)) == signature
+    assert minhash_signature("  !! ") is None
+
+
+def test_similarity_of_reposts_and_unrelated_listings():
+    listing = minhash_signature(LISTING)
+
+    assert similarity(listing, minhash_signature(REPOST)) >= 0.7
+    assert similarity(listing, minhash_signature(OTHER)) < 0.2
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.9])
+def test_band_layout_midpoint_near_threshold(threshold):
+    bands, rows = band_layout(threshold)
+
+    assert bands * rows <= NUM_PERM
+    assert abs((1 / bands) ** (1 / rows) - threshold) <= 0.02
+
+
+def test_lsh_index_finds_near_duplicates_only():
+    index = LSHIndex(0.7)
+    index.add("listing", minhash_signature(LISTING))
+    index.add("other", minhash_signature(OTHER))
+
+    key, score = index.query(minhash_signature(REPOST))
+
+    assert key == "listing"
+    assert score >= 0.7
+    assert index.query(minhash_signature("Vendo bici da corsa usata, 200€")) is None
+    assert len(index) == 2
@@ -0,0 +1,55 @@
+import time
+import pytest
+from app.dependencies.scrape import get_llm_parser
+from app.parsing.rate_limiter import LLMRateLimiter, TokenBucket, estimate_tokens
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    now = bucket.updated_at
+    assert bucket.wait_time(2, now) == 0.0
+    bucket.consume(2)
+    assert bucket.wait_time(1, now) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 0.5) == 0.0
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 400) == 100
+
+
+@pytest.mark.asyncio
+async def test_limiter_paces_requests():
+    limiter = LLMRateLimiter(
+        requests_per_second=20, tokens_per_minute=100_000, max_concurrency=2)
+    start = time.monotonic()
+    for _ in range(25):
+        await limiter.acquire(10)
+    # 20 burst tokens, then 5 more at 20/s
+    assert time.monotonic() - start >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_limiter_penalize_blocks_callers():
+    limiter = LLMRateLimiter(
+        requests_per_second=100, tokens_per_minute=100_000, max_concurrency=2)
+    limiter.penalize(0.2)
+    start = time.monotonic()
+    async with limiter.slot(10):
+        pass
+    assert time.monotonic() - start >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_limiter_honours_zero_retry_after():
+    limiter = LLMRateLimiter(
+        requests_per_second=100, tokens_per_minute=100_000, max_concurrency=2)
+    limiter.penalize(0)
+    start = time.monotonic()
+    async with limiter.slot(10):
+        pass
+    assert time.monotonic() - start < 0.5
+
+
+def test_parsers_share_one_limiter():
+    assert get_llm_parser().rate_limiter is get_llm_parser().rate_limiter
@@ -0,0 +1,50 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.db.models import CommuteMode, PropertyType, RentalSort
+from app.db.repositories.rental import RentalRepository
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_search_statement_projection_and_keyset():
+    sql = compile_sql(RentalRepository.search_statement(
+        ["id", "price"], property_type=PropertyType.monolocale,
+        after=(datetime(2025, 7, 27), uuid4())))
+    assert sql.startswith("SELECT rentals.id, rentals.price \nFROM rentals")
+    assert "(rentals.message_date, rentals.id) <" in sql
+    assert "OFFSET" not in sql
+    assert "ORDER BY rentals.message_date DESC NULLS LAST, rentals.id DESC" in sql
+
+
+def test_search_statement_full_text_ranks_by_relevance():
+    sql = compile_sql(RentalRepository.search_statement(q="arredato balcone"))
+    assert "rentals.search_vector @@ websearch_to_tsquery('italian_unaccent'::regconfig" in sql
+    assert "ORDER BY ts_rank_cd(rentals.search_vector" in sql
+
+    with pytest.raises(ValueError):
+        RentalRepository.search_statement(q="balcone", after=(None, uuid4()))
+
+
+def test_search_statement_commute_filter_and_sort():
+    sql = compile_sql(RentalRepository.search_statement(
+        max_minutes_to_bovisa=30, commute_mode=CommuteMode.walking,
+        sort=RentalSort.commute, after=(12.0, uuid4())))
+    assert "rentals.duration_to_bovisa_walking <= " in sql
+    assert "(rentals.duration_to_bovisa_walking, rentals.id) >" in sql
+    assert ("ORDER BY rentals.duration_to_bovisa_walking ASC NULLS LAST, "
+            "rentals.id ASC") in sql
+
+
+def test_sort_field():
+    assert RentalRepository.sort_field() == "message_date"
+    assert RentalRepository.sort_field(RentalSort.price) == "price"
+    assert (RentalRepository.sort_field(RentalSort.commute)
+            == "duration_to_leonardo_transit")
+    assert (RentalRepository.sort_field(
+        RentalSort.commute, CommuteMode.walking, max_minutes_to_bovisa=20)
+        == "duration_to_bovisa_walking")
@@ -1,6 +1,9 @@
+from uuid import uuid4
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.app_factory import create_app
+from app.utility.helpers import encode_cursor
 
 
 @pytest.mark.asyncio
@@ -11,3 +14,19 @@ async def test_rentals_search_empty():
         response = await client.get("/api/rentals/")
         assert response.status_code == 200
         assert isinstance(response.json(), list)
+
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params, cursor_field", [
+    ({"sort": "commute"}, "price"),
+    ({"sort": "commute", "commute_mode": "walking"}, "duration_to_leonardo_transit"),
+    ({"sort": "price"}, "duration_to_bovisa_transit"),
+])
+async def test_rentals_search_rejects_cursor_of_another_sort(params, cursor_field):
+    cursor = encode_cursor(cursor_field, 20.0, uuid4())
+    app = create_app()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/rentals/", params={**params, "cursor": cursor})
+        assert response.status_code == 400
@@ -0,0 +1,63 @@
+import pytest
+from app.api.response_cache import CachedResponse, ResponseCache, etag_matches, weak_etag
+
+
+def make_entry(size: int) -> CachedResponse:
+    return CachedResponse(body=b"x" * size, headers={})
+
+
+@pytest.mark.asyncio
+async def test_version_change_clears_entries():
+    cache = ResponseCache(max_entries=10, max_bytes=1000, version_check_seconds=0)
+    versions = iter([1, 1, 2])
+
+    async def load():
+        return next(versions)
+
+    assert await cache.current_version(load) == 1
+    cache.put("a", make_entry(10))
+    assert await cache.current_version(load) == 1
+    assert cache.get("a") is not None
+    assert await cache.current_version(load) == 2
+    assert cache.get("a") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_version_is_reloaded_only_after_check_interval():
+    cache = ResponseCache(version_check_seconds=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return 7
+
+    for _ in range(3):
+        assert await cache.current_version(load) == 7
+    assert len(calls) == 1
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=100, version_check_seconds=0)
+    cache.put("a", make_entry(10))
+    cache.put("b", make_entry(10))
+    cache.get("a")
+    cache.put("c", make_entry(10))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.put("d", make_entry(95))
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 95
+    cache.put("e", make_entry(101))
+    assert cache.get("e") is None
+
+
+def test_etag_matches():
+    etag = weak_etag(3)
+    assert etag == 'W/"v3"'
+    assert etag_matches('W/"v3"', etag)
+    assert etag_matches('"v1", "v3"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"v2"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,67 @@
+from app.parsing.rule_extractor import RuleBasedExtractor
+
+
+def test_extract_full_listing():
+    text = (
+        "#offro camera singola in Via Bonardi 12, 450€ spese incluse. "
+        "Disponibile dal 01/09/2025. Contatti: 345 123 4567 mario.rossi@gmail.com"
+    )
+    extracted = RuleBasedExtractor().extract(text)
+    assert extracted == {
+        "price": 450.0,
+        "telephone": "345 123 4567",
+        "email": "mario.rossi@gmail.com",
+        "property_type": "camera_singola",
+        "location": "Via Bonardi 12",
+        "available_start": "2025-09-01",
+    }
+
+
+def test_extract_ignores_small_amounts_and_thousands_separator():
+    extractor = RuleBasedExtractor()
+    assert extractor.extract("Monolocale a 1.200 € + 50€ spese")["price"] == 1200.0
+    assert extractor.extract("Affitto €650")["price"] == 650.0
+
+
+def test_extract_leaves_ambiguous_fields_to_llm():
+    extracted = RuleBasedExtractor().extract(
+        "Camera singola 500€ oppure camera doppia 350€, zona Bovisa o Leonardo")
+    assert "price" not in extracted
+    assert "property_type" not in extracted
+    assert "location" not in extracted
+
+
+def test_extract_dates_and_zone():
+    extracted = RuleBasedExtractor().extract(
+        "Posto letto Città Studi dal 2025-09-01 al 2026-06-30")
+    assert extracted["property_type"] == "camera_doppia"
+    assert extracted["location"] == "Città Studi"
+    assert extracted["available_start"] == "2025-09-01"
+    assert extracted["available_end"] == "2026-06-30"
+
+
+def test_missing_required_and_stats():
+    extractor = RuleBasedExtractor(required_fields=["price", "location"])
+    assert extractor.missing_required({"price": 500}) == ["location"]
+    extractor.record_savings(100, skipped_call=True)
+    extractor.record_savings(40, skipped_call=False)
+    assert extractor.stats() == {
+        "llm_calls_saved": 1, "llm_prompt_tokens_saved": 140}
+
+
+def test_extract_location_ignores_contact_channels():
+    extractor = RuleBasedExtractor()
+    assert extractor.extract(
+        "Camera singola zona Bovisa, contattatemi via WhatsApp")["location"] == "Bovisa"
+    assert extractor.extract(
+        "Stanza a Leonardo, scrivere via Telegram")["location"] == "Leonardo"
+    assert "location" not in extractor.extract("Monolocale 700€, info via Email")
+    assert extractor.extract(
+        "Via Bonardi. Disponibile da settembre")["location"] == "Via Bonardi"
+
+
+def test_extract_location_prefers_zone_to_lowercase_street():
+    extractor = RuleBasedExtractor()
+    assert extractor.extract(
+        "Posto letto Città Studi, passare via Roma")["location"] == "Città Studi"
+    assert extractor.extract("Camera in via Pacini 5")["location"] == "via Pacini 5"
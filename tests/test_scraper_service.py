@@ -0,0 +1,391 @@
+import json
+from datetime import datetime
+
+import pytest
+import app.scraping.scraper_service as scraper_service
+from app.core.metrics import SCRAPE_FAILURES
+from app.db.models import TelegramMessageData
+from app.db.repositories.rental import BulkInsertResult
+from app.parsing.llm_parser import SimpleMistralParser
+from app.parsing.rule_extractor import RuleBasedExtractor
+from app.scheduler.backfill_runner import run_backfill
+from app.scraping.scraper_service import ScrapingService
+from app.utility.minhash import LSHIndex
+
+
+class FakeTelegramClient:
+    channel_name = "@test"
+
+    def __init__(self, messages, channels=None):
+        # channel -> its messages, or the exception fetching it raises
+        self.channels = channels or {self.channel_name: messages}
+        self.channel_names = list(self.channels)
+        self.high_water_marks = {}
+        self.is_connected = False
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    async def iter_new_messages(self, since=None, min_id=None, limit=None, max_id=None,
+                                channel=None):
+        channel = channel or self.channel_name
+        if isinstance(self.channels[channel], Exception):
+            raise self.channels[channel]
+        messages = [
+            message for message in self.channels[channel]
+            if (min_id is None or message.id > min_id)
+            and (max_id is None or message.id < max_id)
+        ]
+        for message in messages[:limit]:
+            self.high_water_marks[channel] = message.id
+            yield message
+
+
+class FakeRentalRepository:
+    def __init__(self, stored_fingerprints=()):
+        self.stored = set(stored_fingerprints)
+        self.batches = []
+
+    async def find_existing_fingerprints(self, fingerprints):
+        return {f for f in fingerprints if f in self.stored}
+
+    async def find_signatures(self, since):
+        return []
+
+    async def bulk_upsert(self, rentals):
+        self.batches.append(rentals)
+        return BulkInsertResult(inserted=list(rentals))
+
+
+class FakeDataVersion:
+    def __init__(self):
+        self.version = 0
+
+    async def bump(self):
+        self.version += 1
+        return self.version
+
+
+class FakeScrapeState:
+    def __init__(self):
+        self.marks = {}
+
+    async def get_last_message_id(self, channel):
+        return self.marks.get(channel)
+
+    async def set_last_message_id(self, channel, message_id):
+        self.marks[channel] = message_id
+
+
+def make_messages(count, channel="@test"):
+    return [
+        TelegramMessageData(
+            id=i, text=f"#offro camera {i} {channel}", date=datetime(2025, 7, 27),
+            sender_id=1, channel=channel)
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def no_durations(monkeypatch):
+    async def fake_add_durations(apartments, **kwargs):
+        return apartments
+
+    monkeypatch.setattr(scraper_service, "add_durations", fake_add_durations)
+
+
+def make_service(messages, repository, state=None, near_duplicates=None, channels=None):
+    parser = SimpleMistralParser()
+
+    async def fake_complete(prompt, completion_tokens=0):
+        return json.dumps({"price": 500, "location": "Via Bonardi"})
+
+    parser._complete = fake_complete
+    service = ScrapingService(
+        FakeTelegramClient(messages, channels), parser, repository, scrape_state=state,
+        data_version=FakeDataVersion(), near_duplicates=near_duplicates)
+    service.queue_size = 4
+    service.batch_size = 3
+    return service
+
+
+@pytest.mark.asyncio
+async def test_pipeline_streams_batches_and_stores_high_water_mark(no_durations):
+    repository = FakeRentalRepository()
+    state = FakeScrapeState()
+    service = make_service(make_messages(10), repository, state)
+
+    results = await service.scrape_and_process_messages(max_messages=50)
+
+    assert results["messages_fetched"] == 10
+    assert results["messages_parsed"] == 10
+    assert results["messages_saved"] == 10
+    assert results["errors"] == []
+    assert len(repository.batches) > 1
+    assert all(len(batch) <= 3 for batch in repository.batches)
+    assert state.marks == {"@test": 10}
+    assert service.data_version.version == len(repository.batches)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_known_duplicates(no_durations):
+    messages = make_messages(3)
+    stored = {scraper_service.rental_fingerprint(1, messages[0].text)}
+    repository = FakeRentalRepository(stored)
+
+    results = await make_service(messages, repository).scrape_and_process_messages()
+
+    assert results["duplicates_skipped"] == 1
+    assert results["messages_saved"] == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_failure_keeps_high_water_mark(no_durations):
+    class FailingRepository(FakeRentalRepository):
+        async def bulk_upsert(self, rentals):
+            raise RuntimeError("db down")
+
+    state = FakeScrapeState()
+    service = make_service(make_messages(5), FailingRepository(), state)
+
+    results = await service.scrape_and_process_messages()
+
+    assert results["errors"] == ["Scraping pipeline failed: db down"]
+    assert state.marks == {}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_merges_channels_with_their_own_marks(no_durations):
+    repository = FakeRentalRepository()
+    state = FakeScrapeState()
+    state.marks["@other"] = 2
+    channels = {"@test": make_messages(3), "@other": make_messages(5, "@other")}
+    service = make_service(None, repository, state, channels=channels)
+
+    results = await service.scrape_and_process_messages()
+
+    assert results["messages_saved"] == 6
+    assert results["channels"] == {
+        "@test": {"messages_fetched": 3, "messages_saved": 3, "error": None},
+        "@other": {"messages_fetched": 3, "messages_saved": 3, "error": None},
+    }
+    assert state.marks == {"@test": 3, "@other": 5}
+    saved = {(rental.channel, rental.telegram_message_id)
+             for batch in repository.batches for rental in batch}
+    assert ("@test", 3) in saved and ("@other", 3) in saved
+
+
+@pytest.mark.asyncio
+async def test_failing_channel_does_not_stop_the_others(no_durations):
+    repository = FakeRentalRepository()
+    state = FakeScrapeState()
+    channels = {"@test": make_messages(3),
+                "@other": Exception("Rate limited on @other. Wait 300 seconds")}
+    service = make_service(None, repository, state, channels=channels)
+
+    results = await service.scrape_and_process_messages()
+
+    assert results["messages_saved"] == 3
+    assert results["errors"] == [
+        "Failed to fetch messages from @other: Rate limited on @other. Wait 300 seconds"]
+    assert results["channels"]["@other"]["error"] == results["errors"][0]
+    assert state.marks == {"@test": 3}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_flags_near_duplicates_across_senders(no_durations):
+    text = ("#offro Camera singola in zona Bovisa vicino al Politecnico, "
+            "550€ al mese spese incluse, disponibile da settembre")
+    messages = [
+        TelegramMessageData(id=1, text=text, date=datetime(2025, 7, 27), sender_id=1),
+        TelegramMessageData(
+            id=2, text=text.upper() + "!!", date=datetime(2025, 7, 28), sender_id=2),
+    ]
+    repository = FakeRentalRepository()
+    service = make_service(messages, repository, near_duplicates=LSHIndex(0.7))
+
+    results = await service.scrape_and_process_messages()
+
+    saved = {rental.telegram_message_id: rental for batch in repository.batches
+             for rental in batch}
+    assert results["near_duplicates"] == 1
+    assert results["messages_saved"] == 2
+    assert saved[1].duplicate_of is None
+    assert saved[2].duplicate_of == saved[1].id
+    assert saved[2].minhash_signature is not None
+
+
+@pytest.mark.asyncio
+async def test_backfill_checkpoints_every_range(no_durations):
+    repository = FakeRentalRepository()
+    state = FakeScrapeState()
+    service = make_service(make_messages(10), repository)
+
+    totals = await run_backfill(service, state, first_id=0, last_id=10, chunk_size=4)
+
+    assert totals["chunks"] == 3
+    assert totals["messages_saved"] == 10
+    assert totals["last_message_id"] == 10
+    # The live high-water mark is left to the scheduler
+    assert state.marks == {"backfill:@test": 10}
+    assert not service.telegram_client.is_connected
+
+
+@pytest.mark.asyncio
+async def test_backfill_stops_before_failed_range(no_durations):
+    class FlakyRepository(FakeRentalRepository):
+        async def bulk_upsert(self, rentals):
+            if any(rental.telegram_message_id > 4 for rental in rentals):
+                raise RuntimeError("db down")
+            return await super().bulk_upsert(rentals)
+
+    state = FakeScrapeState()
+    service = make_service(make_messages(10), FlakyRepository(), state)
+
+    totals = await run_backfill(service, state, first_id=0, last_id=10, chunk_size=4)
+
+    assert totals["errors"] == ["Scraping pipeline failed: db down"]
+    assert state.marks == {"backfill:@test": 4}
+
+
+@pytest.mark.asyncio
+async def test_pushed_edit_updates_stored_listing(no_durations):
+    class EditableRepository(FakeRentalRepository):
+        def __init__(self, stored_messages, conflicting=(), stored_fingerprints=()):
+            super().__init__(stored_fingerprints)
+            self.stored_messages = set(stored_messages)
+            # Edits whose new fingerprint belongs to another listing
+            self.conflicting = set(conflicting)
+            self.edits = []
+
+        async def update_from_edits(self, rentals):
+            self.edits.extend(rentals)
+            result, missing = BulkInsertResult(), []
+            for rental in rentals:
+                key = (rental.channel, rental.telegram_message_id)
+                if key in self.conflicting:
+                    result.skipped.append(rental)
+                elif key in self.stored_messages:
+                    result.updated.append(rental)
+                else:
+                    missing.append(rental)
+            return result, missing
+
+    edit, new, conflict = make_messages(3)
+    edit.is_edit = conflict.is_edit = True
+    # Same text as the stored listing: still an update, not a duplicate
+    repository = EditableRepository(
+        {("@test", 1), ("@test", 3)}, {("@test", 3)},
+        {scraper_service.rental_fingerprint(1, edit.text)})
+    state = FakeScrapeState()
+    service = make_service([], repository, state)
+
+    results = await service.process_messages([edit, new, conflict])
+
+    assert results["messages_updated"] == 1
+    assert results["messages_saved"] == 1
+    assert results["duplicates_skipped"] == 1
+    assert [r.telegram_message_id for r in repository.edits] == [1, 3]
+    assert [r.telegram_message_id for r in repository.batches[0]] == [2]
+    assert state.marks == {}
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_of_unparsed_original_becomes_original(no_durations):
+    text = ("#offro Camera singola in zona Bovisa vicino al Politecnico, "
+            "550€ al mese spese incluse, disponibile da settembre")
+    messages = [
+        TelegramMessageData(id=i, text=text + "!" * i, date=datetime(2025, 7, 27),
+                            sender_id=i)
+        for i in range(1, 4)
+    ]
+    repository = FakeRentalRepository()
+    service = make_service(messages, repository, near_duplicates=LSHIndex(0.7))
+    complete = service.llm_parser._complete
+
+    async def fail_first(prompt, completion_tokens=0):
+        if text + "!!" not in prompt:
+            raise RuntimeError("LLM down")
+        return await complete(prompt, completion_tokens)
+
+    service.llm_parser._complete = fail_first
+
+    results = await service.scrape_and_process_messages()
+
+    saved = {rental.telegram_message_id: rental for batch in repository.batches
+             for rental in batch}
+    assert results["near_duplicates"] == 2
+    assert sorted(saved) == [2, 3]
+    assert saved[2].duplicate_of is None
+    assert saved[3].duplicate_of == saved[2].id
+    assert list(service.near_duplicates._signatures) == [saved[2].id]
+    assert service._near_duplicate_info == {}
+
+
+@pytest.mark.asyncio
+async def test_skipped_near_duplicates_are_counted_once(no_durations):
+    text = ("#offro Camera singola in zona Bovisa vicino al Politecnico, "
+            "550€ al mese spese incluse, disponibile da settembre")
+    messages = [
+        TelegramMessageData(id=1, text=text, date=datetime(2025, 7, 27), sender_id=1),
+        TelegramMessageData(id=2, text=text + "!", date=datetime(2025, 7, 27), sender_id=2),
+    ]
+    service = make_service(messages, FakeRentalRepository(), near_duplicates=LSHIndex(0.7))
+    service.near_duplicate_action = "skip"
+
+    results = await service.scrape_and_process_messages()
+
+    assert results["near_duplicates"] == 1
+    assert results["duplicates_skipped"] == 0
+    assert results["messages_saved"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_parse_is_reported_and_retried(no_durations):
+    messages = make_messages(4)
+    repository = FakeRentalRepository()
+    state = FakeScrapeState()
+    service = make_service(messages, repository, state)
+    complete = service.llm_parser._complete
+
+    async def fail_second(prompt, completion_tokens=0):
+        if messages[1].text in prompt:
+            raise RuntimeError("LLM down")
+        return await complete(prompt, completion_tokens)
+
+    service.llm_parser._complete = fail_second
+    failures = SCRAPE_FAILURES.labels("parse")._value.get()
+
+    results = await service.scrape_and_process_messages()
+
+    saved = [rental for batch in repository.batches for rental in batch]
+    assert sorted(rental.telegram_message_id for rental in saved) == [1, 3, 4]
+    assert results["messages_saved"] == results["channels"]["@test"]["messages_saved"] == 3
+    assert SCRAPE_FAILURES.labels("parse")._value.get() == failures + 1
+    assert results["errors"] == ["Failed to parse message 2: LLM down"]
+    assert state.marks == {"@test": 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_parse_keeps_no_prefilled_fields(no_durations):
+    message = TelegramMessageData(
+        id=1, text="#offro stanza in Via Bonardi 12, 450€", date=datetime(2025, 7, 27),
+        sender_id=1, channel="@test")
+    repository = FakeRentalRepository()
+    service = make_service([message], repository)
+    service.rule_extractor = RuleBasedExtractor()
+
+    async def fail(prompt, completion_tokens=0):
+        raise RuntimeError("LLM down")
+
+    service.llm_parser._complete = fail
+
+    results = await service.scrape_and_process_messages()
+
+    assert repository.batches == []
+    assert results["messages_parsed"] == 0
+    assert results["llm_prompt_tokens_saved"] == 0
+    assert len(results["errors"]) == 1
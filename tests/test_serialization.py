@@ -0,0 +1,38 @@
+import json
+from datetime import date, datetime
+from uuid import uuid4
+
+import pytest
+from app.api.serialization import RENTAL_FIELDS, RowSerializer, parse_fields
+from app.db.models import PropertyType, RentalResponse, TenantPreference
+
+
+def test_parse_fields_keeps_response_order():
+    assert parse_fields(None) == RENTAL_FIELDS
+    assert parse_fields("price, id,price") == ("id", "price")
+    with pytest.raises(ValueError, match="raw"):
+        parse_fields("price,raw")
+
+
+def test_row_serializer_matches_pydantic_output():
+    values = {
+        "id": uuid4(),
+        "message_date": datetime(2025, 7, 27, 10, 30),
+        "raw_text": "#offro camera",
+        "price": 450.0,
+        "property_type": PropertyType.camera_singola,
+        "tenant_preference": TenantPreference.ragazza,
+        "availability_start": date(2025, 9, 1),
+    }
+    serializer = RowSerializer(RENTAL_FIELDS)
+    row = tuple(values.get(name) for name in serializer.columns)
+
+    expected = RentalResponse(**values).model_dump_json()
+    assert json.loads(serializer.dumps([row])) == [json.loads(expected)]
+
+
+def test_row_serializer_projection_selects_cursor_columns():
+    serializer = RowSerializer(("price",))
+    assert serializer.columns == ("id", "message_date", "price")
+    row = (uuid4(), datetime(2025, 7, 27), 500.0)
+    assert json.loads(serializer.dumps([row])) == [{"price": 500.0}]
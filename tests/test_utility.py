@@ -1,5 +1,15 @@
+from datetime import datetime
+from uuid import uuid4
+
 import pytest
-from app.utility.helpers import normalize_tenant_preference, parse_date, parse_llm_response
+from app.utility.helpers import (
+    decode_cursor,
+    encode_cursor,
+    normalize_tenant_preference,
+    parse_date,
+    parse_llm_response,
+    rental_fingerprint,
+)
 
 
 def test_normalize_tenant_preference():
@@ -46,3 +56,29 @@ def test_parse_llm_response_invalid_json():
     bad_json = "not a json"
     result = parse_llm_response(bad_json)
     assert result == {}
+
+
+def test_rental_fingerprint():
+    text = "#Offro camera singola a Milano, 500 euro"
+    same_prefix = "#OFFRO CAMERA SINGOLA A MILANO, 450 euro"
+    assert rental_fingerprint(1, text) == rental_fingerprint(1, same_prefix)
+    assert rental_fingerprint(1, text) != rental_fingerprint(2, text)
+    assert rental_fingerprint(None, text) is None
+    assert rental_fingerprint(1, "") is None
+
+
+def test_cursor_round_trip():
+    rental_id = uuid4()
+    message_date = datetime(2025, 7, 27, 10, 30)
+    assert decode_cursor(encode_cursor("message_date", message_date, rental_id)) == (
+        "message_date", message_date, rental_id)
+    assert decode_cursor(encode_cursor("price", None, rental_id)) == (
+        "price", None, rental_id)
+    assert decode_cursor(encode_cursor("price", 550.0, rental_id)) == (
+        "price", 550.0, rental_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "W10", "WzEsMiwzXQ"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)